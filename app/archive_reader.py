@@ -0,0 +1,99 @@
+# --- START OF FILE archive_reader.py ---
+
+"""
+Lecture en flux des images contenues dans une archive ZIP ou TAR uploadée.
+Les membres sont lus un par un depuis l'objet fichier de l'upload, en
+mémoire : rien n'est extrait sur disque. Les membres qui ne sont pas des
+images (d'après leur extension) sont ignorés.
+"""
+
+import os
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+
+# Extensions des membres considérés comme des images.
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff", ".webp"}
+
+
+class ArchiveFormatError(Exception):
+    """Levée quand l'upload n'est ni une archive ZIP ni une archive TAR lisible."""
+
+
+@dataclass
+class ArchiveMember:
+    """Une image de l'archive : son contenu, ou l'erreur rencontrée en la lisant."""
+    name: str
+    data: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+def is_image_name(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def _read_limited(stream: BinaryIO, name: str, max_bytes: int) -> ArchiveMember:
+    data = stream.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        return ArchiveMember(name, error=f"Membre trop volumineux (> {max_bytes} octets)")
+    return ArchiveMember(name, data=data)
+
+
+def _iter_zip(archive: zipfile.ZipFile, max_member_bytes: int) -> Iterator[ArchiveMember]:
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or not is_image_name(info.filename):
+                continue
+            # La taille déclarée peut mentir (archive piégée) : la lecture reste bornée
+            if info.file_size > max_member_bytes:
+                yield ArchiveMember(info.filename, error=f"Membre trop volumineux ({info.file_size} octets)")
+                continue
+            try:
+                with archive.open(info) as stream:
+                    yield _read_limited(stream, info.filename, max_member_bytes)
+            except Exception as e:
+                yield ArchiveMember(info.filename, error=f"Lecture impossible: {type(e).__name__} - {e}")
+
+
+def _iter_tar(archive: tarfile.TarFile, max_member_bytes: int) -> Iterator[ArchiveMember]:
+    with archive:
+        for info in archive:
+            if not info.isfile() or not is_image_name(info.name):
+                continue
+            if info.size > max_member_bytes:
+                yield ArchiveMember(info.name, error=f"Membre trop volumineux ({info.size} octets)")
+                continue
+            try:
+                stream = archive.extractfile(info)
+                yield _read_limited(stream, info.name, max_member_bytes)
+            except Exception as e:
+                yield ArchiveMember(info.name, error=f"Lecture impossible: {type(e).__name__} - {e}")
+
+
+def open_archive(fileobj: BinaryIO, max_member_bytes: int) -> Iterator[ArchiveMember]:
+    """
+    Ouvre une archive ZIP ou TAR (éventuellement compressée gzip/bz2/xz) et
+    retourne un itérateur paresseux sur ses images.
+
+    Args:
+        fileobj: Objet fichier binaire positionnable contenant l'archive
+        max_member_bytes (int): Taille maximale décompressée d'une image
+
+    Raises:
+        ArchiveFormatError: Si le format n'est pas reconnu
+    """
+    fileobj.seek(0)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        try:
+            return _iter_zip(zipfile.ZipFile(fileobj), max_member_bytes)
+        except zipfile.BadZipFile as e:
+            raise ArchiveFormatError(f"Archive ZIP illisible: {e}") from e
+    fileobj.seek(0)
+    try:
+        return _iter_tar(tarfile.open(fileobj=fileobj, mode="r:*"), max_member_bytes)
+    except tarfile.TarError as e:
+        raise ArchiveFormatError("Format d'archive non reconnu (ZIP ou TAR attendu)") from e
+
+# --- END OF FILE archive_reader.py ---
@@ -25,6 +25,8 @@ class DecoderType(str, Enum):
     # ... (inchangé) ...
     ZXING = "ZXing (JPype)"
     PYLIBDMTX = "pylibdmtx"
+    ZXING_CPP = "zxing-cpp"
+    PYZBAR = "pyzbar"
     TEXT_INPUT = "text_input"
     NONE = "none"
 
@@ -59,6 +61,8 @@ def calculate_confidence(data, decoder, format_enum):
     base_score = 0.0
     if decoder == DecoderType.ZXING: base_score = 0.9
     elif decoder == DecoderType.PYLIBDMTX: base_score = 0.7
+    elif decoder == DecoderType.ZXING_CPP: base_score = 0.9
+    elif decoder == DecoderType.PYZBAR: base_score = 0.8
     elif decoder == DecoderType.TEXT_INPUT: base_score = 0.95
     else: base_score = 0.5
     if format_enum in [BarcodeFormat.GS1_128, BarcodeFormat.GS1_DATAMATRIX, BarcodeFormat.GS1_QRCODE]:
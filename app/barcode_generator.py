@@ -8,17 +8,19 @@ import os
 import re
 from PIL import Image
 from enum import Enum
-import qrcode
-from barcode import Code128
-from barcode.writer import ImageWriter
-import pylibdmtx.pylibdmtx as dmtx
+from functools import lru_cache
 
-# Tenter d'importer treepoem si disponible (pour des formats supplémentaires)
-try:
-    import treepoem
-    TREEPOEM_AVAILABLE = True
-except ImportError:
-    TREEPOEM_AVAILABLE = False
+# Les bibliothèques de génération (qrcode, python-barcode, pylibdmtx, treepoem)
+# sont importées à la première génération : le démarrage de l'API n'en dépend pas.
+
+@lru_cache(maxsize=1)
+def is_treepoem_available():
+    """Indique si treepoem (formats supplémentaires) est installé ; testé une seule fois."""
+    try:
+        import treepoem  # noqa: F401
+        return True
+    except ImportError:
+        return False
 
 class BarcodeFormat(str, Enum):
     """Formats de codes-barres pris en charge pour la génération."""
@@ -97,7 +99,7 @@ def prepare_gs1_content(data, barcode_format):
     
     # Pour GS1-128, ajouter le FNC1 au début
     elif barcode_format == BarcodeFormat.GS1_128:
-        if TREEPOEM_AVAILABLE:
+        if is_treepoem_available():
             # treepoem gère automatiquement le FNC1 pour GS1-128
             return data
         else:
@@ -118,6 +120,8 @@ def generate_datamatrix(data, size=(5, 5)):
     Returns:
         PIL.Image: Image du code DataMatrix
     """
+    import pylibdmtx.pylibdmtx as dmtx
+
     # Encoder en bytes pour pylibdmtx
     encoded_data = data.encode('utf-8')
     
@@ -129,19 +133,23 @@ def generate_datamatrix(data, size=(5, 5)):
     
     return img
 
-def generate_qrcode(data, error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=10, border=4):
+def generate_qrcode(data, error_correction=None, box_size=10, border=4):
     """
     Génère un QR Code.
     
     Args:
         data (str): Données à encoder
-        error_correction: Niveau de correction d'erreur
+        error_correction: Niveau de correction d'erreur (None : ERROR_CORRECT_M)
         box_size (int): Taille de chaque "boîte" du QR code en pixels
         border (int): Taille de la bordure en nombre de boîtes
         
     Returns:
         PIL.Image: Image du QR Code
     """
+    import qrcode
+
+    if error_correction is None:
+        error_correction = qrcode.constants.ERROR_CORRECT_M
     qr = qrcode.QRCode(
         version=None,  # Auto-détermination de la version
         error_correction=error_correction,
@@ -164,6 +172,9 @@ def generate_code128(data):
     Returns:
         PIL.Image: Image du Code 128
     """
+    from barcode import Code128
+    from barcode.writer import ImageWriter
+
     # Utiliser python-barcode pour générer un Code 128
     output = io.BytesIO()
     Code128(data, writer=ImageWriter()).write(output)
@@ -184,8 +195,9 @@ def generate_barcode_with_treepoem(data, barcode_format):
     Returns:
         PIL.Image: Image du code-barres
     """
-    if not TREEPOEM_AVAILABLE:
+    if not is_treepoem_available():
         raise ImportError("La bibliothèque treepoem n'est pas disponible")
+    import treepoem
     
     # Mapper le format au type treepoem
     format_map = {
@@ -239,7 +251,7 @@ def generate_barcode(data, barcode_format=BarcodeFormat.DATAMATRIX, image_format
     formatted_data = prepare_gs1_content(data, barcode_format)
     
     # Utiliser treepoem si disponible et demandé
-    if use_treepoem and TREEPOEM_AVAILABLE:
+    if use_treepoem and is_treepoem_available():
         try:
             img = generate_barcode_with_treepoem(formatted_data, barcode_format)
         except Exception as e:
@@ -248,7 +260,7 @@ def generate_barcode(data, barcode_format=BarcodeFormat.DATAMATRIX, image_format
             use_treepoem = False
     
     # Utiliser les générateurs spécifiques
-    if not use_treepoem or not TREEPOEM_AVAILABLE:
+    if not use_treepoem or not is_treepoem_available():
         if barcode_format in [BarcodeFormat.DATAMATRIX, BarcodeFormat.GS1_DATAMATRIX]:
             img = generate_datamatrix(formatted_data)
         elif barcode_format in [BarcodeFormat.QRCODE, BarcodeFormat.GS1_QRCODE]:
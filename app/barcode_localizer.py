@@ -0,0 +1,200 @@
+# --- START OF FILE barcode_localizer.py ---
+
+"""
+Localisation rapide des codes-barres (NumPy) avant décodage.
+Repère des régions candidates par densité de gradients sur une copie réduite
+de l'image, puis les qualifie avec des heuristiques de motifs de repérage
+(L-finder DataMatrix, finder patterns 1:1:3:1:1 du QR Code, barres 1D).
+Seules ces régions, recadrées avec une marge, sont envoyées aux décodeurs.
+"""
+
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Côté long de la copie de travail et taille des blocs d'analyse (pixels de travail).
+WORK_SIZE = 800
+BLOCK_SIZE = 8
+# Côté long maximal d'une région lors de sa qualification par motifs.
+CLASSIFY_SIZE = 160
+
+
+@dataclass
+class CandidateRegion:
+    """Région candidate en coordonnées de l'image d'origine (left, top, right, bottom)."""
+    box: Tuple[int, int, int, int]
+    score: float
+    kind: str = "unknown"
+
+
+def _count_qr_finder_rows(dark: np.ndarray) -> int:
+    """Compte les lignes contenant une séquence sombre/clair 1:1:3:1:1 (finder QR)."""
+    rows, cols = dark.shape
+    # Une colonne claire de part et d'autre isole les lignes une fois aplaties
+    padded = np.zeros((rows, cols + 2), dtype=bool)
+    padded[:, 1:-1] = dark
+    flat = padded.ravel()
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    if starts.size < 5:
+        return 0
+    lengths = np.diff(np.concatenate((starts, [flat.size]))).astype(np.float64)
+    row_of_run = starts // (cols + 2)
+
+    windows = np.lib.stride_tricks.sliding_window_view(lengths, 5)
+    units = windows.sum(axis=1) / 7.0
+    expected = np.array([1, 1, 3, 1, 1], dtype=np.float64)
+    ok = np.all(np.abs(windows - units[:, None] * expected) <= units[:, None] * 0.6, axis=1)
+    ok &= flat[starts[:-4]] & (units >= 1.0) & (row_of_run[:-4] == row_of_run[4:])
+    return int(np.unique(row_of_run[:-4][ok]).size)
+
+
+def _longest_dark_run(dark: np.ndarray) -> Tuple[int, int, int]:
+    """Plus long segment sombre parmi les lignes de `dark` : (ligne, début, fin exclue)."""
+    cols = dark.shape[1]
+    positions = np.arange(cols)
+    last_light = np.maximum.accumulate(np.where(dark, -1, positions), axis=1)
+    run_ending_here = np.where(dark, positions - last_light, 0)
+    row, end = np.unravel_index(int(np.argmax(run_ending_here)), run_ending_here.shape)
+    length = int(run_ending_here[row, end])
+    return int(row), int(end) + 1 - length, int(end) + 1
+
+
+def _has_l_finder(dark: np.ndarray) -> bool:
+    """
+    Bordures pleines en L du DataMatrix : un long segment sombre horizontal et
+    un long segment sombre vertical qui se rejoignent à une extrémité.
+    """
+    height, width = dark.shape
+    h_row, h_start, h_end = _longest_dark_run(dark)
+    v_col, v_start, v_end = _longest_dark_run(dark.T)
+    if h_end - h_start < 0.4 * width or v_end - v_start < 0.4 * height:
+        return False
+    tol_x, tol_y = max(2, width // 10), max(2, height // 10)
+    joins_x = abs(v_col - h_start) <= tol_x or abs(v_col - (h_end - 1)) <= tol_x
+    joins_y = abs(h_row - v_start) <= tol_y or abs(h_row - (v_end - 1)) <= tol_y
+    return joins_x and joins_y
+
+
+def _classify(crop: np.ndarray, dx: float, dy: float) -> Tuple[str, float]:
+    """Qualifie une région (type probable, bonus de score) d'après ses motifs."""
+    if crop.shape[0] < 8 or crop.shape[1] < 8:
+        return "unknown", 1.0
+    step = max(1, math.ceil(max(crop.shape) / CLASSIFY_SIZE))
+    crop = crop[::step, ::step]
+    dark = crop < crop.mean()
+
+    # DataMatrix : bordures pleines en L
+    if _has_l_finder(dark):
+        return "datamatrix", 1.5
+
+    # QR Code : plusieurs lignes traversant un finder pattern 1:1:3:1:1
+    if _count_qr_finder_rows(dark) >= 3 and _count_qr_finder_rows(dark.T) >= 3:
+        return "qrcode", 1.5
+
+    # Code 1D : gradients fortement orientés dans une seule direction
+    if max(dx, dy) > 3 * max(min(dx, dy), 1e-6):
+        return "linear", 1.2
+
+    return "unknown", 1.0
+
+
+def _label_components(mask: np.ndarray) -> List[List[Tuple[int, int]]]:
+    """Composantes 4-connexes d'une grille booléenne (grille de blocs, donc petite)."""
+    seen = np.zeros_like(mask, dtype=bool)
+    components = []
+    rows, cols = mask.shape
+    for r, c in zip(*np.nonzero(mask)):
+        if seen[r, c]:
+            continue
+        seen[r, c] = True
+        cells = []
+        todo = deque([(r, c)])
+        while todo:
+            cr, cc = todo.popleft()
+            cells.append((cr, cc))
+            for nr, nc in ((cr - 1, cc), (cr + 1, cc), (cr, cc - 1), (cr, cc + 1)):
+                if 0 <= nr < rows and 0 <= nc < cols and mask[nr, nc] and not seen[nr, nc]:
+                    seen[nr, nc] = True
+                    todo.append((nr, nc))
+        components.append(cells)
+    return components
+
+
+def locate_barcode_regions(gray_image: Image.Image, max_candidates: int = 4, margin: float = 0.15) -> List[CandidateRegion]:
+    """
+    Cherche les régions susceptibles de contenir un code-barres.
+
+    Args:
+        gray_image (PIL.Image): Image en mode 'L'
+        max_candidates (int): Nombre maximal de régions retournées
+        margin (float): Marge ajoutée autour de chaque région (fraction de sa taille)
+
+    Returns:
+        list: Régions candidates triées par score décroissant
+    """
+    width, height = gray_image.size
+    factor = max(1, math.ceil(max(width, height) / WORK_SIZE))
+    small = gray_image.reduce(factor) if factor > 1 else gray_image
+    pixels = np.asarray(small, dtype=np.int16)
+    if pixels.shape[0] < 2 * BLOCK_SIZE or pixels.shape[1] < 2 * BLOCK_SIZE:
+        return []
+
+    gx = np.abs(np.diff(pixels, axis=1))[:-1, :]
+    gy = np.abs(np.diff(pixels, axis=0))[:, :-1]
+    threshold = max(24.0, float(np.mean(gx) + np.mean(gy)) * 2)
+
+    grid_rows, grid_cols = gx.shape[0] // BLOCK_SIZE, gx.shape[1] // BLOCK_SIZE
+    crop_h, crop_w = grid_rows * BLOCK_SIZE, grid_cols * BLOCK_SIZE
+    density_x = (gx[:crop_h, :crop_w] > threshold).reshape(grid_rows, BLOCK_SIZE, grid_cols, BLOCK_SIZE).mean(axis=(1, 3))
+    density_y = (gy[:crop_h, :crop_w] > threshold).reshape(grid_rows, BLOCK_SIZE, grid_cols, BLOCK_SIZE).mean(axis=(1, 3))
+
+    # 2D : transitions dans les deux directions ; 1D : transitions fortes dans une seule
+    mask = (np.minimum(density_x, density_y) > 0.15) | (np.maximum(density_x, density_y) > 0.35)
+    # Dilatation d'un bloc pour réunir les modules d'un même symbole
+    dilated = mask.copy()
+    dilated[1:, :] |= mask[:-1, :]
+    dilated[:-1, :] |= mask[1:, :]
+    dilated[:, 1:] |= mask[:, :-1]
+    dilated[:, :-1] |= mask[:, 1:]
+
+    components = []
+    max_extent = 0.5 * grid_rows * grid_cols
+    for cells in _label_components(dilated):
+        if len(cells) < 4:
+            continue
+        rows = [r for r, _ in cells]
+        cols = [c for _, c in cells]
+        r0, r1, c0, c1 = min(rows), max(rows), min(cols), max(cols)
+        # Une région couvrant la moitié de l'image n'apporte rien : l'image entière reste essayée ensuite
+        if (r1 - r0 + 1) * (c1 - c0 + 1) > max_extent:
+            continue
+        block_dx = float(density_x[r0:r1 + 1, c0:c1 + 1].mean())
+        block_dy = float(density_y[r0:r1 + 1, c0:c1 + 1].mean())
+        components.append(((block_dx + block_dy) * math.sqrt(len(cells)), r0, r1, c0, c1, block_dx, block_dy))
+
+    # Seules les meilleures composantes sont qualifiées par motifs (étape la plus coûteuse)
+    components.sort(key=lambda component: component[0], reverse=True)
+    candidates = []
+    for base_score, r0, r1, c0, c1, block_dx, block_dy in components[:2 * max_candidates]:
+        top, bottom = r0 * BLOCK_SIZE, (r1 + 1) * BLOCK_SIZE + 1
+        left, right = c0 * BLOCK_SIZE, (c1 + 1) * BLOCK_SIZE + 1
+        kind, bonus = _classify(pixels[top:bottom, left:right], block_dx, block_dy)
+
+        pad_x = int((right - left) * margin) + 1
+        pad_y = int((bottom - top) * margin) + 1
+        box = (
+            int(max(0, (left - pad_x) * factor)),
+            int(max(0, (top - pad_y) * factor)),
+            int(min(width, (right + pad_x) * factor)),
+            int(min(height, (bottom + pad_y) * factor)),
+        )
+        candidates.append(CandidateRegion(box=box, score=round(base_score * bonus, 4), kind=kind))
+
+    candidates.sort(key=lambda region: region.score, reverse=True)
+    return candidates[:max_candidates]
+
+# --- END OF FILE barcode_localizer.py ---
@@ -0,0 +1,266 @@
+# --- START OF FILE config.py ---
+
+"""
+Paramètres du service, lus depuis les variables d'environnement
+(préfixe `GS1_`). Les valeurs par défaut conviennent à un conteneur unique.
+"""
+
+import os
+from typing import List
+
+
+def _env_str(name: str, default: str) -> str:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower()
+
+
+def _env_raw(name: str, default: str) -> str:
+    """Comme _env_str, sans passage en minuscules (chemins, options JVM)."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip()
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Warning: valeur invalide pour {name}={value!r}, utilisation de {default}")
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int_list(name: str, default: List[int]) -> List[int]:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    if value.strip().lower() in ("0", "none", "off"):
+        return []
+    try:
+        return [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        print(f"Warning: valeur invalide pour {name}={value!r}, utilisation de {default}")
+        return default
+
+
+def _env_str_list(name: str, default: List[str]) -> List[str]:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return [v.strip().lower() for v in value.split(",") if v.strip()]
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Warning: valeur invalide pour {name}={value!r}, utilisation de {default}")
+        return default
+
+
+# --- Pool de décodage ---
+# Nombre de threads de décodage (ZXing libère le GIL pendant les appels Java).
+DECODE_WORKERS = max(1, _env_int("GS1_DECODE_WORKERS", os.cpu_count() or 4))
+# Nombre de requêtes pouvant attendre un thread libre avant de répondre 503.
+DECODE_QUEUE_SIZE = max(0, _env_int("GS1_DECODE_QUEUE_SIZE", 32))
+# Valeur de l'en-tête Retry-After (secondes) quand la file est pleine.
+DECODE_RETRY_AFTER_S = max(1, _env_int("GS1_DECODE_RETRY_AFTER", 1))
+
+# --- Limites des uploads ---
+# Taille maximale (octets) du corps d'une requête : vérifiée sur Content-Length avant lecture,
+# puis au fil de la réception (corps chunked) ; 0 = illimité. À relever pour de gros lots ou archives.
+REQUEST_MAX_BYTES = max(0, _env_int("GS1_REQUEST_MAX_BYTES", 64 * 1024 * 1024))
+# Taille maximale (octets) d'une image uploadée, vérifiée au fil de la lecture ; 0 = illimité.
+UPLOAD_MAX_BYTES = max(0, _env_int("GS1_UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+# Taille (octets) jusqu'à laquelle une partie multipart reste en mémoire : au-delà, Starlette
+# la déverse dans un fichier temporaire (1 Mo par défaut, trop peu pour une photo de 3-4 Mo).
+UPLOAD_SPOOL_MAX_BYTES = max(1024 * 1024, _env_int("GS1_UPLOAD_SPOOL_MAX_BYTES", 16 * 1024 * 1024))
+# Nombre maximal de pixels d'une image, vérifié dès la lecture de l'en-tête ; 0 = illimité.
+IMAGE_MAX_PIXELS = max(0, _env_int("GS1_IMAGE_MAX_PIXELS", 40_000_000))
+# Image trop grande : "downscale" (réduite avant décodage) ou "reject" (réponse 413).
+IMAGE_OVERSIZE = _env_str("GS1_IMAGE_OVERSIZE", "downscale")
+if IMAGE_OVERSIZE not in ("downscale", "reject"):
+    print(f"Warning: GS1_IMAGE_OVERSIZE={IMAGE_OVERSIZE!r} inconnu, utilisation de 'downscale'")
+    IMAGE_OVERSIZE = "downscale"
+# Pixels réellement décompressés au maximum avant réduction (protection contre les
+# bombes de décompression) : un JPEG est réduit pendant la décompression, les autres
+# formats doivent être décompressés entièrement avant d'être réduits.
+IMAGE_MAX_DECODE_PIXELS = max(IMAGE_MAX_PIXELS, _env_int("GS1_IMAGE_MAX_DECODE_PIXELS", 64_000_000))
+
+# --- Décodage par lot (/decode/batch) ---
+# Images d'un même lot décodées simultanément (le reste attend, sans remplir la file du pool).
+DECODE_BATCH_CONCURRENCY = max(1, _env_int("GS1_DECODE_BATCH_CONCURRENCY", DECODE_WORKERS))
+# Nombre maximal d'images par requête.
+DECODE_BATCH_MAX_FILES = max(1, _env_int("GS1_DECODE_BATCH_MAX_FILES", 1000))
+
+# --- Décodage d'archives ZIP/TAR (/decode/archive) ---
+# Images de l'archive décodées simultanément (et donc présentes à la fois en mémoire).
+DECODE_ARCHIVE_CONCURRENCY = max(1, _env_int("GS1_DECODE_ARCHIVE_CONCURRENCY", DECODE_WORKERS))
+# Taille décompressée maximale d'une image de l'archive.
+DECODE_ARCHIVE_MAX_MEMBER_BYTES = max(1, _env_int("GS1_DECODE_ARCHIVE_MAX_MEMBER_BYTES", 50 * 1024 * 1024))
+
+# --- Images déposées (/images puis /decode/{id}) ---
+# Taille cumulée maximale (octets, 1 par pixel) des images conservées en niveaux de gris.
+IMAGE_STORE_MAX_BYTES = max(1, _env_int("GS1_IMAGE_STORE_MAX_BYTES", 256 * 1024 * 1024))
+# Durée de vie (secondes) d'une image depuis sa dernière utilisation.
+IMAGE_STORE_TTL_S = max(1.0, _env_float("GS1_IMAGE_STORE_TTL", 300.0))
+
+# --- Mode de décodage ---
+# "thread" : JVM unique dans le processus API (défaut).
+# "process" : ferme de processus, une JVM par worker (voir decode_farm.py).
+# "server" : serveur ZXing local partagé par tous les workers uvicorn (voir zxing_server.py).
+DECODE_MODE = _env_str("GS1_DECODE_MODE", "thread")
+DECODE_PROCESSES = max(1, _env_int("GS1_DECODE_PROCESSES", os.cpu_count() or 4))
+# Délai (secondes) au-delà duquel un worker de la ferme est tué puis redémarré.
+DECODE_TASK_TIMEOUT_S = max(1.0, _env_float("GS1_DECODE_TASK_TIMEOUT", 30.0))
+
+# --- Serveur ZXing partagé (GS1_DECODE_MODE=server) ---
+# Socket Unix du serveur (`python -m app.zxing_server`).
+# Par défaut dans un répertoire privé (0700) : $XDG_RUNTIME_DIR/gs1-decoder, sinon /tmp/gs1-decoder-<uid>.
+ZXING_SERVER_SOCKET = _env_raw("GS1_ZXING_SERVER_SOCKET", os.path.join(
+    os.path.join(os.environ["XDG_RUNTIME_DIR"], "gs1-decoder") if os.environ.get("XDG_RUNTIME_DIR")
+    else f"/tmp/gs1-decoder-{os.getuid()}",
+    "zxing.sock",
+))
+# Clé partagée d'authentification des connexions au serveur. Vide : clé aléatoire générée
+# au premier démarrage dans `<socket>.key` (0600), lue par le serveur et les workers.
+ZXING_SERVER_AUTHKEY = _env_raw("GS1_ZXING_SERVER_AUTHKEY", "")
+# Décodages simultanés dans le serveur (une JVM, plusieurs threads).
+ZXING_SERVER_THREADS = max(1, _env_int("GS1_ZXING_SERVER_THREADS", os.cpu_count() or 4))
+# Lancer le serveur s'il ne répond pas (un seul worker uvicorn le fait, les autres attendent),
+# y compris pour le relancer après un plantage. False : serveur géré à part (systemd, compose...).
+ZXING_SERVER_SPAWN = _env_bool("GS1_ZXING_SERVER_SPAWN", True)
+# Délai d'attente (secondes) du démarrage du serveur (JVM + préchauffage).
+ZXING_SERVER_STARTUP_TIMEOUT_S = max(1.0, _env_float("GS1_ZXING_SERVER_STARTUP_TIMEOUT", 120.0))
+
+# --- JVM embarquée (ZXing via JPype) ---
+# Tailles de tas (-Xms/-Xmx) et de pile des threads (-Xss), ex. "256m". Vides : choix
+# de la JVM, qui prend par défaut 1/4 de la mémoire du conteneur pour CHAQUE JVM :
+# à borner en mode "process" (une JVM par worker).
+JVM_HEAP_MIN = _env_str("GS1_JVM_XMS", "")
+JVM_HEAP_MAX = _env_str("GS1_JVM_XMX", "")
+JVM_THREAD_STACK = _env_str("GS1_JVM_XSS", "")
+# Ramasse-miettes : "serial", "parallel", "g1", "z", "shenandoah" (vide : choix de la JVM).
+JVM_GC = _env_str("GS1_JVM_GC", "")
+# Options supplémentaires passées telles quelles (séparées par des espaces).
+JVM_OPTIONS = _env_raw("GS1_JVM_OPTIONS", "")
+# Archive AppCDS des classes ZXing (générée par `python -m app.jvm_cds`) ; ignorée si absente.
+JVM_CDS_ARCHIVE = _env_raw("GS1_JVM_CDS_ARCHIVE", "")
+
+# --- Moteurs de décodage (voir decoder_backends.py) ---
+# Ordre d'essai des moteurs : zxing_jpype, pylibdmtx, zxing_cpp (optionnel), pyzbar (optionnel).
+DECODERS = _env_str_list("GS1_DECODERS", ["zxing_jpype", "pylibdmtx"])
+# Ordre propre à une symbologie, utilisé quand elle est la seule demandée (scan_types).
+DECODERS_BY_FORMAT = {
+    fmt: _env_str_list(f"GS1_DECODERS_{fmt}", [])
+    for fmt in ("DATAMATRIX", "QR_CODE", "CODE_128")
+}
+
+# --- Préchauffage du JIT (voir warmup.py) ---
+# Passes de décodage d'images synthétiques (DataMatrix, QR, Code 128) faites au
+# démarrage, avant que /decode soit déclaré prêt. 0 désactive le préchauffage.
+WARMUP_ITERATIONS = max(0, _env_int("GS1_WARMUP_ITERATIONS", 20))
+
+# --- Pyramide de résolutions ---
+# Côtés longs (pixels) essayés avant la pleine résolution, du plus petit au plus grand.
+# "none" désactive la pyramide (décodage direct en pleine résolution).
+DECODE_PYRAMID_LEVELS = sorted(v for v in _env_int_list("GS1_DECODE_PYRAMID", [1024, 2048]) if v > 0)
+# Chargement réduit des JPEG (draft PIL, facteurs 1/2, 1/4, 1/8) : l'image est d'abord
+# décodée à une résolution dont le côté long vaut au moins cette valeur ; la pleine
+# résolution n'est chargée que si rien n'est trouvé. 0 désactive le chargement réduit.
+DECODE_JPEG_DRAFT_SIDE = max(0, _env_int("GS1_DECODE_JPEG_DRAFT_SIDE", 1024))
+
+# --- Localisation des régions candidates ---
+# Recherche des zones de code-barres (NumPy) avant d'appeler les décodeurs.
+# Désactivée par défaut : le classement des régions (datamatrix, qrcode...) n'est pas encore fiable.
+DECODE_LOCALIZE = _env_bool("GS1_DECODE_LOCALIZE", False)
+DECODE_LOCALIZE_CANDIDATES = max(1, _env_int("GS1_DECODE_LOCALIZE_CANDIDATES", 4))
+# Budget total (ms) des passes rapides sur les régions candidates, avant l'image entière.
+DECODE_LOCALIZE_BUDGET_MS = max(0, _env_int("GS1_DECODE_LOCALIZE_BUDGET_MS", 300))
+# Marge ajoutée autour de chaque région, en fraction de sa taille.
+DECODE_LOCALIZE_MARGIN = max(0.0, _env_float("GS1_DECODE_LOCALIZE_MARGIN", 0.15))
+
+# --- Stratégie de décodage ---
+# "sequential" : ZXing puis fallback pylibdmtx (défaut).
+# "race" : ZXing, pylibdmtx et les lecteurs ZXing dédiés (DataMatrix, QR, Code 128)
+# tournent en parallèle sur le même buffer ; le premier résultat valide gagne.
+DECODE_STRATEGY = _env_str("GS1_DECODE_STRATEGY", "sequential")
+if DECODE_STRATEGY not in ("sequential", "race"):
+    print(f"Warning: GS1_DECODE_STRATEGY={DECODE_STRATEGY!r} inconnue, utilisation de 'sequential'")
+    DECODE_STRATEGY = "sequential"
+# Effort par défaut : "fast", "balanced" ou "thorough" (voir decode_pipeline.EFFORT_STAGES).
+DECODE_EFFORT = _env_str("GS1_DECODE_EFFORT", "balanced")
+if DECODE_EFFORT not in ("fast", "balanced", "thorough"):
+    print(f"Warning: GS1_DECODE_EFFORT={DECODE_EFFORT!r} inconnu, utilisation de 'balanced'")
+    DECODE_EFFORT = "balanced"
+# Threads réservés aux moteurs lancés en parallèle par la stratégie "race".
+DECODE_RACE_WORKERS = max(2, _env_int("GS1_DECODE_RACE_WORKERS", 5 * DECODE_WORKERS))
+# Moteurs d'une même requête lancés en même temps par la stratégie "race" (les suivants attendent).
+DECODE_RACE_MAX_ENGINES = max(1, _env_int("GS1_DECODE_RACE_MAX_ENGINES", 3))
+
+# --- Cache des résultats de décodage ---
+# Taille maximale estimée (octets) du cache par empreinte de contenu ; 0 désactive le cache.
+DECODE_CACHE_MAX_BYTES = max(0, _env_int("GS1_DECODE_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+# Durée de vie (secondes) d'une entrée du cache.
+DECODE_CACHE_TTL_S = max(1.0, _env_float("GS1_DECODE_CACHE_TTL", 600.0))
+# Cache optionnel des quasi-doublons (empreinte perceptuelle) pour les tunnels à caméra fixe.
+# Attention : un hit renvoie le résultat d'une AUTRE image jugée identique, sans la décoder. À
+# réserver aux flux où deux images proches portent forcément la même étiquette.
+NEAR_DUP_CACHE = _env_bool("GS1_NEAR_DUP_CACHE", False)
+# Empreinte : "dhash" (différences entre voisins) ou "ahash" (comparaison à la moyenne).
+NEAR_DUP_HASH = _env_str("GS1_NEAR_DUP_HASH", "dhash")
+if NEAR_DUP_HASH not in ("dhash", "ahash"):
+    print(f"Warning: GS1_NEAR_DUP_HASH={NEAR_DUP_HASH!r} inconnu, utilisation de 'dhash'")
+    NEAR_DUP_HASH = "dhash"
+# Distance de Hamming maximale (sur 64 bits) entre deux images considérées identiques.
+NEAR_DUP_MAX_DISTANCE = max(0, _env_int("GS1_NEAR_DUP_MAX_DISTANCE", 6))
+# Écart moyen maximal (niveaux de gris, miniature 32x32) de la zone de chaque code déjà lu
+# (l'image entière si sa position est inconnue) pour confirmer un quasi-doublon.
+NEAR_DUP_MAX_REGION_DIFF = max(0.0, _env_float("GS1_NEAR_DUP_MAX_REGION_DIFF", 4.0))
+# Durée de vie courte (secondes) : seules les images très récentes sont réutilisées.
+NEAR_DUP_TTL_S = max(0.1, _env_float("GS1_NEAR_DUP_TTL", 3.0))
+NEAR_DUP_MAX_ENTRIES = max(1, _env_int("GS1_NEAR_DUP_MAX_ENTRIES", 64))
+
+# --- Budget de temps ---
+# Budget (ms) d'une requête de décodage, partagé par toutes les étapes ; 0 = illimité.
+# Illimité par défaut, comme avant l'introduction du budget : à fixer (ex. 5000) pour borner la latence.
+DECODE_DEADLINE_MS = max(0, _env_int("GS1_DECODE_DEADLINE_MS", 0))
+# Timeout maximal (ms) d'un appel libdmtx, réduit au temps restant du budget.
+DMTX_TIMEOUT_MS = max(1, _env_int("GS1_DMTX_TIMEOUT_MS", 500))
+
+# --- Images multi-frames (GIF/TIFF animés, MJPEG) ---
+# Nombre maximal de frames examinées dans une même image.
+DECODE_MAX_FRAMES = max(1, _env_int("GS1_DECODE_MAX_FRAMES", 100))
+# Ignorer les frames quasi identiques à la dernière frame décodée (défaut de `skip_similar_frames`).
+DECODE_SKIP_SIMILAR_FRAMES = _env_bool("GS1_DECODE_SKIP_SIMILAR_FRAMES", True)
+# Distance de Hamming maximale (dHash 64 bits) entre deux frames considérées identiques.
+DECODE_FRAME_SIMILARITY = max(0, _env_int("GS1_DECODE_FRAME_SIMILARITY", 3))
+
+# --- Scan continu par WebSocket (/ws/scan) ---
+# Budget (ms) du décodage d'une frame : une frame en direct est vite périmée ; 0 = illimité.
+SCAN_DEADLINE_MS = max(0, _env_int("GS1_SCAN_DEADLINE_MS", 1000))
+# Fenêtre (secondes) pendant laquelle une relecture du même code n'est pas renvoyée.
+SCAN_DEDUP_WINDOW_S = max(0.0, _env_float("GS1_SCAN_DEDUP_WINDOW", 2.0))
+# Taille maximale (octets) d'une frame ; au-delà la connexion est fermée (code 1009).
+SCAN_MAX_FRAME_BYTES = max(1, _env_int("GS1_SCAN_MAX_FRAME_BYTES", 10 * 1024 * 1024))
+
+# --- Métriques (GET /metrics, format Prometheus) ---
+# Durées par étape et compteurs (décodeurs, symbologies, échecs). False : aucune mesure n'est enregistrée.
+METRICS_ENABLED = _env_bool("GS1_METRICS", True)
+
+# --- END OF FILE config.py ---
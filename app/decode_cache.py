@@ -0,0 +1,293 @@
+# --- START OF FILE decode_cache.py ---
+
+"""
+Cache en mémoire des résultats de décodage, indexé par l'empreinte SHA-256
+des octets uploadés (et les options qui changent le résultat).
+Les stations renvoient souvent la même photo (retries, double-clics, files
+hors ligne rejouées) : un hit évite entièrement la JVM. Seuls les contenus
+bruts, les décodeurs et les indications de format sont conservés ; le parsing
+GS1 et les infos décodeur sont refaits à chaque requête selon la verbosité.
+Éviction LRU, bornée en octets, avec une durée de vie (TTL) par entrée.
+
+Les tunnels à caméra fixe envoient des images successives de la même
+étiquette qui ne diffèrent que par le bruit du capteur : le cache de
+quasi-doublons (optionnel) les reconnaît par empreinte perceptuelle
+(aHash/dHash, voir image_hash.py) et distance de Hamming, puis vérifie que
+la zone de chaque code (l'image entière si les positions sont inconnues)
+est quasi identique avant de reprendre le résultat.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app import config
+from app.decode_pipeline import DecodeOptions, DecodeOutcome
+from app.image_hash import PERCEPTUAL_HASHES, hamming_distance
+
+# Coût fixe estimé d'une entrée (clé, structures Python) et d'un symbole.
+_ENTRY_OVERHEAD = 512
+_SYMBOL_OVERHEAD = 128
+
+# Côté des miniatures comparées pixel à pixel pour confirmer un quasi-doublon.
+_VERIFY_SIZE = 32
+
+
+def new_content_hasher():
+    """Empreinte à alimenter au fil de la réception de l'upload."""
+    return hashlib.sha256()
+
+
+def cache_key(digest: str, options: DecodeOptions) -> str:
+    """Clé de cache : empreinte du contenu + options influant sur le résultat."""
+    scan_types = ",".join(sorted(t.value for t in options.scan_types)) if options.scan_types else "*"
+    effort = options.effort.value if options.effort else config.DECODE_EFFORT
+    # La stratégie change le moteur gagnant (race) et donc les infos décodeur de la réponse
+    strategy = options.strategy.value if options.strategy else config.DECODE_STRATEGY
+    skip_similar = config.DECODE_SKIP_SIMILAR_FRAMES if options.skip_similar_frames is None else options.skip_similar_frames
+    return f"{digest}|{scan_types}|{int(options.multi)}|{effort}|{strategy}|{int(skip_similar)}"
+
+
+def _copy_outcome(outcome: DecodeOutcome) -> DecodeOutcome:
+    """
+    Copie indépendante : les détails d'une réponse ne doivent pas modifier l'entrée en cache.
+    Les durées d'étapes ne sont pas reprises : un résultat servi par le cache n'a pas été décodé.
+    """
+    return replace(outcome, symbols=[replace(s) for s in outcome.symbols], details=dict(outcome.details), timings=[])
+
+
+def _outcome_size(outcome: DecodeOutcome) -> int:
+    size = _ENTRY_OVERHEAD + len(outcome.zxing_error or "")
+    for symbol in outcome.symbols:
+        size += _SYMBOL_OVERHEAD + len(symbol.raw.encode("utf-8")) + len(symbol.format_hint or "")
+    return size
+
+
+class DecodeResultCache:
+    """
+    Cache LRU/TTL des résultats de décodage, borné en octets.
+
+    Args:
+        max_bytes (int): Taille maximale estimée du cache (0 désactive le cache)
+        ttl_s (float): Durée de vie d'une entrée en secondes
+    """
+
+    def __init__(self, max_bytes: int, ttl_s: float):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, int, DecodeOutcome]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: str) -> Optional[DecodeOutcome]:
+        """Retourne une copie du résultat en cache (None si absent ou expiré)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            outcome = entry[2]
+        return _copy_outcome(outcome)
+
+    def put(self, key: str, outcome: DecodeOutcome):
+        """Mémorise un résultat complet ; un décodage interrompu par le budget n'est pas mis en cache."""
+        if not self.enabled or outcome.timed_out:
+            return
+        stored = _copy_outcome(outcome)
+        size = _outcome_size(stored)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_s, size, stored)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def _drop(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+# --- Cache de quasi-doublons (empreintes perceptuelles) ---
+
+_Box = Optional[Tuple[int, int, int, int]]
+
+
+def _near_duplicate_options_key(options: DecodeOptions, image_size: Tuple[int, int]) -> str:
+    """
+    Clé des options d'un quasi-doublon : taille de l'image et toutes les
+    options qui changent le résultat ou les positions renvoyées.
+    """
+    scan_types = ",".join(sorted(t.value for t in options.scan_types)) if options.scan_types else "*"
+    effort = options.effort.value if options.effort else config.DECODE_EFFORT
+    strategy = options.strategy.value if options.strategy else config.DECODE_STRATEGY
+    roi = ",".join(map(str, options.roi)) if options.roi else "*"
+    return f"{image_size[0]}x{image_size[1]}|{scan_types}|{int(options.multi)}|{effort}|{strategy}|{roi}"
+
+
+def _verification_boxes(outcome: DecodeOutcome, image_size: Tuple[int, int]) -> List[_Box]:
+    """Zones à comparer : celle de chaque code trouvé, l'image entière (None) si aucune n'est connue."""
+    width, height = image_size
+    boxes: List[_Box] = []
+    for symbol in outcome.symbols:
+        if symbol.position is None:
+            continue
+        left, top, right, bottom = symbol.position
+        left, top, right, bottom = max(0, left), max(0, top), min(width, right), min(height, bottom)
+        if right > left and bottom > top:
+            boxes.append((left, top, right, bottom))
+    return boxes or [None]
+
+
+def _thumbnail(gray_image: Image.Image, box: _Box) -> np.ndarray:
+    region = gray_image.crop(box) if box is not None else gray_image
+    return np.asarray(region.resize((_VERIFY_SIZE, _VERIFY_SIZE), Image.BOX), dtype=np.int16)
+
+
+class NearDuplicateCache:
+    """
+    Cache à courte durée de vie des derniers décodages réussis, retrouvés par
+    empreinte perceptuelle à une distance de Hamming maximale près. Un candidat
+    n'est servi que si la zone de chaque code qu'il contient (l'image entière
+    si les positions sont inconnues) diffère en moyenne de moins de
+    `max_region_diff` niveaux de gris, sur une miniature qui moyenne le bruit.
+    Un hit renvoie le résultat d'une autre image, jugée identique.
+
+    Args:
+        max_entries (int): Nombre d'empreintes conservées (les plus récentes)
+        ttl_s (float): Durée de vie d'une entrée en secondes
+        max_distance (int): Distance de Hamming maximale (sur 64 bits) d'un quasi-doublon
+        algorithm (str): "dhash" ou "ahash"
+        max_region_diff (float): Écart moyen maximal (niveaux de gris) des zones vérifiées
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, max_distance: int, algorithm: str = "dhash",
+                 max_region_diff: float = 4.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_distance = max_distance
+        self.algorithm = algorithm
+        self.max_region_diff = max_region_diff
+        self._hash = PERCEPTUAL_HASHES[algorithm]
+        # (empreinte, options) -> (expiration, date, résultat, miniatures des zones vérifiées)
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, float, DecodeOutcome, List[Tuple[_Box, np.ndarray]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._rejected = 0
+
+    def _regions_match(self, gray_image: Image.Image, regions: List[Tuple[_Box, np.ndarray]]) -> bool:
+        for box, thumbnail in regions:
+            if float(np.abs(_thumbnail(gray_image, box) - thumbnail).mean()) > self.max_region_diff:
+                return False
+        return True
+
+    def _lookup(self, gray_image: Image.Image, image_hash: int, options_key: str) -> Optional[Tuple[DecodeOutcome, int, float]]:
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[0] < now]:
+                del self._entries[key]
+            candidates = []
+            for (entry_hash, entry_options), (_, stored_at, outcome, regions) in self._entries.items():
+                if entry_options != options_key:
+                    continue
+                distance = hamming_distance(image_hash, entry_hash)
+                if distance <= self.max_distance:
+                    candidates.append((distance, stored_at, outcome, regions))
+        # Les empreintes proches ne sont qu'un indice : les zones des codes doivent aussi correspondre
+        candidates.sort(key=lambda candidate: candidate[0])
+        rejected = 0
+        for distance, stored_at, outcome, regions in candidates:
+            if self._regions_match(gray_image, regions):
+                with self._lock:
+                    self._hits += 1
+                    self._rejected += rejected
+                return _copy_outcome(outcome), distance, now - stored_at
+            rejected += 1
+        with self._lock:
+            self._misses += 1
+            self._rejected += rejected
+        return None
+
+    def _store(self, gray_image: Image.Image, image_hash: int, options_key: str, outcome: DecodeOutcome):
+        now = time.monotonic()
+        stored = _copy_outcome(outcome)
+        regions = [(box, _thumbnail(gray_image, box)) for box in _verification_boxes(stored, gray_image.size)]
+        with self._lock:
+            key = (image_hash, options_key)
+            self._entries.pop(key, None)
+            self._entries[key] = (now + self.ttl_s, now, stored, regions)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def decode_through(self, gray_image: Image.Image, options: DecodeOptions,
+                       decode: Callable[[Image.Image], DecodeOutcome], logf=None) -> DecodeOutcome:
+        """
+        Sert un quasi-doublon récent s'il existe, sinon appelle `decode(gray_image)`
+        et mémorise le résultat s'il contient au moins un code.
+        """
+        image_hash = self._hash(gray_image)
+        options_key = _near_duplicate_options_key(options, gray_image.size)
+        found = self._lookup(gray_image, image_hash, options_key)
+        if found is not None:
+            outcome, distance, age_s = found
+            outcome.details["near_duplicate"] = {"distance": distance, "age_ms": round(age_s * 1000, 1)}
+            if logf: logf.write(f"[DEBUG] Near-duplicate of a frame decoded {age_s * 1000:.0f} ms ago (distance {distance}); skipping decoders.\n")
+            return outcome
+
+        outcome = decode(gray_image)
+        if outcome.symbols and not outcome.timed_out:
+            self._store(gray_image, image_hash, options_key, outcome)
+        return outcome
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "algorithm": self.algorithm,
+                "entries": len(self._entries),
+                "max_distance": self.max_distance,
+                "max_region_diff": self.max_region_diff,
+                "hits": self._hits,
+                "misses": self._misses,
+                "rejected": self._rejected,
+            }
+
+# --- END OF FILE decode_cache.py ---
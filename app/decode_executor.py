@@ -0,0 +1,106 @@
+# --- START OF FILE decode_executor.py ---
+
+"""
+Pool de threads dédié au décodage d'images.
+Sort les appels bloquants (PIL, ZXing via JPype, libdmtx) de la boucle
+d'événements, avec une file d'attente bornée : au-delà de la capacité,
+la soumission échoue immédiatement (l'API répond alors 503 + Retry-After).
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app import zxing_bridge
+
+
+class DecodeQueueFullError(Exception):
+    """Levée quand le pool de décodage et sa file d'attente sont saturés."""
+
+
+class DecodeExecutor:
+    """
+    Pool de threads borné pour le décodage.
+
+    Args:
+        max_workers (int): Nombre de threads de décodage
+        queue_size (int): Nombre de tâches pouvant attendre un thread libre
+    """
+
+    def __init__(self, max_workers: int, queue_size: int):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gs1-decode")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait_s = 0.0
+        self._max_wait_s = 0.0
+        self._last_wait_s = 0.0
+
+    def _run_task(self, enqueued_at: float, fn: Callable, args, kwargs):
+        wait_s = time.perf_counter() - enqueued_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._last_wait_s = wait_s
+            self._total_wait_s += wait_s
+            self._max_wait_s = max(self._max_wait_s, wait_s)
+        try:
+            zxing_bridge.attach_current_thread()
+            return fn(*args, **kwargs), wait_s
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Exécute `fn(*args, **kwargs)` dans le pool et attend son résultat.
+
+        Returns:
+            tuple: (résultat de fn, temps d'attente en file en secondes)
+
+        Raises:
+            DecodeQueueFullError: Si tous les threads sont occupés et la file pleine
+        """
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.queue_size:
+                self._rejected += 1
+                raise DecodeQueueFullError(
+                    f"Decode pool saturated ({self._running} running, {self._queued} queued)"
+                )
+            self._queued += 1
+        enqueued_at = time.perf_counter()
+        try:
+            future = self._pool.submit(self._run_task, enqueued_at, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            raise
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Profondeur de file, occupation et temps d'attente du pool."""
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "workers": self.max_workers,
+                "queue_capacity": self.queue_size,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_ms_last": round(self._last_wait_s * 1000, 2),
+                "wait_ms_avg": round(self._total_wait_s * 1000 / started, 2) if started else 0.0,
+                "wait_ms_max": round(self._max_wait_s * 1000, 2),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+# --- END OF FILE decode_executor.py ---
@@ -0,0 +1,327 @@
+# --- START OF FILE decode_farm.py ---
+
+"""
+Ferme de décodage multi-processus (mode optionnel `GS1_DECODE_MODE=process`).
+Chaque processus worker démarre sa propre JVM avec les classes ZXing déjà
+importées, ce qui permet d'exploiter tous les cœurs de la machine.
+
+Les pixels en niveaux de gris sont transmis via un segment de mémoire
+partagée propre à chaque worker (réutilisé d'une requête à l'autre) : seuls
+les dimensions et les options transitent par le pipe. Un worker qui plante
+ou dépasse le délai imparti est tué puis remplacé en arrière-plan ; une
+requête n'attend un worker libre que jusqu'à son instant limite.
+"""
+
+import io
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from app.decode_pipeline import DecodeOptions, DecodeOutcome, decode_bytes_with, time_left_s
+from app.decoder_backends import jvm_required
+
+# Taille initiale des segments partagés (12 MP en niveaux de gris), agrandis au besoin.
+_INITIAL_BUFFER_SIZE = 12 * 1024 * 1024
+
+
+class DecodeWorkerError(Exception):
+    """Levée quand un worker de décodage (ou le serveur ZXing partagé) plante ou ne répond pas à temps."""
+
+
+class DecodeWorkerBusyError(DecodeWorkerError):
+    """Levée quand aucun worker ne se libère (ou n'a fini de démarrer) avant l'instant limite de la requête."""
+
+
+def _worker_main(conn):
+    """Boucle principale d'un processus worker : une JVM, des tâches via le pipe."""
+    from app import config, zxing_bridge
+    from app.decode_pipeline import run_decode
+    from app.warmup import run_warmup
+
+    if jvm_required():
+        zxing_bridge.start_jvm()
+    # Chaque worker a sa propre JVM, donc son propre JIT à préchauffer avant d'être déclaré prêt
+    warmup = run_warmup(config.WARMUP_ITERATIONS)
+    conn.send(("ready", zxing_bridge.is_available(), warmup))
+
+    attached: Dict[str, shared_memory.SharedMemory] = {}
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        shm_name, width, height, options, want_log = message
+        logf = io.StringIO() if want_log else None
+        try:
+            shm = attached.get(shm_name)
+            if shm is None:
+                for old in attached.values():
+                    old.close()
+                attached = {shm_name: shared_memory.SharedMemory(name=shm_name)}
+                shm = attached[shm_name]
+            gray_image = Image.frombytes("L", (width, height), bytes(shm.buf[:width * height]))
+            outcome = run_decode(gray_image, options, logf)
+            conn.send(("ok", outcome, logf.getvalue() if logf else None))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", logf.getvalue() if logf else None))
+
+    for shm in attached.values():
+        shm.close()
+
+
+class _FarmWorker:
+    """Un processus worker, son pipe et son segment de mémoire partagée."""
+
+    def __init__(self, ctx, index: int, buffer_size: int):
+        self.index = index
+        self.shm = shared_memory.SharedMemory(create=True, size=buffer_size)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), name=f"gs1-decode-{index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jvm_ok: Optional[bool] = None
+        self.warmup: Optional[Dict[str, Any]] = None
+
+    def wait_ready(self, timeout_s: float) -> bool:
+        try:
+            if self.jvm_ok is None and self.conn.poll(timeout_s):
+                _, self.jvm_ok, self.warmup = self.conn.recv()
+        except (EOFError, OSError):
+            self.jvm_ok = False
+        return bool(self.jvm_ok)
+
+    def ensure_capacity(self, size: int):
+        if size > self.shm.size:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+    def stop(self, timeout_s: float = 2.0):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout_s)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(1.0)
+        self.conn.close()
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class RemoteDecoder:
+    """
+    Décodage délégué à un autre processus (ferme de workers, serveur ZXing
+    partagé) : les sous-classes fournissent `decode(image, options, want_log)`.
+    """
+
+    def decode(self, gray_image: Image.Image, options: Optional[DecodeOptions] = None, want_log: bool = False) -> Tuple[DecodeOutcome, Optional[str]]:
+        raise NotImplementedError
+
+    def decode_image_bytes(self, image_bytes: bytes, options: Optional[DecodeOptions] = None, logf=None,
+                           near_duplicates=None) -> DecodeOutcome:
+        """
+        Équivalent de `decode_pipeline.decode_image_bytes` hors processus :
+        l'image est chargée ici (frame par frame si elle en a plusieurs, d'abord
+        à résolution réduite pour un grand JPEG) puis décodée à distance. Le
+        journal distant est recopié dans `logf`. Le budget de temps des options est
+        vérifié ici avant le chargement, puis à distance à chaque étape.
+
+        Raises:
+            ImageLoadError: Si les octets ne forment pas une image lisible
+            DecodeWorkerError: Si le décodage distant échoue
+        """
+        return decode_bytes_with(image_bytes, options, self.decode_image, logf, near_duplicates)
+
+    def decode_image(self, gray_image: Image.Image, options: Optional[DecodeOptions] = None, logf=None) -> DecodeOutcome:
+        """
+        Équivalent de `decode_pipeline.run_decode` hors processus : décode une
+        image déjà chargée et recopie le journal distant dans `logf`.
+
+        Raises:
+            DecodeWorkerError: Si le décodage distant échoue
+        """
+        outcome, log_text = self.decode(gray_image, options, want_log=logf is not None)
+        if logf and log_text:
+            logf.write(log_text)
+        return outcome
+
+
+class DecodeFarm(RemoteDecoder):
+    """
+    Pool de processus de décodage, une JVM par processus.
+
+    Args:
+        processes (int): Nombre de processus workers
+        task_timeout_s (float): Délai au-delà duquel un worker est considéré bloqué
+        startup_timeout_s (float): Délai d'attente du démarrage des JVM
+    """
+
+    def __init__(self, processes: int, task_timeout_s: float, startup_timeout_s: float = 60.0):
+        self.processes = processes
+        self.task_timeout_s = task_timeout_s
+        self.startup_timeout_s = startup_timeout_s
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_FarmWorker]" = queue.Queue()
+        self._workers: List[_FarmWorker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._started = threading.Event()
+        self._restarts = 0
+        self._tasks = 0
+        self._failures = 0
+
+    def start(self):
+        started_at = time.perf_counter()
+        self._workers = [_FarmWorker(self._ctx, i, _INITIAL_BUFFER_SIZE) for i in range(self.processes)]
+        for worker in self._workers:
+            if not worker.wait_ready(self.startup_timeout_s) and jvm_required():
+                print(f"Warning: decode worker {worker.index} started without a working JVM.")
+            self._idle.put(worker)
+        self._started.set()
+        print(f"Decode farm ready: {self.processes} processes in {time.perf_counter() - started_at:.2f}s.")
+
+    def _respawn(self, worker: _FarmWorker, reason: str):
+        """
+        Tue un worker planté ou bloqué et le remplace en arrière-plan : la
+        requête en cours n'attend pas le démarrage de la nouvelle JVM, qui
+        rejoint les workers libres une fois prête.
+        """
+        print(f"Warning: restarting decode worker {worker.index} ({reason}).")
+        buffer_size = worker.shm.size
+        worker.kill()
+        threading.Thread(target=self._start_replacement, args=(worker, buffer_size),
+                         name=f"gs1-decode-respawn-{worker.index}", daemon=True).start()
+
+    def _start_replacement(self, worker: _FarmWorker, buffer_size: int):
+        if self._closed:
+            return
+        # Lancement du processus hors verrou : stats() et shutdown() ne l'attendent pas
+        replacement = _FarmWorker(self._ctx, worker.index, buffer_size)
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._workers[self._workers.index(worker)] = replacement
+                self._restarts += 1
+        if closed:
+            replacement.kill()
+            return
+        if not replacement.wait_ready(self.startup_timeout_s) and jvm_required():
+            print(f"Warning: decode worker {replacement.index} restarted without a working JVM.")
+        # Ferme arrêtée entre-temps : le remplaçant figurait dans la liste, shutdown() l'a arrêté
+        if not self._closed:
+            self._idle.put(replacement)
+
+    def _acquire(self, options: Optional[DecodeOptions]) -> _FarmWorker:
+        """
+        Prend un worker libre, en attendant au plus le temps restant de la
+        requête (GS1_DECODE_TASK_TIMEOUT sans limite). Pendant le démarrage de
+        la ferme, chaque worker rejoint la file dès que sa JVM est prête. Un
+        worker mort pendant qu'il était libre est remplacé en arrière-plan et
+        un autre est attendu.
+
+        Raises:
+            DecodeWorkerBusyError: Si aucun worker n'est libre à temps
+        """
+        left = time_left_s(options) if options is not None else None
+        give_up_at = time.monotonic() + (self.task_timeout_s if left is None else max(0.0, left))
+        while True:
+            try:
+                worker = self._idle.get(timeout=max(0.0, give_up_at - time.monotonic()))
+            except queue.Empty:
+                if not self._started.is_set():
+                    raise DecodeWorkerBusyError("Decode workers are still starting") from None
+                raise DecodeWorkerBusyError("No decode worker available before the deadline") from None
+            if worker.process.is_alive():
+                return worker
+            self._respawn(worker, "process died while idle")
+
+    def decode(self, gray_image: Image.Image, options: Optional[DecodeOptions] = None, want_log: bool = False) -> Tuple[DecodeOutcome, Optional[str]]:
+        """
+        Décode une image en niveaux de gris dans un processus worker.
+
+        Returns:
+            tuple: (DecodeOutcome, journal de debug du worker ou None)
+
+        Raises:
+            DecodeWorkerBusyError: Si aucun worker ne se libère avant l'instant limite
+            DecodeWorkerError: Si le worker plante, échoue ou dépasse le délai
+        """
+        worker = self._acquire(options)
+        try:
+            width, height = gray_image.size
+            size = width * height
+            worker.ensure_capacity(size)
+            worker.shm.buf[:size] = gray_image.tobytes()
+            with self._lock:
+                self._tasks += 1
+
+            try:
+                worker.conn.send((worker.shm.name, width, height, options, want_log))
+                if not worker.conn.poll(self.task_timeout_s):
+                    self._respawn(worker, f"no answer after {self.task_timeout_s}s")
+                    worker = None
+                    raise DecodeWorkerError(f"Decode worker timed out after {self.task_timeout_s}s")
+                status, payload, log_text = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                self._respawn(worker, f"crashed: {type(e).__name__}")
+                worker = None
+                raise DecodeWorkerError("Decode worker crashed during decoding") from e
+
+            if status != "ok":
+                raise DecodeWorkerError(f"Decode worker error: {payload}")
+            return payload, log_text
+        except DecodeWorkerError:
+            with self._lock:
+                self._failures += 1
+            raise
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+
+    def is_available(self) -> bool:
+        """Vrai si au moins un worker a démarré sa JVM."""
+        with self._lock:
+            return any(w.jvm_ok and w.process.is_alive() for w in self._workers)
+
+    def warmup_report(self) -> Dict[str, Any]:
+        """Statistiques de préchauffage de chaque worker (voir warmup.run_warmup)."""
+        with self._lock:
+            return {f"worker_{w.index}": w.warmup for w in self._workers}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "starting": not self._started.is_set(),
+                "alive": sum(1 for w in self._workers if w.process.is_alive()),
+                "jvm_ready": sum(1 for w in self._workers if w.jvm_ok),
+                "idle": self._idle.qsize(),
+                "tasks": self._tasks,
+                "failures": self._failures,
+                "restarts": self._restarts,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            workers, self._workers = list(self._workers), []
+        for worker in workers:
+            worker.stop()
+
+# --- END OF FILE decode_farm.py ---
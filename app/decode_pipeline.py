@@ -0,0 +1,1064 @@
+# --- START OF FILE decode_pipeline.py ---
+
+"""
+Pipeline de décodage d'images en mémoire.
+L'image uploadée est décodée une seule fois en un buffer de niveaux de gris,
+partagé ensuite par les moteurs du registre decoder_backends (ZXing via
+JPype, pylibdmtx, zxing-cpp, pyzbar), dans l'ordre configuré.
+Les régions candidates repérées par barcode_localizer (si GS1_DECODE_LOCALIZE)
+reçoivent une passe rapide avant l'image entière. Les moteurs s'enchaînent (stratégie "sequential") ou
+s'affrontent en parallèle sur le même buffer (stratégie "race"), chacun
+suivant la cascade d'étapes du niveau d'effort demandé.
+Les images multi-frames (GIF/TIFF animés, flux MJPEG) sont parcourues frame
+par frame, sans jamais charger toutes les frames en mémoire. Les grands JPEG
+sont d'abord chargés à résolution réduite (draft), la pleine résolution
+n'étant décodée qu'en cas d'échec.
+"""
+
+import io
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field, replace
+from typing import Callable, Iterator, List, Optional, Dict, Any, Tuple
+
+from PIL import Image, ImageOps
+
+from app import config, zxing_bridge
+from app.barcode_localizer import locate_barcode_regions
+from app.barcode_detector import DecoderType, is_gs1_data
+from app.decoder_backends import DecoderBackend, decoder_chain, get_backend
+from app.image_hash import difference_hash, hamming_distance
+from app.models import ScanBarcodeFormatHint, DecodeStrategy, DecodeEffort
+
+
+@dataclass
+class DecodeOptions:
+    """
+    Options d'un décodage. Les valeurs None reprennent la configuration serveur.
+
+    Attributes:
+        scan_types: Types de codes recherchés (None : tous)
+        multi: Retourner tous les codes de l'image au lieu du premier trouvé
+        pyramid_levels: Côtés longs de la pyramide de résolutions
+        localize: Essayer d'abord les régions candidates localisées
+        strategy: Enchaînement des moteurs ("sequential" ou "race")
+        effort: Longueur de la cascade d'étapes ("fast", "balanced", "thorough")
+        roi: Zone à décoder (left, top, right, bottom) en pixels de l'image ;
+            None : image entière. Les positions restent dans le repère de l'image
+        deadline: Instant limite (time.monotonic(), commun à tous les processus
+            sous Linux) partagé par toutes les étapes ; None : pas de limite
+        skip_similar_frames: Ignorer les frames quasi identiques à la dernière
+            frame décodée (images multi-frames)
+        full_resolution: False pour une image réduite qui sera suivie, en cas
+            d'échec, d'un décodage en pleine résolution (draft JPEG) : les
+            moteurs réservés à la pleine résolution attendent ce second passage
+    """
+    scan_types: Optional[List[ScanBarcodeFormatHint]] = None
+    multi: bool = False
+    pyramid_levels: Optional[List[int]] = None
+    localize: Optional[bool] = None
+    strategy: Optional[DecodeStrategy] = None
+    effort: Optional[DecodeEffort] = None
+    roi: Optional[Tuple[int, int, int, int]] = None
+    deadline: Optional[float] = None
+    skip_similar_frames: Optional[bool] = None
+    full_resolution: bool = True
+
+
+@dataclass
+class DecodedSymbol:
+    """
+    Un code-barres décodé : données brutes, décodeur, indication de format et
+    position (left, top, right, bottom) dans l'image d'origine si connue.
+    """
+    raw: str
+    decoder: DecoderType
+    format_hint: Optional[str] = None
+    position: Optional[Tuple[int, int, int, int]] = None
+
+
+@dataclass
+class DecodeOutcome:
+    """
+    Résultat d'un passage dans le pipeline de décodage. `timings` liste les
+    durées (étape, secondes) du chargement et de chaque moteur ou étape ZXing
+    essayés, reprises par les métriques de l'API (app/metrics.py).
+    """
+    symbols: List[DecodedSymbol] = field(default_factory=list)
+    zxing_error: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+    timed_out: bool = False
+    timings: List[Tuple[str, float]] = field(default_factory=list)
+
+
+# Étapes ZXing de la cascade : paramètres passés à zxing_bridge.decode_zxing.
+ZXING_STAGES: Dict[str, Dict[str, Any]] = {
+    "plain": {"try_harder": False},
+    "try_harder": {"try_harder": True},
+    "global_histogram": {"try_harder": True, "binarizer": "global"},
+    "inverted_rotated": {"try_harder": True, "also_inverted": True},
+}
+
+# Étapes ZXing essayées pour chaque niveau d'effort, de la moins à la plus coûteuse.
+# La cascade s'arrête à la première étape qui trouve un code. Les autres
+# moteurs déclarent eux-mêmes leurs niveaux d'effort (decoder_backends).
+EFFORT_STAGES: Dict[DecodeEffort, List[str]] = {
+    DecodeEffort.FAST: ["plain"],
+    DecodeEffort.BALANCED: ["plain", "try_harder"],
+    DecodeEffort.THOROUGH: ["plain", "try_harder", "global_histogram", "inverted_rotated"],
+}
+
+
+def _zxing_stages(options: DecodeOptions, full_resolution: bool = True) -> List[str]:
+    """Étapes ZXing d'un niveau : la cascade de l'effort en pleine résolution, "plain" seule sur un niveau réduit."""
+    return EFFORT_STAGES[options.effort] if full_resolution else ["plain"]
+
+
+class ImageLoadError(Exception):
+    """Levée quand les octets uploadés ne peuvent pas être décodés en image."""
+
+
+class ImageTooLargeError(ImageLoadError):
+    """Levée quand les dimensions d'une image dépassent les limites de pixels configurées."""
+
+
+class DecodeDeadlineExceeded(Exception):
+    """Levée entre deux étapes quand le budget de temps de la requête est épuisé."""
+
+
+def deadline_from_ms(deadline_ms: Optional[int]) -> Optional[float]:
+    """Convertit un budget en millisecondes (défaut serveur si None, 0 = illimité) en instant limite."""
+    if deadline_ms is None:
+        deadline_ms = config.DECODE_DEADLINE_MS
+    return time.monotonic() + deadline_ms / 1000.0 if deadline_ms > 0 else None
+
+
+def time_left_s(options: DecodeOptions) -> Optional[float]:
+    """Temps restant (secondes) avant l'instant limite, None si pas de limite."""
+    if options.deadline is None:
+        return None
+    return options.deadline - time.monotonic()
+
+
+def budget_exhausted(options: Optional[DecodeOptions]) -> bool:
+    """Vrai si les options portent un instant limite déjà dépassé."""
+    left = time_left_s(options) if options is not None else None
+    return left is not None and left <= 0
+
+
+def _check_deadline(options: DecodeOptions, where: str):
+    if budget_exhausted(options):
+        raise DecodeDeadlineExceeded(f"Decode budget exhausted before {where}")
+
+
+def load_grayscale_image(data: bytes) -> Image.Image:
+    """
+    Décode les octets d'une image uploadée en une image PIL en mode 'L'.
+    La transparence éventuelle est aplatie sur fond blanc, comme le fait
+    BufferedImageLuminanceSource côté Java.
+
+    Raises:
+        PIL.UnidentifiedImageError: Si le format d'image n'est pas reconnu
+    """
+    return _to_grayscale(_open_image(data))
+
+
+def _open_image(data: bytes) -> Image.Image:
+    """
+    Ouvre une image (seul l'en-tête est lu) en appliquant les limites de pixels.
+    Un JPEG trop grand est réduit pendant la décompression (draft) quand la
+    politique est "downscale" ; sa taille d'origine est notée dans
+    `info["original_size"]`.
+
+    Raises:
+        ImageTooLargeError: Si l'image dépasse les limites
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+    max_pixels = config.IMAGE_MAX_PIXELS
+    width, height = image.size
+    if not max_pixels or width * height <= max_pixels:
+        return image
+    if config.IMAGE_OVERSIZE == "reject":
+        raise ImageTooLargeError(f"{width}x{height} pixels, limit is {max_pixels}")
+    if image.format == "JPEG":
+        scale = (max_pixels / (width * height)) ** 0.5
+        image.draft("L", (max(1, int(width * scale)), max(1, int(height * scale))))
+        image.info["original_size"] = (width, height)
+    if image.size[0] * image.size[1] > config.IMAGE_MAX_DECODE_PIXELS:
+        raise ImageTooLargeError(f"{width}x{height} pixels, decompression limit is {config.IMAGE_MAX_DECODE_PIXELS}")
+    return image
+
+
+def _fit_pixels(gray_image: Image.Image) -> Image.Image:
+    """Réduit une image dont le nombre de pixels dépasse encore GS1_IMAGE_MAX_PIXELS."""
+    max_pixels = config.IMAGE_MAX_PIXELS
+    width, height = gray_image.size
+    if not max_pixels or width * height <= max_pixels:
+        return gray_image
+    scale = (max_pixels / (width * height)) ** 0.5
+    reduced = gray_image.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.BILINEAR, reducing_gap=2.0)
+    reduced.info.setdefault("original_size", (width, height))
+    return reduced
+
+
+def _restore_scale(outcome: DecodeOutcome, gray_image: Image.Image) -> DecodeOutcome:
+    """Ramène un décodage fait sur une image réduite par les limites de pixels dans le repère d'origine."""
+    original_size = gray_image.info.get("original_size")
+    if original_size and tuple(original_size) != gray_image.size:
+        _scale_outcome(outcome, original_size[0] / gray_image.size[0])
+        outcome.details["image_size"] = list(original_size)
+        outcome.details["downscaled_to"] = list(gray_image.size)
+    return outcome
+
+
+def original_size(gray_image: Image.Image) -> Tuple[int, int]:
+    """Taille de l'image avant sa réduction éventuelle par les limites de pixels."""
+    return tuple(gray_image.info.get("original_size") or gray_image.size)
+
+
+def decode_original_scale(gray_image: Image.Image, options: DecodeOptions,
+                          decode: Callable[[Image.Image, DecodeOptions], DecodeOutcome]) -> DecodeOutcome:
+    """
+    Décode avec `decode(image, options)` une image déjà chargée (image
+    déposée via /images), éventuellement réduite par les limites de pixels :
+    `options.roi` et les positions retournées sont dans le repère de l'image
+    d'origine.
+    """
+    roi = options.roi
+    if roi is not None and original_size(gray_image) != gray_image.size:
+        # Zone élargie au pixel réduit près, jamais vide
+        scale = gray_image.size[0] / original_size(gray_image)[0]
+        left, top = int(roi[0] * scale), int(roi[1] * scale)
+        right = min(gray_image.size[0], max(left + 1, math.ceil(roi[2] * scale)))
+        bottom = min(gray_image.size[1], max(top + 1, math.ceil(roi[3] * scale)))
+        options = replace(options, roi=(left, top, right, bottom))
+    outcome = _restore_scale(decode(gray_image, options), gray_image)
+    if roi is not None and "roi" in outcome.details:
+        outcome.details["roi"] = list(roi)
+    return outcome
+
+
+def _to_grayscale(image: Image.Image) -> Image.Image:
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, rgba)
+    return _fit_pixels(image.convert("L"))
+
+
+def load_image_bytes(image_bytes: bytes, logf=None) -> Image.Image:
+    """
+    Variante de `load_grayscale_image` pour les octets uploadés.
+
+    Raises:
+        ImageLoadError: Si les octets ne forment pas une image lisible
+        ImageTooLargeError: Si l'image dépasse les limites de pixels
+    """
+    try:
+        return load_grayscale_image(image_bytes)
+    except ImageTooLargeError as e:
+        if logf: logf.write(f"[ERROR] Image rejected: {e}\n")
+        raise
+    except Exception as e:
+        if logf: logf.write(f"[ERROR] Image decoding failed: {type(e).__name__} - {e}\n")
+        raise ImageLoadError(f"{type(e).__name__}") from e
+
+
+# --- Images multi-frames ---
+
+_JPEG_SOI = b"\xff\xd8\xff"
+# Fin d'une image JPEG immédiatement suivie du début de la suivante (flux MJPEG brut).
+_MJPEG_BOUNDARY = b"\xff\xd9\xff\xd8"
+# Marqueurs JPEG sans segment de longueur : TEM et RST0..RST7.
+_STANDALONE_MARKERS = frozenset([0x01, *range(0xD0, 0xD8)])
+
+
+def _jpeg_end(data: bytes, start: int) -> Optional[int]:
+    """
+    Position qui suit le marqueur EOI du JPEG commençant (SOI) à `start`, en
+    parcourant ses segments : les octets FFD9/FFD8 contenus dans un segment
+    (miniature EXIF, profil ICC) ou dans les données compressées ne sont pas
+    pris pour une fin d'image. None si la structure est invalide ou tronquée.
+    """
+    size = len(data)
+    pos = start + 2
+    while pos < size:
+        if data[pos] != 0xFF:
+            return None
+        while pos + 1 < size and data[pos + 1] == 0xFF:
+            pos += 1  # Octets de remplissage avant un marqueur
+        if pos + 1 >= size:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xD9:
+            return pos + 2
+        if marker in _STANDALONE_MARKERS:
+            pos += 2
+            continue
+        if marker == 0xD8 or pos + 4 > size:
+            return None
+        pos += 2 + int.from_bytes(data[pos + 2:pos + 4], "big")
+        if marker != 0xDA:
+            continue
+        # Données compressées après SOS : FF00 (octet bourré) et RSTn n'y terminent pas le scan
+        while True:
+            pos = data.find(b"\xff", pos)
+            if pos < 0 or pos + 1 >= size:
+                return None
+            following = data[pos + 1]
+            if following == 0x00 or 0xD0 <= following <= 0xD7:
+                pos += 2
+            elif following == 0xFF:
+                pos += 1
+            else:
+                break
+    return None
+
+
+def _is_mjpeg(image_bytes: bytes) -> bool:
+    """Vrai si un second JPEG (SOI) suit directement la fin (EOI) du premier."""
+    if image_bytes[:3] != _JPEG_SOI or image_bytes.find(_MJPEG_BOUNDARY) < 0:
+        return False  # Pas de frontière possible : inutile de parcourir les segments
+    end = _jpeg_end(image_bytes, 0)
+    return end is not None and image_bytes[end:end + 3] == _JPEG_SOI
+
+
+def _iter_mjpeg_frames(image_bytes: bytes) -> Iterator[Image.Image]:
+    view = memoryview(image_bytes)
+    start = 0
+    while image_bytes[start:start + 3] == _JPEG_SOI:
+        end = _jpeg_end(image_bytes, start)
+        end = len(image_bytes) if end is None else end
+        yield load_grayscale_image(view[start:end])
+        start = end
+
+
+def _iter_pil_frames(image: Image.Image) -> Iterator[Image.Image]:
+    for index in range(image.n_frames):
+        image.seek(index)
+        yield _to_grayscale(image)
+
+
+def _numbered_frames(first: Image.Image, frames: Iterator[Image.Image], logf=None) -> Iterator[Tuple[int, Image.Image]]:
+    yield 0, first
+    for index in range(1, config.DECODE_MAX_FRAMES):
+        try:
+            gray = next(frames)
+        except StopIteration:
+            return
+        except Exception as e:
+            if logf: logf.write(f"[WARNING] Frame {index} unreadable ({type(e).__name__} - {e}); stopping frame scan.\n")
+            return
+        yield index, gray
+
+
+def open_frames(image_bytes: bytes, logf=None) -> Tuple[bool, Iterator[Tuple[int, Image.Image]]]:
+    """
+    Ouvre une image uploadée, éventuellement multi-frames (GIF/TIFF/WebP
+    animés, flux MJPEG de JPEG concaténés). La première frame est chargée
+    immédiatement ; les suivantes le sont à la demande, une à la fois, dans
+    la limite de GS1_DECODE_MAX_FRAMES.
+
+    Returns:
+        Tuple[bool, Iterator]: (image multi-frames ?, itérateur de (index, image 'L'))
+
+    Raises:
+        ImageLoadError: Si la première frame n'est pas une image lisible
+        ImageTooLargeError: Si elle dépasse les limites de pixels
+    """
+    try:
+        if _is_mjpeg(image_bytes):
+            multi_frame, frames = True, _iter_mjpeg_frames(image_bytes)
+        else:
+            image = _open_image(image_bytes)
+            multi_frame = getattr(image, "n_frames", 1) > 1
+            frames = _iter_pil_frames(image) if multi_frame else iter([_to_grayscale(image)])
+        first = next(frames)
+    except ImageTooLargeError as e:
+        if logf: logf.write(f"[ERROR] Image rejected: {e}\n")
+        raise
+    except Exception as e:
+        if logf: logf.write(f"[ERROR] Image decoding failed: {type(e).__name__} - {e}\n")
+        raise ImageLoadError(f"{type(e).__name__}") from e
+    return multi_frame, _numbered_frames(first, frames, logf)
+
+
+def decode_frames(multi_frame: bool, frames: Iterator[Tuple[int, Image.Image]], options: Optional[DecodeOptions],
+                  decode: Callable[[Image.Image, DecodeOptions], DecodeOutcome], logf=None) -> DecodeOutcome:
+    """
+    Décode les frames retournées par `open_frames` avec `decode(image, options)`.
+    Le parcours s'arrête à la première frame portant une donnée GS1 ; à
+    défaut, la première frame où un code a été trouvé est retenue. Les frames
+    quasi identiques (dHash) à la dernière frame décodée sont ignorées si
+    `skip_similar_frames`. Pour une image multi-frames, `details` indique la
+    frame retenue et le nombre de frames décodées et ignorées.
+    """
+    options = options or DecodeOptions()
+    if not multi_frame:
+        _, gray_image = next(frames)
+        if budget_exhausted(options):
+            if logf: logf.write("[DEBUG] Decode budget exhausted after image load.\n")
+            return DecodeOutcome(timed_out=True, details={"deadline_exceeded": True})
+        return _restore_scale(decode(gray_image, options), gray_image)
+
+    skip_similar = config.DECODE_SKIP_SIMILAR_FRAMES if options.skip_similar_frames is None else options.skip_similar_frames
+    best: Optional[DecodeOutcome] = None
+    best_index: Optional[int] = None
+    last: Optional[DecodeOutcome] = None
+    last_hash: Optional[int] = None
+    decoded = skipped = 0
+    timed_out = False
+    timings: List[Tuple[str, float]] = []
+    for index, gray_image in frames:
+        if budget_exhausted(options):
+            if logf: logf.write(f"[DEBUG] Decode budget exhausted before frame {index}.\n")
+            timed_out = True
+            break
+        if skip_similar:
+            frame_hash = difference_hash(gray_image)
+            if last_hash is not None and hamming_distance(frame_hash, last_hash) <= config.DECODE_FRAME_SIMILARITY:
+                skipped += 1
+                continue
+            last_hash = frame_hash
+        decoded += 1
+        last = _restore_scale(decode(gray_image, options), gray_image)
+        timings.extend(last.timings)
+        if last.symbols and any(is_gs1_data(s.raw) for s in last.symbols):
+            if logf: logf.write(f"[DEBUG] GS1 data found in frame {index}; stopping frame scan.\n")
+            best, best_index = last, index
+            break
+        if last.symbols and best is None:
+            best, best_index = last, index
+        if last.timed_out:
+            timed_out = True
+            break
+
+    outcome = best or last or DecodeOutcome()
+    outcome.timings = timings
+    outcome.timed_out = outcome.timed_out or timed_out
+    if outcome.timed_out:
+        outcome.details["deadline_exceeded"] = True
+    if best_index is not None:
+        outcome.details["frame"] = best_index
+    outcome.details["frames_decoded"] = decoded
+    outcome.details["frames_skipped"] = skipped
+    return outcome
+
+
+# --- Chargement réduit des JPEG ---
+
+def load_jpeg_draft(image_bytes: bytes, logf=None) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+    """
+    Charge un JPEG à résolution réduite (draft PIL : l'IDCT ne calcule que 1/2,
+    1/4 ou 1/8 des coefficients) si le côté long réduit reste au moins égal à
+    GS1_DECODE_JPEG_DRAFT_SIDE. Retourne (image 'L' réduite, taille d'origine),
+    ou None si l'upload n'est pas un JPEG simple ou ne peut pas être réduit.
+    """
+    target = config.DECODE_JPEG_DRAFT_SIDE
+    if not target or image_bytes[:3] != _JPEG_SOI or _is_mjpeg(image_bytes):
+        return None
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        original_size = image.size
+        if config.IMAGE_OVERSIZE == "reject" and config.IMAGE_MAX_PIXELS and \
+                original_size[0] * original_size[1] > config.IMAGE_MAX_PIXELS:
+            return None  # Refus signalé par le chargement complet
+        scale = target / max(original_size)
+        if scale > 0.5:
+            return None
+        image.draft("L", (max(1, int(original_size[0] * scale)), max(1, int(original_size[1] * scale))))
+        if image.size == original_size:
+            return None
+        return _to_grayscale(image), original_size
+    except Exception as e:
+        # Le chargement complet signalera l'erreur s'il y en a vraiment une
+        if logf: logf.write(f"[DEBUG] JPEG draft loading failed ({type(e).__name__} - {e}); using full decode.\n")
+        return None
+
+
+def _scale_outcome(outcome: DecodeOutcome, scale: float):
+    """Ramène positions et région d'un décodage sur image réduite dans le repère d'origine."""
+    _map_positions(outcome.symbols, scale, (0, 0))
+    region = outcome.details.get("region")
+    if isinstance(region, list):
+        outcome.details["region"] = [int(v * scale) for v in region]
+
+
+def decode_upload_bytes(image_bytes: bytes, options: Optional[DecodeOptions],
+                        decode: Callable[[Image.Image, DecodeOptions], DecodeOutcome], logf=None) -> DecodeOutcome:
+    """
+    Décode une image uploadée avec `decode(image, options)` (pipeline local ou
+    ferme de processus). Un grand JPEG est d'abord décodé à résolution réduite
+    (les niveaux de pyramide plus petits et les régions candidates y sont
+    essayés, sans les moteurs réservés à la pleine résolution) ; en cas
+    d'échec, la pleine résolution est chargée et seuls les niveaux plus grands
+    que l'image réduite restent à essayer, sans nouvelle localisation. Les deux
+    passages partagent le budget de la requête : une fois épuisé, la pleine
+    résolution n'est pas chargée. Les autres images passent par `open_frames`.
+
+    Raises:
+        ImageLoadError: Si les octets ne forment pas une image lisible
+    """
+    options = options or DecodeOptions()
+    timings: List[Tuple[str, float]] = []
+    started_at = time.perf_counter()
+    draft = load_jpeg_draft(image_bytes, logf) if options.roi is None else None
+    if draft is not None:
+        timings.append(("image_load", time.perf_counter() - started_at))
+        reduced, original_size = draft
+        levels = config.DECODE_PYRAMID_LEVELS if options.pyramid_levels is None else options.pyramid_levels
+        reduced_side = max(reduced.size)
+        if logf: logf.write(f"[DEBUG] JPEG draft: decoding {reduced.size[0]}x{reduced.size[1]} instead of {original_size[0]}x{original_size[1]}.\n")
+        outcome = decode(reduced, replace(options, pyramid_levels=[level for level in levels if level < reduced_side],
+                                          full_resolution=False))
+        timings.extend(outcome.timings)
+        if outcome.symbols or outcome.timed_out:
+            outcome.timings = timings
+            _scale_outcome(outcome, original_size[0] / reduced.size[0])
+            outcome.details["image_size"] = list(original_size)
+            outcome.details["jpeg_draft"] = list(reduced.size)
+            return outcome
+        del reduced
+        if logf: logf.write("[DEBUG] Nothing found on the JPEG draft.\n")
+        # Les régions candidates ont déjà été essayées sur l'image réduite
+        options = replace(options, pyramid_levels=[level for level in levels if level > reduced_side], localize=False)
+        started_at = time.perf_counter()
+
+    # Budget épuisé (passage réduit, attente en file) : l'image n'est pas chargée en pleine résolution
+    if budget_exhausted(options):
+        if logf: logf.write("[DEBUG] Decode budget exhausted; full resolution not loaded.\n")
+        outcome = DecodeOutcome(timed_out=True, timings=timings, details={"deadline_exceeded": True})
+        if draft is not None:
+            outcome.details["image_size"] = list(draft[1])
+        return outcome
+    if logf and draft is not None: logf.write("[DEBUG] Loading full resolution.\n")
+    multi_frame, frames = open_frames(image_bytes, logf)
+    timings.append(("image_load", time.perf_counter() - started_at))
+    outcome = decode_frames(multi_frame, frames, options, decode, logf)
+    outcome.timings[:0] = timings
+    return outcome
+
+
+def decode_with_backend(backend: DecoderBackend, gray_image: Image.Image, options: DecodeOptions,
+                        logf=None) -> List[DecodedSymbol]:
+    """
+    Décode avec un backend natif (pylibdmtx, zxing-cpp, pyzbar) limité aux
+    types demandés. Les erreurs du moteur sont journalisées et traitées comme
+    une absence de code.
+    """
+    formats = backend.formats & frozenset(options.scan_types) if options.scan_types else backend.formats
+    try:
+        results = backend.decode(gray_image, formats, options.multi, _backend_timeout_ms(options), logf)
+    except Exception as e:
+        if logf: logf.write(f"[ERROR] {backend.name} error: {type(e).__name__} - {e}\n")
+        return []
+    symbols = [
+        DecodedSymbol(raw=raw, decoder=backend.decoder_type, format_hint=format_hint, position=position)
+        for raw, format_hint, position in results
+    ]
+    if logf:
+        logf.write(f"[DEBUG] {backend.name} found {len(symbols)} code(s).\n")
+        for i, symbol in enumerate(symbols):
+            logf.write(f"[DEBUG] {backend.name} raw data {i} (repr): {repr(symbol.raw)}\n")
+    return symbols
+
+
+def build_pyramid_levels(image_size, levels: Optional[List[int]] = None) -> List[Optional[int]]:
+    """
+    Liste les niveaux de la pyramide à essayer pour une image donnée : les côtés
+    longs plus petits que l'image, puis None pour la pleine résolution.
+    """
+    if levels is None:
+        levels = config.DECODE_PYRAMID_LEVELS
+    long_side = max(image_size)
+    return [level for level in sorted(levels) if level < long_side] + [None]
+
+
+def downscale(gray_image: Image.Image, long_side: Optional[int]) -> Image.Image:
+    """Réduit l'image pour que son côté long vaille `long_side` (None : inchangée)."""
+    if long_side is None:
+        return gray_image
+    width, height = gray_image.size
+    scale = long_side / max(width, height)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return gray_image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+
+
+def _map_positions(symbols: List[DecodedSymbol], scale: float, offset: Tuple[int, int]) -> List[DecodedSymbol]:
+    """Ramène les positions d'une image réduite et/ou recadrée dans le repère de l'image d'origine."""
+    for symbol in symbols:
+        if symbol.position is not None:
+            left, top, right, bottom = symbol.position
+            symbol.position = (
+                int(left * scale) + offset[0], int(top * scale) + offset[1],
+                int(right * scale) + offset[0], int(bottom * scale) + offset[1],
+            )
+    return symbols
+
+
+def deduplicate_symbols(symbols: List[DecodedSymbol]) -> List[DecodedSymbol]:
+    """
+    Supprime les doublons : même contenu et positions qui se recouvrent
+    (ou position inconnue). Deux étiquettes identiques à des endroits
+    différents restent deux symboles distincts.
+    """
+    def overlaps(a, b):
+        if a is None or b is None:
+            return True
+        return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+    unique: List[DecodedSymbol] = []
+    for symbol in symbols:
+        if not any(kept.raw == symbol.raw and overlaps(kept.position, symbol.position) for kept in unique):
+            unique.append(symbol)
+    return unique
+
+
+def _backend_timeout_ms(options: DecodeOptions) -> int:
+    """Timeout des moteurs natifs : le maximum GS1_DMTX_TIMEOUT_MS, réduit au temps restant du budget."""
+    left = time_left_s(options)
+    if left is None:
+        return config.DMTX_TIMEOUT_MS
+    return max(1, min(config.DMTX_TIMEOUT_MS, int(left * 1000)))
+
+
+def map_rotated_positions(symbols: List[DecodedSymbol], original_size: Tuple[int, int]) -> List[DecodedSymbol]:
+    """Ramène les positions trouvées sur l'image tournée de 90° (sens antihoraire) dans le repère d'origine."""
+    width = original_size[0]
+    for symbol in symbols:
+        if symbol.position is not None:
+            left, top, right, bottom = symbol.position
+            symbol.position = (width - bottom, left, width - top, right)
+    return symbols
+
+
+def _wait_for_zxing(options: DecodeOptions, logf=None) -> bool:
+    """
+    Attend, dans la limite du budget, que la JVM démarrée en arrière-plan soit
+    prête ; retourne zxing_bridge.is_available().
+    """
+    if zxing_bridge.jvm_starting():
+        if logf: logf.write("[DEBUG] Waiting for the JVM to finish starting.\n")
+        zxing_bridge.wait_for_jvm(time_left_s(options))
+        _check_deadline(options, "JVM startup")
+    return zxing_bridge.is_available()
+
+
+def _zxing_stage(stage: str, gray_image: Image.Image, options: DecodeOptions, logf=None,
+                 reader: str = "multi", java_pixels=None) -> Tuple[List[DecodedSymbol], Optional[str]]:
+    """
+    Une étape ZXing de la cascade. L'étape "inverted_rotated" essaie aussi
+    l'image tournée de 90° (codes 1D verticaux, que TRY_HARDER ne peut pas
+    tourner sur une PlanarYUVLuminanceSource) et, si ZXing ne connaît pas le
+    hint ALSO_INVERTED, l'image inversée.
+    """
+    variants = [(gray_image, java_pixels, False)]
+    if stage == "inverted_rotated":
+        if not zxing_bridge.supports_also_inverted():
+            variants.append((ImageOps.invert(gray_image), None, False))
+        variants.append((gray_image.transpose(Image.ROTATE_90), None, True))
+
+    error = None
+    for image, pixels, rotated in variants:
+        _check_deadline(options, f"ZXing stage '{stage}'")
+        results, error = zxing_bridge.decode_zxing(
+            image, options.scan_types, logf, multi=options.multi, reader=reader, java_pixels=pixels,
+            **ZXING_STAGES[stage]
+        )
+        if results:
+            symbols = [
+                DecodedSymbol(raw=raw, decoder=DecoderType.ZXING, format_hint=format_hint, position=position)
+                for raw, format_hint, position in results
+            ]
+            return (map_rotated_positions(symbols, gray_image.size) if rotated else symbols), None
+    return [], error
+
+
+# --- Stratégie "race" : moteurs en parallèle, le premier résultat valide gagne ---
+_race_pool: Optional[ThreadPoolExecutor] = None
+_race_pool_lock = threading.Lock()
+
+
+def _get_race_pool() -> ThreadPoolExecutor:
+    global _race_pool
+    with _race_pool_lock:
+        if _race_pool is None:
+            _race_pool = ThreadPoolExecutor(max_workers=config.DECODE_RACE_WORKERS, thread_name_prefix="gs1-race")
+        return _race_pool
+
+
+def _race_engines(options: DecodeOptions, full_resolution: bool = True) -> List[str]:
+    """
+    Moteurs mis en concurrence : ZXing (lecteur multi-formats puis un lecteur
+    dédié par type demandé) s'il fait partie de la chaîne, et les autres
+    moteurs disponibles de la chaîne configurée (hors niveau de pleine
+    résolution, sans ceux qui y sont réservés).
+    """
+    engines = []
+    for backend in decoder_chain(options.scan_types, options.effort):
+        if backend.full_resolution_only and not full_resolution:
+            continue
+        if backend.decode is None:
+            engines.append("zxing")
+            if not options.scan_types or ScanBarcodeFormatHint.DATAMATRIX in options.scan_types:
+                engines.append("zxing_datamatrix")
+            if not options.scan_types or ScanBarcodeFormatHint.QR_CODE in options.scan_types:
+                engines.append("zxing_qrcode")
+            if not options.scan_types or ScanBarcodeFormatHint.CODE_128 in options.scan_types:
+                engines.append("zxing_code128")
+        elif backend.is_available():
+            engines.append(backend.name)
+    return engines
+
+
+class _RaceLog:
+    """Journal d'un moteur de la course : muet dès que la course est jouée (gagnée ou abandonnée)."""
+
+    def __init__(self, logf, decided: threading.Event):
+        self._logf = logf
+        self._decided = decided
+
+    def write(self, text: str):
+        if not self._decided.is_set():
+            self._logf.write(text)
+
+
+class _RaceAbandoned(Exception):
+    """Levée entre deux étapes d'un moteur quand la course est déjà jouée."""
+
+
+def _run_engine(engine: str, gray_image: Image.Image, java_pixels, options: DecodeOptions,
+                logf=None, decided: Optional[threading.Event] = None, full_resolution: bool = True
+                ) -> Tuple[List[DecodedSymbol], Optional[str], Optional[str], List[Tuple[str, float]]]:
+    """
+    Exécute un moteur de la course ; retourne (symboles, erreur ZXing éventuelle,
+    étape gagnante, durées des étapes). Les moteurs ZXing suivent les étapes
+    ZXing de la cascade ("plain" seule sur un niveau réduit) ; une fois
+    `decided` positionné, le moteur s'arrête avant son étape suivante (un
+    appel Java ou natif en cours n'est pas interruptible).
+    """
+    def check_race(where: str):
+        if decided is not None and decided.is_set():
+            raise _RaceAbandoned(f"Race decided before {where}")
+        _check_deadline(options, where)
+
+    backend = get_backend(engine)
+    if backend is not None and backend.decode is not None:
+        check_race(backend.name)
+        started_at = time.perf_counter()
+        symbols = decode_with_backend(backend, gray_image, options, logf)
+        return symbols, None, backend.name, [(backend.name, time.perf_counter() - started_at)]
+
+    zxing_bridge.attach_current_thread()
+    reader = "multi" if engine == "zxing" else engine.split("_", 1)[1]
+    error = None
+    timings = []
+    for stage in _zxing_stages(options, full_resolution):
+        check_race(f"ZXing stage '{stage}'")
+        started_at = time.perf_counter()
+        symbols, error = _zxing_stage(stage, gray_image, options, logf, reader=reader, java_pixels=java_pixels)
+        timings.append((f"zxing_{stage}", time.perf_counter() - started_at))
+        if symbols:
+            return symbols, None, stage, timings
+    return [], error, None, timings
+
+
+def _race_level(gray_image: Image.Image, options: DecodeOptions, outcome: DecodeOutcome, logf=None,
+                full_resolution: bool = True) -> List[DecodedSymbol]:
+    """
+    Lance les moteurs pertinents en parallèle sur le même buffer de pixels, au
+    plus GS1_DECODE_RACE_MAX_ENGINES à la fois pour une requête (les suivants
+    partent quand un moteur se termine sans résultat).
+    Hors mode multi, le premier résultat non vide gagne : les moteurs pas encore
+    démarrés sont annulés, ceux en cours s'arrêtent avant leur étape suivante,
+    au plus tard à l'instant limite de la requête, et n'écrivent plus dans le
+    journal. En mode multi, tous les résultats sont réunis. L'attente est bornée
+    par le budget de la requête : à son expiration, les moteurs en cours sont
+    abandonnés de la même façon.
+    """
+    engines = _race_engines(options, full_resolution)
+    java_pixels = zxing_bridge.to_java_pixels(gray_image) if "zxing" in engines and _wait_for_zxing(options, logf) else None
+    if logf: logf.write(f"[DEBUG] Racing decoders: {', '.join(engines)}.\n")
+
+    pool = _get_race_pool()
+    decided = threading.Event()
+    engine_log = _RaceLog(logf, decided) if logf else None
+    waiting = list(engines)
+    futures = {}
+    pending = set()
+
+    def submit_next():
+        while waiting and len(pending) < config.DECODE_RACE_MAX_ENGINES:
+            engine = waiting.pop(0)
+            future = pool.submit(_run_engine, engine, gray_image, java_pixels, options, engine_log, decided,
+                                 full_resolution)
+            futures[future] = engine
+            pending.add(future)
+
+    def abandon():
+        decided.set()
+        for other in pending:
+            other.cancel()
+
+    submit_next()
+    found: List[DecodedSymbol] = []
+    while pending:
+        left = time_left_s(options)
+        done, _ = wait(pending, timeout=None if left is None else max(0.0, left), return_when=FIRST_COMPLETED)
+        if not done:
+            abandon()
+            if logf: logf.write(f"[DEBUG] Decode budget exhausted during race; abandoning {len(pending)} engine(s).\n")
+            if found:
+                return found
+            raise DecodeDeadlineExceeded("Decode budget exhausted during race")
+        pending -= done
+        for future in done:
+            engine = futures[future]
+            try:
+                symbols, error, stage, timings = future.result()
+            except (DecodeDeadlineExceeded, _RaceAbandoned):
+                continue
+            except Exception as e:
+                if logf: logf.write(f"[ERROR] Race engine {engine} failed: {type(e).__name__} - {e}\n")
+                continue
+            outcome.timings.extend(timings)
+            if engine == "zxing":
+                outcome.zxing_error = error
+            if not symbols:
+                continue
+            if not options.multi:
+                abandon()
+                outcome.details["winner"] = engine
+                outcome.details["stage"] = stage
+                if logf: logf.write(f"[DEBUG] Race won by {engine}; abandoning {len(pending) + len(waiting)} engine(s).\n")
+                return symbols
+            found.extend(symbols)
+        submit_next()
+    return found
+
+
+def _decode_zxing_cascade(gray_image: Image.Image, options: DecodeOptions, outcome: DecodeOutcome,
+                          logf=None, full_resolution: bool = True) -> List[DecodedSymbol]:
+    """Les étapes ZXing de la cascade d'effort ; l'étape qui trouve est notée dans `details["stage"]`."""
+    # Le byte[] Java est construit une fois et partagé par les étapes sur l'image non transformée
+    java_pixels = zxing_bridge.to_java_pixels(gray_image) if _wait_for_zxing(options, logf) else None
+    for stage in _zxing_stages(options, full_resolution):
+        if logf: logf.write(f"[DEBUG] Cascade stage '{stage}'.\n")
+        started_at = time.perf_counter()
+        symbols, outcome.zxing_error = _zxing_stage(stage, gray_image, options, logf, java_pixels=java_pixels)
+        outcome.timings.append((f"zxing_{stage}", time.perf_counter() - started_at))
+        if symbols:
+            outcome.details["stage"] = stage
+            return symbols
+    if logf:
+        logf.write(f"[DEBUG] ZXing did not find codes (Reason: {outcome.zxing_error if outcome.zxing_error else 'skipped/not available'}).\n")
+    return []
+
+
+def _decode_level(gray_image: Image.Image, options: DecodeOptions, outcome: DecodeOutcome, logf=None,
+                  full_resolution: bool = True) -> List[DecodedSymbol]:
+    """
+    Un niveau de la pyramide : les moteurs de la chaîne configurée
+    (decoder_chain), dans l'ordre, jusqu'au premier qui trouve. Le moteur (ou
+    l'étape ZXing) qui trouve est noté dans `details["stage"]`. En mode multi,
+    chaque moteur complète les précédents au lieu de n'être qu'un fallback.
+    Avec la stratégie "race", les moteurs tournent en parallèle. Les niveaux
+    réduits (`full_resolution=False`) n'essaient que les passes rapides : la
+    seule étape ZXing "plain", sans les moteurs réservés à la pleine
+    résolution (pylibdmtx). La cascade complète est gardée pour la pleine
+    résolution.
+    """
+    if options.strategy == DecodeStrategy.RACE:
+        return _race_level(gray_image, options, outcome, logf, full_resolution)
+
+    symbols: List[DecodedSymbol] = []
+    for backend in decoder_chain(options.scan_types, options.effort):
+        if backend.full_resolution_only and not full_resolution:
+            continue
+        if backend.decode is None:
+            found = _decode_zxing_cascade(gray_image, options, outcome, logf, full_resolution)
+        elif not backend.is_available():
+            if logf: logf.write(f"[DEBUG] {backend.name} not available; skipping.\n")
+            continue
+        else:
+            _check_deadline(options, backend.name)
+            started_at = time.perf_counter()
+            found = decode_with_backend(backend, gray_image, options, logf)
+            outcome.timings.append((backend.name, time.perf_counter() - started_at))
+            if found and not symbols:
+                outcome.details["stage"] = backend.name
+        symbols.extend(found)
+        if symbols and not options.multi:
+            return symbols
+    return symbols
+
+
+def _decode_pyramid(gray_image: Image.Image, options: DecodeOptions, outcome: DecodeOutcome, logf=None,
+                    offset: Tuple[int, int] = (0, 0)) -> List[DecodedSymbol]:
+    """
+    Parcourt la pyramide de résolutions d'une image (éventuellement un recadrage
+    situé à `offset` dans l'image d'origine) et s'arrête au premier niveau qui
+    trouve un code. Les positions retournées sont dans le repère d'origine.
+    """
+    for level in build_pyramid_levels(gray_image.size, options.pyramid_levels):
+        _check_deadline(options, f"pyramid level {level or 'full'}")
+        level_image = downscale(gray_image, level)
+        if logf: logf.write(f"[DEBUG] Pyramid level {level or 'full'}: decoding at {level_image.size[0]}x{level_image.size[1]}.\n")
+        symbols = _decode_level(level_image, options, outcome, logf,
+                                full_resolution=level is None and options.full_resolution)
+        if symbols:
+            outcome.details["pyramid_level"] = level or "full"
+            outcome.details["decoded_size"] = list(level_image.size)
+            return _map_positions(symbols, gray_image.size[0] / level_image.size[0], offset)
+    return []
+
+
+def _decode_regions(gray_image: Image.Image, regions, options: DecodeOptions, outcome: DecodeOutcome,
+                    origin: Tuple[int, int], logf=None) -> List[DecodedSymbol]:
+    """
+    Une passe rapide par région candidate : ZXing seul (effort "fast"), à la
+    taille native du recadrage, sans pyramide ni moteur réservé à la pleine
+    résolution. Les régions se partagent GS1_DECODE_LOCALIZE_BUDGET_MS (borné
+    par le budget de la requête) ; l'image entière garde ensuite la cascade
+    complète. Hors mode multi, la première région qui trouve est retenue.
+    """
+    region_deadline = time.monotonic() + config.DECODE_LOCALIZE_BUDGET_MS / 1000.0
+    if options.deadline is not None:
+        region_deadline = min(region_deadline, options.deadline)
+    region_options = replace(options, effort=DecodeEffort.FAST, strategy=DecodeStrategy.SEQUENTIAL,
+                             deadline=region_deadline)
+    found: List[DecodedSymbol] = []
+    for region in regions:
+        if budget_exhausted(region_options):
+            if logf: logf.write("[DEBUG] Localized decode budget exhausted; skipping remaining regions.\n")
+            break
+        if logf: logf.write(f"[DEBUG] Decoding candidate region {region.box} ({region.kind}).\n")
+        try:
+            symbols = _decode_level(gray_image.crop(region.box), region_options, outcome, logf, full_resolution=False)
+        except DecodeDeadlineExceeded:
+            break
+        _map_positions(symbols, 1.0, (origin[0] + region.box[0], origin[1] + region.box[1]))
+        if symbols and not options.multi:
+            outcome.details["region"] = [
+                region.box[0] + origin[0], region.box[1] + origin[1],
+                region.box[2] + origin[0], region.box[3] + origin[1],
+            ]
+            outcome.details["region_kind"] = region.kind
+            return symbols
+        found.extend(symbols)
+    return found
+
+
+def run_decode(gray_image: Image.Image, options: Optional[DecodeOptions] = None, logf=None) -> DecodeOutcome:
+    """
+    Décode une image en niveaux de gris.
+
+    Les régions candidates repérées par la localisation (si activée) sont
+    d'abord recadrées et décodées par une passe rapide, puis l'image entière. Chaque image passe
+    par une pyramide de résolutions (ex. côté long 1024, puis 2048, puis
+    pleine résolution) ; chaque niveau tente les moteurs configurés dans l'ordre,
+    les moteurs lents (pylibdmtx) n'étant lancés qu'au niveau de pleine résolution.
+    La recherche s'arrête au premier code trouvé, sauf en mode `multi` où les
+    codes de toutes les régions et de l'image entière sont réunis puis
+    dédoublonnés par contenu et position. La stratégie (options ou défaut
+    serveur) décide si les moteurs d'un niveau s'enchaînent ou s'affrontent ;
+    l'effort décide des étapes de la cascade essayées à chaque niveau.
+
+    Toutes les étapes partagent le budget `options.deadline` : une fois épuisé,
+    la recherche s'arrête et `outcome.timed_out` est positionné (en mode multi,
+    les codes déjà trouvés sont conservés). Avec `options.roi`, seule cette
+    zone est analysée.
+    """
+    if options is None:
+        options = DecodeOptions()
+    if options.strategy is None:
+        options = replace(options, strategy=DecodeStrategy(config.DECODE_STRATEGY))
+    if options.effort is None:
+        options = replace(options, effort=DecodeEffort(config.DECODE_EFFORT))
+    outcome = DecodeOutcome()
+    outcome.details["image_size"] = list(gray_image.size)
+    outcome.details["strategy"] = options.strategy.value
+    outcome.details["effort"] = options.effort.value
+
+    origin = (0, 0)
+    if options.roi is not None:
+        gray_image = gray_image.crop(options.roi)
+        origin = options.roi[:2]
+        outcome.details["roi"] = list(options.roi)
+
+    localize = config.DECODE_LOCALIZE if options.localize is None else options.localize
+    regions = []
+    if localize:
+        regions = locate_barcode_regions(gray_image, config.DECODE_LOCALIZE_CANDIDATES, config.DECODE_LOCALIZE_MARGIN)
+        outcome.details["candidate_regions"] = len(regions)
+        if logf: logf.write(f"[DEBUG] Localization found {len(regions)} candidate region(s): {[(r.box, r.kind) for r in regions]}\n")
+
+    found: List[DecodedSymbol] = []
+    try:
+        if regions:
+            found = _decode_regions(gray_image, regions, options, outcome, origin, logf)
+            if found and not options.multi:
+                outcome.symbols = found
+                return outcome
+
+        symbols = _decode_pyramid(gray_image, options, outcome, logf, offset=origin)
+        if symbols and not options.multi:
+            outcome.details["region"] = "roi" if options.roi is not None else "full"
+        found.extend(symbols)
+    except DecodeDeadlineExceeded as e:
+        if logf: logf.write(f"[DEBUG] {e}; stopping with {len(found)} code(s) found.\n")
+        outcome.timed_out = True
+        outcome.details["deadline_exceeded"] = True
+
+    outcome.symbols = deduplicate_symbols(found) if options.multi else found
+    if options.multi:
+        outcome.details["multi"] = True
+        outcome.details.pop("pyramid_level", None)
+        outcome.details.pop("decoded_size", None)
+    return outcome
+
+
+def decode_image_bytes(image_bytes: bytes, options: Optional[DecodeOptions] = None, logf=None,
+                       near_duplicates=None) -> DecodeOutcome:
+    """
+    Charge puis décode une image uploadée (frame par frame si elle en a
+    plusieurs). Point d'entrée exécuté dans le pool de décodage : tout le
+    travail bloquant (PIL, JVM, libdmtx) se fait ici.
+    `near_duplicates` (decode_cache.NearDuplicateCache) sert les images quasi
+    identiques à une image décodée récemment.
+
+    Raises:
+        ImageLoadError: Si les octets ne forment pas une image lisible
+    """
+    return decode_bytes_with(image_bytes, options, run_decode, logf, near_duplicates)
+
+
+def decode_bytes_with(image_bytes: bytes, options: Optional[DecodeOptions],
+                      decode_image: Callable[[Image.Image, Optional[DecodeOptions], Any], DecodeOutcome],
+                      logf=None, near_duplicates=None) -> DecodeOutcome:
+    """
+    Charge une image uploadée (`decode_upload_bytes`) et décode chaque image
+    chargée avec `decode_image(image, options, logf)` : `run_decode` ou
+    `RemoteDecoder.decode_image`, à travers `near_duplicates` s'il est fourni.
+
+    Raises:
+        ImageLoadError: Si les octets ne forment pas une image lisible
+    """
+    if budget_exhausted(options):
+        if logf: logf.write("[DEBUG] Decode budget exhausted before image load (queue wait).\n")
+        return DecodeOutcome(timed_out=True, details={"deadline_exceeded": True})
+
+    def decode(gray_image: Image.Image, image_options: DecodeOptions) -> DecodeOutcome:
+        if near_duplicates is not None:
+            return near_duplicates.decode_through(gray_image, image_options,
+                                                  lambda image: decode_image(image, image_options, logf), logf)
+        return decode_image(gray_image, image_options, logf)
+
+    return decode_upload_bytes(image_bytes, options, decode, logf)
+
+# --- END OF FILE decode_pipeline.py ---
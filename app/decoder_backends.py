@@ -0,0 +1,238 @@
+# --- START OF FILE decoder_backends.py ---
+
+"""
+Registre des moteurs de décodage (backends).
+Chaque backend déclare les types de codes qu'il sait lire, les niveaux
+d'effort où il intervient et s'il sait retourner plusieurs codes. L'ordre
+d'essai se configure sans toucher au code (GS1_DECODERS, et par symbologie
+GS1_DECODERS_DATAMATRIX, GS1_DECODERS_QR_CODE, GS1_DECODERS_CODE_128).
+ZXing via JPype est un backend comme les autres : s'il n'apparaît dans
+aucune liste, la JVM n'est pas démarrée.
+
+Les backends natifs optionnels (zxing-cpp, pyzbar) ne sont utilisés que si
+leur paquet Python est installé.
+"""
+
+import operator
+from dataclasses import dataclass
+from functools import lru_cache, reduce
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app import config, zxing_bridge
+from app.barcode_detector import DecoderType
+from app.models import DecodeEffort, ScanBarcodeFormatHint
+
+# Résultat brut d'un backend : (texte, format ZXing "DATA_MATRIX"/"QR_CODE"/"CODE_128", boîte englobante)
+BackendResult = Tuple[str, str, Optional[Tuple[int, int, int, int]]]
+# decode(image 'L', types à lire, multi, timeout_ms, logf)
+BackendDecode = Callable[[Image.Image, FrozenSet[ScanBarcodeFormatHint], bool, int, Any], List[BackendResult]]
+
+ALL_FORMATS = frozenset(ScanBarcodeFormatHint)
+ALL_EFFORTS = frozenset(DecodeEffort)
+
+_FORMAT_NAMES = {
+    ScanBarcodeFormatHint.DATAMATRIX: "DATA_MATRIX",
+    ScanBarcodeFormatHint.QR_CODE: "QR_CODE",
+    ScanBarcodeFormatHint.CODE_128: "CODE_128",
+}
+
+
+@dataclass(frozen=True)
+class DecoderBackend:
+    """
+    Un moteur de décodage et ses capacités déclarées.
+
+    Attributes:
+        name: Nom utilisé dans la configuration et dans /health
+        decoder_type: Décodeur reporté dans les réponses
+        formats: Types de codes lus par le moteur
+        efforts: Niveaux d'effort où le moteur est essayé
+        multi: Sait retourner tous les codes d'une image
+        is_available: Vrai si le moteur est utilisable dans ce processus
+        decode: Décodage d'une image en niveaux de gris ; None pour ZXing,
+            dont la cascade d'étapes est pilotée par decode_pipeline
+        full_resolution_only: Essayé seulement au dernier niveau de la
+            pyramide (pleine résolution), pas sur les niveaux réduits
+    """
+    name: str
+    decoder_type: DecoderType
+    formats: FrozenSet[ScanBarcodeFormatHint]
+    efforts: FrozenSet[DecodeEffort]
+    multi: bool
+    is_available: Callable[[], bool]
+    decode: Optional[BackendDecode] = None
+    full_resolution_only: bool = False
+
+    def capabilities(self) -> Dict[str, Any]:
+        return {
+            "available": self.is_available(),
+            "enabled": self.name in configured_backend_names(),
+            "formats": sorted(f.value for f in self.formats),
+            "efforts": sorted(e.value for e in self.efforts),
+            "multi": self.multi,
+            "full_resolution_only": self.full_resolution_only,
+        }
+
+
+_BACKENDS: Dict[str, DecoderBackend] = {}
+
+
+def register_backend(backend: DecoderBackend):
+    """Ajoute (ou remplace) un backend dans le registre."""
+    _BACKENDS[backend.name] = backend
+
+
+def get_backend(name: str) -> Optional[DecoderBackend]:
+    return _BACKENDS.get(name)
+
+
+def registered_backends() -> List[DecoderBackend]:
+    return list(_BACKENDS.values())
+
+
+def configured_backend_names() -> List[str]:
+    """Backends cités dans GS1_DECODERS ou dans une liste propre à une symbologie."""
+    names = list(config.DECODERS)
+    for per_format in config.DECODERS_BY_FORMAT.values():
+        names.extend(n for n in per_format if n not in names)
+    return names
+
+
+def jvm_required() -> bool:
+    """La JVM n'est utile que si ZXing (JPype) est configuré quelque part."""
+    return "zxing_jpype" in configured_backend_names()
+
+
+def decoder_chain(scan_types: Optional[List[ScanBarcodeFormatHint]], effort: DecodeEffort) -> List[DecoderBackend]:
+    """
+    Backends à essayer, dans l'ordre configuré : la liste propre à la
+    symbologie si une seule est demandée, sinon GS1_DECODERS. Seuls les
+    backends qui lisent au moins un des types demandés et qui interviennent
+    à ce niveau d'effort sont retenus.
+    """
+    wanted = frozenset(scan_types) if scan_types else ALL_FORMATS
+    names = config.DECODERS
+    if len(wanted) == 1:
+        names = config.DECODERS_BY_FORMAT.get(next(iter(wanted)).value) or names
+    chain = []
+    for name in names:
+        backend = _BACKENDS.get(name)
+        if backend is not None and backend.formats & wanted and effort in backend.efforts:
+            chain.append(backend)
+    return chain
+
+
+def _module_available(import_check: Callable[[], Any]) -> Callable[[], bool]:
+    """Disponibilité d'un paquet optionnel, testée une seule fois (import réel : bibliothèques natives comprises)."""
+    @lru_cache(maxsize=1)
+    def available() -> bool:
+        try:
+            import_check()
+            return True
+        except Exception:
+            return False
+    return available
+
+
+# --- pylibdmtx (libdmtx) ---
+
+def _import_pylibdmtx():
+    from pylibdmtx.pylibdmtx import decode  # noqa: F401
+
+
+def _dmtx_position(rect, image_height: int) -> Tuple[int, int, int, int]:
+    """Convertit un Rect libdmtx (origine en bas à gauche) en boîte (left, top, right, bottom)."""
+    x0, x1 = sorted((rect.left, rect.left + rect.width))
+    y0, y1 = sorted((rect.top, rect.top + rect.height))
+    return (x0, image_height - y1, x1, image_height - y0)
+
+
+def _decode_pylibdmtx(gray_image: Image.Image, formats, multi: bool, timeout_ms: int, logf=None) -> List[BackendResult]:
+    from pylibdmtx.pylibdmtx import decode as dmtx_decode
+
+    if logf: logf.write(f"[DEBUG] Trying pylibdmtx (timeout {timeout_ms} ms)...\n")
+    dmtx_results = dmtx_decode(gray_image, timeout=timeout_ms, max_count=None if multi else 1)
+    return [
+        (res.data.decode("utf-8", errors="replace"), "DATA_MATRIX", _dmtx_position(res.rect, gray_image.size[1]))
+        for res in dmtx_results or []
+    ]
+
+
+# --- zxing-cpp (bindings Python natifs, sans JVM) ---
+
+def _import_zxing_cpp():
+    import zxingcpp  # noqa: F401
+
+
+def _decode_zxing_cpp(gray_image: Image.Image, formats, multi: bool, timeout_ms: int, logf=None) -> List[BackendResult]:
+    import zxingcpp
+
+    names = {
+        ScanBarcodeFormatHint.DATAMATRIX: zxingcpp.BarcodeFormat.DataMatrix,
+        ScanBarcodeFormatHint.QR_CODE: zxingcpp.BarcodeFormat.QRCode,
+        ScanBarcodeFormatHint.CODE_128: zxingcpp.BarcodeFormat.Code128,
+    }
+    back = {v: _FORMAT_NAMES[k] for k, v in names.items()}
+    kwargs = {"formats": reduce(operator.or_, (names[f] for f in formats))}
+    if hasattr(zxingcpp, "TextMode"):
+        # Texte brut : FNC1 rendu en GS (0x1D), comme ZXing Java, plutôt que le format HRI "(01)..."
+        kwargs["text_mode"] = zxingcpp.TextMode.Plain
+    if logf: logf.write("[DEBUG] Trying zxing-cpp...\n")
+    results = []
+    for res in zxingcpp.read_barcodes(np.asarray(gray_image), **kwargs):
+        p = res.position
+        xs = [p.top_left.x, p.top_right.x, p.bottom_right.x, p.bottom_left.x]
+        ys = [p.top_left.y, p.top_right.y, p.bottom_right.y, p.bottom_left.y]
+        results.append((res.text, back.get(res.format, str(res.format)), (min(xs), min(ys), max(xs) + 1, max(ys) + 1)))
+        if not multi:
+            break
+    return results
+
+
+# --- pyzbar (zbar, codes 1D) ---
+
+def _import_pyzbar():
+    from pyzbar.pyzbar import decode  # noqa: F401
+
+
+def _decode_pyzbar(gray_image: Image.Image, formats, multi: bool, timeout_ms: int, logf=None) -> List[BackendResult]:
+    from pyzbar.pyzbar import ZBarSymbol, decode as zbar_decode
+
+    if logf: logf.write("[DEBUG] Trying pyzbar...\n")
+    results = [
+        (res.data.decode("utf-8", errors="replace"), "CODE_128",
+         (res.rect.left, res.rect.top, res.rect.left + res.rect.width, res.rect.top + res.rect.height))
+        for res in zbar_decode(gray_image, symbols=[ZBarSymbol.CODE128])
+    ]
+    return results if multi else results[:1]
+
+
+register_backend(DecoderBackend(
+    name="zxing_jpype", decoder_type=DecoderType.ZXING, formats=ALL_FORMATS, efforts=ALL_EFFORTS,
+    multi=True, is_available=zxing_bridge.is_available,
+))
+register_backend(DecoderBackend(
+    name="pylibdmtx", decoder_type=DecoderType.PYLIBDMTX, formats=frozenset({ScanBarcodeFormatHint.DATAMATRIX}),
+    # Lent sur une image sans code (jusqu'au timeout) : réservé aux efforts "balanced" et "thorough"
+    efforts=frozenset({DecodeEffort.BALANCED, DecodeEffort.THOROUGH}),
+    # Fallback lent : une seule tentative, au dernier niveau de la pyramide
+    multi=True, is_available=_module_available(_import_pylibdmtx), decode=_decode_pylibdmtx, full_resolution_only=True,
+))
+register_backend(DecoderBackend(
+    name="zxing_cpp", decoder_type=DecoderType.ZXING_CPP, formats=ALL_FORMATS, efforts=ALL_EFFORTS,
+    multi=True, is_available=_module_available(_import_zxing_cpp), decode=_decode_zxing_cpp,
+))
+register_backend(DecoderBackend(
+    name="pyzbar", decoder_type=DecoderType.PYZBAR, formats=frozenset({ScanBarcodeFormatHint.CODE_128}),
+    efforts=ALL_EFFORTS, multi=True, is_available=_module_available(_import_pyzbar), decode=_decode_pyzbar,
+    full_resolution_only=True,
+))
+
+for _name in configured_backend_names():
+    if _name not in _BACKENDS:
+        print(f"Warning: moteur de décodage {_name!r} inconnu (GS1_DECODERS), ignoré. Connus: {', '.join(_BACKENDS)}")
+
+# --- END OF FILE decoder_backends.py ---
@@ -0,0 +1,41 @@
+# --- START OF FILE image_hash.py ---
+
+"""
+Empreintes perceptuelles 64 bits d'images en niveaux de gris (aHash, dHash).
+Deux images qui ne diffèrent que par le bruit du capteur ont des empreintes
+à faible distance de Hamming. Utilisées par le cache de quasi-doublons et
+pour ignorer les images quasi identiques d'une rafale.
+"""
+
+from typing import Callable, Dict
+
+import numpy as np
+from PIL import Image
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def average_hash(gray_image: Image.Image, hash_size: int = 8) -> int:
+    """aHash : chaque pixel de la miniature comparé à la moyenne."""
+    small = np.asarray(gray_image.resize((hash_size, hash_size), Image.BOX), dtype=np.int16)
+    return _bits_to_int(small > small.mean())
+
+
+def difference_hash(gray_image: Image.Image, hash_size: int = 8) -> int:
+    """dHash : chaque pixel de la miniature comparé à son voisin de droite."""
+    small = np.asarray(gray_image.resize((hash_size + 1, hash_size), Image.BOX), dtype=np.int16)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+PERCEPTUAL_HASHES: Dict[str, Callable[[Image.Image], int]] = {
+    "ahash": average_hash,
+    "dhash": difference_hash,
+}
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+# --- END OF FILE image_hash.py ---
@@ -0,0 +1,100 @@
+# --- START OF FILE image_store.py ---
+
+"""
+Stockage en mémoire des images déjà décodées en niveaux de gris.
+`POST /images` y dépose le buffer et retourne un identifiant ; `/decode/{id}`
+peut ensuite être appelé plusieurs fois (autres scan_types, effort, ROI) sans
+retransférer ni redécompresser le JPEG. Borné en octets (éviction LRU) et
+avec une durée de vie glissante : une image inutilisée expire après le TTL.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+
+class ImageStoreCapacityError(Exception):
+    """Levée quand une image est plus grande que la capacité totale du stockage."""
+
+
+class ImageStore:
+    """
+    Stockage LRU/TTL de buffers en niveaux de gris (mode 'L', un octet par pixel).
+
+    Args:
+        max_bytes (int): Taille maximale cumulée des buffers conservés
+        ttl_s (float): Durée de vie (secondes) d'une image depuis son dernier usage
+    """
+
+    def __init__(self, max_bytes: int, ttl_s: float):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._images: "OrderedDict[str, Tuple[float, Image.Image]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._evictions = 0
+
+    def put(self, gray_image: Image.Image) -> str:
+        """
+        Conserve une image et retourne son identifiant.
+
+        Raises:
+            ImageStoreCapacityError: Si l'image dépasse à elle seule la capacité
+        """
+        size = gray_image.size[0] * gray_image.size[1]
+        if size > self.max_bytes:
+            raise ImageStoreCapacityError(f"Image of {size} bytes exceeds store capacity of {self.max_bytes} bytes")
+        image_id = uuid.uuid4().hex
+        with self._lock:
+            self._purge_expired()
+            self._images[image_id] = (time.monotonic() + self.ttl_s, gray_image)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._images)))
+                self._evictions += 1
+        return image_id
+
+    def get(self, image_id: str) -> Optional[Image.Image]:
+        """Retourne l'image (et prolonge sa durée de vie), None si inconnue ou expirée."""
+        with self._lock:
+            entry = self._images.get(image_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(image_id)
+                return None
+            self._images[image_id] = (time.monotonic() + self.ttl_s, entry[1])
+            self._images.move_to_end(image_id)
+            return entry[1]
+
+    def delete(self, image_id: str) -> bool:
+        with self._lock:
+            if image_id not in self._images:
+                return False
+            self._drop(image_id)
+            return True
+
+    def _drop(self, image_id: str):
+        _, gray_image = self._images.pop(image_id)
+        self._bytes -= gray_image.size[0] * gray_image.size[1]
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for image_id in [i for i, (expires_at, _) in self._images.items() if expires_at < now]:
+            self._drop(image_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge_expired()
+            return {
+                "images": len(self._images),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+
+# --- END OF FILE image_store.py ---
@@ -0,0 +1,53 @@
+# --- START OF FILE jvm_cds.py ---
+
+"""
+Génération de l'archive AppCDS (class-data sharing) des classes ZXing.
+
+    python -m app.jvm_cds [/zxing/zxing.jsa]
+
+La JVM est démarrée via JPype avec les mêmes options qu'en production
+(classpath identique, condition pour que l'archive soit acceptée) et
+`-XX:ArchiveClassesAtExit` ; le préchauffage charge les classes du chemin de
+décodage, puis l'archive est écrite à l'arrêt de la JVM. Au démarrage
+suivant, GS1_JVM_CDS_ARCHIVE évite de recharger et vérifier ces classes.
+Nécessite une JVM 13 ou plus récente.
+"""
+
+import os
+import sys
+from typing import List, Optional
+
+import jpype
+
+from app import config, zxing_bridge
+from app.warmup import run_warmup
+
+DEFAULT_ARCHIVE = "/zxing/zxing.jsa"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else (config.JVM_CDS_ARCHIVE or DEFAULT_ARCHIVE)
+    if os.path.exists(path):
+        os.remove(path)
+
+    zxing_bridge.start_jvm(extra_options=[f"-XX:ArchiveClassesAtExit={path}"], use_cds=False)
+    if not zxing_bridge.is_available():
+        print("Error: JVM not started, AppCDS archive not generated.")
+        return 1
+    stats = run_warmup(max(1, config.WARMUP_ITERATIONS))
+    print(f"Decode path loaded: {stats}")
+    # L'archive est écrite pendant l'arrêt de la JVM
+    jpype.shutdownJVM()
+
+    if not os.path.isfile(path):
+        print(f"Error: AppCDS archive {path} was not written (JVM 13+ required).")
+        return 1
+    print(f"AppCDS archive written: {path} ({os.path.getsize(path)} bytes).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE jvm_cds.py ---
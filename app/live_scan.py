@@ -0,0 +1,97 @@
+# --- START OF FILE live_scan.py ---
+
+"""
+Briques du scan continu par WebSocket (`/ws/scan`).
+Le client pousse des frames JPEG en continu ; seule la plus récente est
+conservée en attente pendant qu'une autre est décodée, les frames
+intermédiaires sont abandonnées. Les lectures répétées d'un même code dans
+une fenêtre de temps ne sont renvoyées qu'une fois.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class LatestFrameSlot:
+    """
+    Emplacement d'une seule frame en attente (un producteur, un consommateur,
+    même boucle asyncio). Une nouvelle frame remplace celle qui attendait.
+    """
+
+    def __init__(self):
+        self._frame: Optional[Tuple[int, bytes]] = None
+        self._event = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame: bytes):
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = (self.received, frame)
+        self._event.set()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """Réveille le consommateur : plus aucune frame n'arrivera."""
+        self._closed = True
+        self._event.set()
+
+    async def get(self) -> Optional[Tuple[int, bytes]]:
+        """Attend la frame la plus récente : (numéro de frame, octets), None une fois fermé et vide."""
+        while self._frame is None:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        frame, self._frame = self._frame, None
+        return frame
+
+
+class ReadDeduplicator:
+    """
+    Filtre les lectures répétées d'un même code. Un code n'est renvoyé à
+    nouveau qu'après `window_s` secondes sans avoir été lu : tant qu'il reste
+    devant la caméra, chaque lecture prolonge la fenêtre.
+
+    Args:
+        window_s (float): Fenêtre de déduplication en secondes (0 : pas de filtrage)
+    """
+
+    def __init__(self, window_s: float):
+        self.window_s = window_s
+        self._last_seen: Dict[str, float] = {}
+
+    def is_new(self, raw: str) -> bool:
+        now = time.monotonic()
+        last_seen = self._last_seen.get(raw)
+        self._last_seen[raw] = now
+        if len(self._last_seen) > 1024:
+            self._purge(now)
+        return last_seen is None or now - last_seen > self.window_s
+
+    def _purge(self, now: float):
+        for raw in [r for r, seen in self._last_seen.items() if now - seen > self.window_s]:
+            del self._last_seen[raw]
+
+
+class LiveScanStats:
+    """Compteurs globaux des sessions de scan continu, exposés dans /health."""
+
+    def __init__(self):
+        self.active_sessions = 0
+        self.sessions = 0
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.reads_suppressed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+# --- END OF FILE live_scan.py ---
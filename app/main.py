@@ -7,95 +7,129 @@ __description__ = "API pour décoder et générer des codes-barres GS1, incluant
 __timestamp__ = "2025-06-19" # <--- MODIFICATION: Timestamp mis à jour
 
 # --- Imports ---
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, Response
-from fastapi.responses import StreamingResponse, PlainTextResponse
+import time
+_IMPORTS_STARTED_AT = time.perf_counter()  # Origine du rapport de démarrage (app/startup.py)
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, Response, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.formparsers import MultiPartParser
 from contextlib import asynccontextmanager
-import jpype
-import jpype.imports
-from jpype.types import JString
-from typing import Optional, List, Union, Dict, Any
-from enum import Enum
+from typing import Optional, List, Union, Dict, Any, Tuple
 
 from app.gs1_parser import parse_gs1
 from app.models import (
-    DecodeResponse, ErrorResponse, HealthResponse,
+    DecodeResponse, ErrorResponse, HealthResponse, ReadinessResponse,
     GenerateRequest, BarcodeFormat as ModelBarcodeFormat, ImageFormat as ModelImageFormat,
-    DecoderInfo, BarcodeItem,
+    DecoderInfo, BarcodeItem, ScanBarcodeFormatHint, DecodeStrategy, DecodeEffort,
+    BatchDecodeItem, BatchDecodeResponse, ImageHandleResponse,
     ParseRequest, ParseResponse # <--- AJOUT: Nouveaux modèles importés
 )
 from app.barcode_detector import DecoderType, BarcodeFormat as DetectedBarcodeFormatEnum
 from app.barcode_generator import generate_barcode, BarcodeFormat as GenBarcodeFormat, ImageFormat as GenImageFormat
+from app import zxing_bridge
+from app.decode_pipeline import (
+    DecodeOptions, DecodeOutcome, DecodedSymbol, ImageLoadError, ImageTooLargeError, decode_image_bytes, deadline_from_ms,
+    decode_original_scale, load_image_bytes, original_size, run_decode
+)
+from app.decoder_backends import jvm_required, registered_backends
+from app.image_store import ImageStore, ImageStoreCapacityError
+from app.archive_reader import ArchiveFormatError, ArchiveMember, open_archive
+from app.decode_executor import DecodeExecutor, DecodeQueueFullError
+from app.decode_farm import DecodeFarm, DecodeWorkerBusyError, DecodeWorkerError, RemoteDecoder
+from app.zxing_server import ZXingServerClient
+from app.decode_cache import DecodeResultCache, NearDuplicateCache, cache_key, new_content_hasher
+from app.live_scan import LatestFrameSlot, LiveScanStats, ReadDeduplicator
+from app.startup import StartupReport
+from app.warmup import run_warmup
+from app import config, metrics
+import asyncio
+import json
 import shutil
-from pylibdmtx.pylibdmtx import decode as dmtx_decode
-from PIL import Image
+import threading
 import os
 import io
 from datetime import datetime
 import traceback
 
-# --- Enum for Scan Type Hinting (Ideally move to models.py for better organization) ---
-class ScanBarcodeFormatHint(str, Enum):
-    DATAMATRIX = "DATAMATRIX"
-    QR_CODE = "QR_CODE"
-    CODE_128 = "CODE_128"
-
-# --- JPype Global Variables ---
-jpype_started = False
-NotFoundException_Java = None
-IOException_Java = None
-ImageIO_Java = None
-File_Java = None
-BufferedImageLuminanceSource_Java = None
-HybridBinarizer_Java = None
-BinaryBitmap_Java = None
-MultiFormatReader_Java = None
-DecodeHintType_Java = None
-Hints_Java = None
-BarcodeFormat_Java = None
-
-ZXING_CLASSPATH = "/zxing/core.jar:/zxing/javase.jar"
+# --- Pool de décodage et ferme de processus optionnelle (créés dans lifespan) ---
+decode_executor: Optional[DecodeExecutor] = None
+# Décodage hors processus : ferme de workers (mode "process") ou serveur ZXing partagé (mode "server")
+decode_farm: Optional[RemoteDecoder] = None
+image_store = ImageStore(config.IMAGE_STORE_MAX_BYTES, config.IMAGE_STORE_TTL_S)
+decode_cache = DecodeResultCache(config.DECODE_CACHE_MAX_BYTES, config.DECODE_CACHE_TTL_S)
+near_duplicate_cache = NearDuplicateCache(
+    config.NEAR_DUP_MAX_ENTRIES, config.NEAR_DUP_TTL_S, config.NEAR_DUP_MAX_DISTANCE, config.NEAR_DUP_HASH,
+    config.NEAR_DUP_MAX_REGION_DIFF
+) if config.NEAR_DUP_CACHE else None
+live_scan_stats = LiveScanStats()
+startup_report = StartupReport(_IMPORTS_STARTED_AT)
+startup_report.record("imports", time.perf_counter() - _IMPORTS_STARTED_AT)
+
+# Les parties multipart jusqu'à GS1_UPLOAD_SPOOL_MAX_BYTES restent en mémoire (sans écriture dans /tmp).
+MultiPartParser.spool_max_size = config.UPLOAD_SPOOL_MAX_BYTES
+
+# Taille des blocs lus sur l'upload (l'empreinte est calculée au fil de la réception).
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
 # --- Lifespan Manager ---
 @asynccontextmanager
 async def lifespan(app_instance: FastAPI):
-    global jpype_started, NotFoundException_Java, IOException_Java, ImageIO_Java, File_Java
-    global BufferedImageLuminanceSource_Java, HybridBinarizer_Java, BinaryBitmap_Java
-    global MultiFormatReader_Java, DecodeHintType_Java, Hints_Java, BarcodeFormat_Java
+    global decode_executor, decode_farm
+    lifespan_started_at = time.perf_counter()
+    # /parse/ et /generate n'attendent rien (bibliothèques de génération importées à la première utilisation)
+    startup_report.set_ready("parse")
+    startup_report.set_ready("generate")
+    startup_report.expect("decode")
+    decode_workers = config.DECODE_WORKERS
+    if config.DECODE_MODE == "process":
+        # Chaque worker démarre sa propre JVM : inutile d'en lancer une ici.
+        # Les décodages attendent qu'un worker soit prêt.
+        decode_farm = DecodeFarm(config.DECODE_PROCESSES, config.DECODE_TASK_TIMEOUT_S)
+        threading.Thread(target=_start_decode_farm, args=(decode_farm,), name="gs1-farm-start", daemon=True).start()
+        decode_workers = config.DECODE_PROCESSES
+    elif config.DECODE_MODE == "server":
+        # Une seule JVM pour tous les workers uvicorn, dans le serveur ZXing (lancé au besoin)
+        decode_farm = ZXingServerClient(
+            config.ZXING_SERVER_SOCKET, config.DECODE_TASK_TIMEOUT_S,
+            spawn=config.ZXING_SERVER_SPAWN, startup_timeout_s=config.ZXING_SERVER_STARTUP_TIMEOUT_S
+        )
+        threading.Thread(target=_start_decode_farm, args=(decode_farm,), name="gs1-farm-start", daemon=True).start()
+    elif jvm_required():
+        # Les décodages arrivés pendant le démarrage de la JVM l'attendent (dans la limite de leur budget)
+        zxing_bridge.start_jvm_in_background(on_done=_on_jvm_started)
+    else:
+        print("zxing_jpype absent de GS1_DECODERS: JVM non démarrée.")
+        startup_report.set_ready("decode")
+    with startup_report.step("decode_pool"):
+        decode_executor = DecodeExecutor(decode_workers, config.DECODE_QUEUE_SIZE)
+    print(f"Decode pool ready: {decode_workers} workers, queue size {config.DECODE_QUEUE_SIZE}.")
+    startup_report.record("lifespan", time.perf_counter() - lifespan_started_at)
+    print(f"API ready to serve after {time.perf_counter() - _IMPORTS_STARTED_AT:.2f}s: {startup_report.report()['steps_s']}")
+    yield
+    decode_executor.shutdown()
+    if decode_farm:
+        decode_farm.shutdown()
+    print("FastAPI shutting down. JPype JVM will shut down with the Python process if not manually stopped.")
 
-    print("Starting JPype JVM...")
-    try:
-        if not jpype.isJVMStarted():
-             jpype.startJVM(
-                 jpype.getDefaultJVMPath(),
-                 "-ea",
-                 f"-Djava.class.path={ZXING_CLASSPATH}",
-                 convertStrings=False
-             )
-             jpype_started = True
-             print("JPype JVM Started Successfully.")
-
-             print("Importing Java classes...")
-             NotFoundException_Java = jpype.JClass("com.google.zxing.NotFoundException")
-             IOException_Java = jpype.JClass("java.io.IOException")
-             ImageIO_Java = jpype.JClass("javax.imageio.ImageIO")
-             File_Java = jpype.JClass("java.io.File")
-             BufferedImageLuminanceSource_Java = jpype.JClass("com.google.zxing.client.j2se.BufferedImageLuminanceSource")
-             HybridBinarizer_Java = jpype.JClass("com.google.zxing.common.HybridBinarizer")
-             BinaryBitmap_Java = jpype.JClass("com.google.zxing.BinaryBitmap")
-             MultiFormatReader_Java = jpype.JClass("com.google.zxing.MultiFormatReader")
-             DecodeHintType_Java = jpype.JClass("com.google.zxing.DecodeHintType")
-             Hints_Java = jpype.JClass("java.util.Hashtable")
-             BarcodeFormat_Java = jpype.JClass("com.google.zxing.BarcodeFormat")
-             print("Java classes imported.")
 
-    except Exception as e:
-        print(f"FATAL: Failed to start JPype JVM or import classes: {e}")
-        if isinstance(e, jpype.JException) and hasattr(e, 'stacktrace'):
-            print(f"Java Stack Trace during startup:\n{e.stacktrace()}")
-        jpype_started = False
+def _on_jvm_started(available: bool):
+    startup_report.record("jvm", zxing_bridge.jvm_start_s or 0.0)
+    startup_report.add_detail("jvm_options", zxing_bridge.jvm_options_used)
+    if available:
+        # /decode n'est déclaré prêt qu'une fois le JIT préchauffé
+        with startup_report.step("warmup"):
+            startup_report.add_detail("warmup", run_warmup(config.WARMUP_ITERATIONS))
+    startup_report.set_ready("decode", detail=None if available else "ZXing (JPype) indisponible")
+    print(f"Decode ready: {startup_report.report()['steps_s']}")
 
-    yield
-    print("FastAPI shutting down. JPype JVM will shut down with the Python process if not manually stopped.")
+
+def _start_decode_farm(farm: RemoteDecoder):
+    with startup_report.step("decode_farm" if config.DECODE_MODE == "process" else "zxing_server"):
+        farm.start()
+    startup_report.add_detail("warmup", farm.warmup_report())
+    startup_report.set_ready("decode", detail=None if farm.is_available() or not jvm_required() else "ZXing (JPype) indisponible hors processus")
+    print(f"Decode ready: {startup_report.report()['steps_s']}")
 
 
 # --- Application FastAPI ---
@@ -106,6 +140,50 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+
+class RequestSizeLimitMiddleware:
+    """
+    Refuse (413) une requête dont le corps dépasse GS1_REQUEST_MAX_BYTES : dès
+    l'en-tête si son Content-Length le déclare, sinon (transfert chunked, en-tête
+    mensonger) au fil de la réception, dès que les octets reçus dépassent la
+    limite. Le multipart n'est donc jamais analysé ni spoolé au-delà.
+    """
+
+    def __init__(self, app_instance):
+        self.app = app_instance
+
+    async def __call__(self, scope, receive, send):
+        limit = config.REQUEST_MAX_BYTES
+        if scope["type"] != "http" or not limit:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse(
+                status_code=413,
+                content={"detail": f"Requête trop volumineuse ({int(length)} octets), maximum {limit}."}
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Levée pendant la lecture du corps : FastAPI la transmet telle quelle (réponse 413)
+                    raise HTTPException(status_code=413, detail=f"Requête trop volumineuse (> {limit} octets).")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(RequestSizeLimitMiddleware)
+
 # ... (Endpoint de débogage /_debug_log_viewer inchangé) ...
 @app.get("/_debug_log_viewer/{log_filename:path}", response_class=PlainTextResponse, include_in_schema=False)
 async def get_debug_log_viewer(log_filename: str):
@@ -126,17 +204,55 @@ async def get_debug_log_viewer(log_filename: str):
 
 @app.get("/health", response_model=HealthResponse)
 async def health():
-    zxing_ok = jpype_started and MultiFormatReader_Java is not None and shutil.which("java") is not None
+    zxing_ok = (decode_farm.is_available() if decode_farm else zxing_bridge.is_available()) and shutil.which("java") is not None
+    decoders = {backend.name: backend.capabilities() for backend in registered_backends()}
+    # ZXing tourne dans les workers en mode "process" : sa disponibilité vient de la ferme
+    decoders["zxing_jpype"]["available"] = zxing_ok
     capabilities = {
-        "decoders": {
-            "zxing_jpype": zxing_ok,
-            "pylibdmtx": _check_pylibdmtx_available()
-        },
+        "decoders": decoders,
         "supported_codes": [fmt.value for fmt in DetectedBarcodeFormatEnum if fmt != DetectedBarcodeFormatEnum.UNKNOWN],
         "api_version": app.version,
         "features": {"decode": True, "generate": True, "parse": True } # <--- MODIFICATION
     }
-    return {"status": "OK", "capabilities": capabilities}
+    pool_metrics = {"decode_pool": decode_executor.stats()} if decode_executor else None
+    if pool_metrics is not None and decode_farm:
+        pool_metrics["decode_farm" if config.DECODE_MODE == "process" else "zxing_server"] = decode_farm.stats()
+    if pool_metrics is not None:
+        pool_metrics["decode_cache"] = decode_cache.stats()
+        pool_metrics["image_store"] = image_store.stats()
+        if near_duplicate_cache:
+            pool_metrics["near_duplicate_cache"] = near_duplicate_cache.stats()
+        pool_metrics["live_scan"] = live_scan_stats.stats()
+        pool_metrics["startup"] = startup_report.report()
+    return {"status": "OK", "capabilities": capabilities, "metrics": pool_metrics}
+
+
+@app.get(
+    "/ready",
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse}},
+    summary="Disponibilité de l'API par fonctionnalité",
+    description="200 si la fonctionnalité demandée (`parse`, `generate`, `decode`), ou toutes à défaut, est prête ; 503 sinon. "
+                "Le corps détaille le temps de démarrage de chaque étape (sonde de disponibilité des pods)."
+)
+async def ready(capability: Optional[str] = Query(None, description="parse, generate ou decode (défaut : toutes)")):
+    report = startup_report.report()
+    is_ready = startup_report.is_ready(capability)
+    content = {"ready": is_ready, "capabilities": report["capabilities"], "startup": report["steps_s"]}
+    if "warmup" in report:
+        content["warmup"] = report["warmup"]
+    return JSONResponse(status_code=200 if is_ready else 503, content=content)
+
+
+@app.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Métriques au format Prometheus",
+    description="Durées par étape (`gs1_stage_duration_seconds`), codes trouvés par décodeur, codes renvoyés par symbologie "
+                "et échecs par cause, au format texte Prometheus. Propres au worker uvicorn qui répond."
+)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 # <--- AJOUT: NOUVEL ENDPOINT /parse/ --- >
@@ -196,32 +312,30 @@ async def parse_raw_data(request: ParseRequest):
 @app.post(
     "/decode/",
     response_model=DecodeResponse,
-    responses={422: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    responses={413: {"model": ErrorResponse}, 422: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
     summary="Décode des codes-barres à partir d'une image via JPype/ZXing",
-    description="Tente de décoder via l'API Java ZXing, puis fallback pylibdmtx. Permet de spécifier les types de codes à rechercher."
+    description="Décode l'image une seule fois en mémoire, tente ZXing (API Java), puis fallback pylibdmtx. Permet de spécifier les types de codes à rechercher, ou de retourner tous les codes de l'image (`multi`)."
 )
 async def decode_image(
+    response: Response,
     file: UploadFile = File(...),
     verbose: bool = Form(False),
     debug: bool = Form(False),
     log_file_name: Optional[str] = Form(None, alias="log_file"),
-    scan_types: Optional[List[ScanBarcodeFormatHint]] = Form(None, alias="scan_types", description="Liste des types de codes-barres à rechercher (ex: DATAMATRIX, QR_CODE). Défaut: tous.")
+    scan_types: Optional[List[ScanBarcodeFormatHint]] = Form(None, alias="scan_types", description="Liste des types de codes-barres à rechercher (ex: DATAMATRIX, QR_CODE). Défaut: tous."),
+    multi: bool = Form(False, description="Retourne tous les codes présents dans l'image (dédoublonnés par contenu et position) au lieu du premier trouvé."),
+    strategy: Optional[DecodeStrategy] = Form(None, description="`sequential` (ZXing puis pylibdmtx) ou `race` (moteurs en parallèle, le premier résultat gagne). Défaut: configuration serveur."),
+    effort: Optional[DecodeEffort] = Form(None, description="`fast` (passe simple), `balanced` (+ TRY_HARDER, pylibdmtx) ou `thorough` (+ GlobalHistogramBinarizer, inversion, rotation). S'arrête à la première étape qui trouve. Défaut: configuration serveur."),
+    deadline_ms: Optional[int] = Form(None, ge=0, description="Budget de temps (ms) partagé par toutes les étapes du décodage (chargement, pyramide, ZXing, pylibdmtx). 0 = illimité. Défaut: configuration serveur."),
+    skip_similar_frames: Optional[bool] = Form(None, description="Images multi-frames (GIF/TIFF animés, MJPEG) : ignore les frames quasi identiques à la dernière frame décodée. Défaut: configuration serveur.")
 ):
-    # ... (le code de cet endpoint reste identique à la version précédente) ...
-    global jpype_started, NotFoundException_Java, IOException_Java, ImageIO_Java, File_Java
-    global BufferedImageLuminanceSource_Java, HybridBinarizer_Java, BinaryBitmap_Java
-    global MultiFormatReader_Java, DecodeHintType_Java, Hints_Java, BarcodeFormat_Java
-
-    temp_file_path = f"/tmp/uploaded_{file.filename}"
     logf = None
+    budget_ms = config.DECODE_DEADLINE_MS if deadline_ms is None else deadline_ms
+    options = DecodeOptions(scan_types=scan_types, multi=multi, strategy=strategy, effort=effort,
+                            deadline=deadline_from_ms(budget_ms), skip_similar_frames=skip_similar_frames)
 
     try:
-        try:
-            with open(temp_file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-        except Exception as e:
-            print(f"Erreur sauvegarde fichier temp: {str(e)}") 
-            raise HTTPException(status_code=500, detail=f"Erreur sauvegarde fichier temp: {str(e)}")
+        image_bytes, content_digest = await _read_upload(file)
 
         if debug and log_file_name:
             try:
@@ -230,198 +344,542 @@ async def decode_image(
                     os.makedirs(log_dir, exist_ok=True)
                 logf = open(log_file_name, "a", encoding="utf-8")
                 logf.write(f"\n--- New Decode Request ({datetime.now()}) ---\n")
-                logf.write(f"[DEBUG] Uploaded file: {file.filename}, Saved to: {temp_file_path}\n")
+                logf.write(f"[DEBUG] Uploaded file: {file.filename}, {len(image_bytes)} bytes kept in memory, sha256 {content_digest}\n")
                 logf.write(f"[DEBUG] Verbose: {verbose}, Debug: {debug}, LogFile: {log_file_name}\n")
                 logf.write(f"[DEBUG] Scan types requested: {scan_types if scan_types else 'Default (All)'}\n")
+                logf.write(f"[DEBUG] Multi-symbol mode: {multi}, strategy: {strategy.value if strategy else 'server default'}, effort: {effort.value if effort else 'server default'}, budget: {budget_ms or 'unlimited'} ms\n")
             except Exception as e:
                 print(f"Warning: Impossible d'ouvrir le fichier de log {log_file_name}: {e}")
                 logf = None
 
-        decoded_data_list = []
-        decoder_used = DecoderType.NONE
-        zxing_error_msg = None
-        barcode_format_hint_from_decoder = None
+        barcodes_response_items = await _decode_upload(
+            image_bytes, content_digest, options, verbose, budget_ms, logf, headers=response.headers
+        )
+        del image_bytes
 
-        if jpype_started and MultiFormatReader_Java and BarcodeFormat_Java:
-            try:
-                if logf: logf.write(f"[DEBUG] Attempting decode with JPype/ZXing...\n")
-                
-                j_file = File_Java(JString(temp_file_path))
-                if not j_file.exists():
-                    if logf: logf.write(f"[ERROR] Java File object reports not found: {temp_file_path}\n")
-                    raise FileNotFoundError(f"Java File object reports not found: {temp_file_path}")
-
-                buffered_image = ImageIO_Java.read(j_file)
-                if buffered_image is None:
-                    if logf: logf.write(f"[ERROR] ImageIO.read returned null for {temp_file_path}. Image format unsupported or file corrupt.\n")
-                    raise ValueError("ImageIO.read returned null; image format might be unsupported by Java or file is corrupt.")
-
-                luminance_source = BufferedImageLuminanceSource_Java(buffered_image)
-                binarizer = HybridBinarizer_Java(luminance_source)
-                binary_bitmap = BinaryBitmap_Java(binarizer)
-
-                hints = Hints_Java()
-                possible_formats_vector = jpype.java.util.Vector()
-                
-                format_map_to_zxing = {
-                    ScanBarcodeFormatHint.DATAMATRIX: BarcodeFormat_Java.DATA_MATRIX,
-                    ScanBarcodeFormatHint.QR_CODE: BarcodeFormat_Java.QR_CODE,
-                    ScanBarcodeFormatHint.CODE_128: BarcodeFormat_Java.CODE_128,
-                }
-
-                apply_default_zxing_formats = True
-                if scan_types:
-                    user_requested_zxing_formats = False
-                    for stype in scan_types:
-                        if stype in format_map_to_zxing:
-                            possible_formats_vector.add(format_map_to_zxing[stype])
-                            if logf: logf.write(f"[DEBUG] Adding {stype.value} to ZXing hints.\n")
-                            user_requested_zxing_formats = True
-                    if user_requested_zxing_formats:
-                        apply_default_zxing_formats = False
-                    elif logf:
-                         logf.write(f"[WARN] User specified scan_types {scan_types} but none mapped. Applying default ZXing formats.\n")
-                
-                if apply_default_zxing_formats:
-                    if logf: logf.write(f"[DEBUG] Applying default ZXing formats: DATA_MATRIX, QR_CODE, CODE_128.\n")
-                    possible_formats_vector.add(BarcodeFormat_Java.DATA_MATRIX)
-                    possible_formats_vector.add(BarcodeFormat_Java.QR_CODE)
-                    possible_formats_vector.add(BarcodeFormat_Java.CODE_128)
-                
-                if not possible_formats_vector.isEmpty():
-                    hints.put(DecodeHintType_Java.POSSIBLE_FORMATS, possible_formats_vector)
-                
-                hints.put(DecodeHintType_Java.TRY_HARDER, jpype.java.lang.Boolean.TRUE)
-
-                reader = MultiFormatReader_Java()
-                java_result = reader.decode(binary_bitmap, hints)
-
-                if java_result:
-                    raw_java_string = java_result.getText()
-                    raw_python_string = str(raw_java_string)
-                    detected_java_format_obj = java_result.getBarcodeFormat()
-                    
-                    decoded_data_list = [raw_python_string]
-                    decoder_used = DecoderType.ZXING
-                    barcode_format_hint_from_decoder = str(detected_java_format_obj)
-
-                    if logf:
-                        logf.write(f"[DEBUG] JPype/ZXing success. Format hint: {barcode_format_hint_from_decoder}\n")
-                        logf.write(f"[DEBUG] Raw data (repr): {repr(raw_python_string)}\n")
-                else:
-                    zxing_error_msg = "ZXing reader.decode() returned null (no barcode found, no exception)"
-                    if logf: logf.write(f"[WARN] JPype/ZXing: {zxing_error_msg}\n")
-            
-            except NotFoundException_Java as e_nf:
-                zxing_error_msg = "NotFoundException (no code found by ZXing)"
-                if logf: logf.write(f"[DEBUG] JPype/ZXing: {zxing_error_msg}. Java Detail: {e_nf.getMessage() if hasattr(e_nf, 'getMessage') else e_nf}\n")
-            except IOException_Java as e_io:
-                zxing_error_msg = f"IOException during ZXing processing"
-                if logf: logf.write(f"[ERROR] JPype/ZXing: {zxing_error_msg}. Java Detail: {e_io.getMessage() if hasattr(e_io, 'getMessage') else e_io}\n")
-            except jpype.JException as e_j:
-                zxing_error_msg = f"Generic JPype/ZXing Java Error: {e_j.getClass().getName()}"
-                if logf: logf.write(f"[ERROR] {zxing_error_msg}\n")
-                if hasattr(e_j, 'stacktrace'):
-                    stack_trace = e_j.stacktrace()
-                    if logf: logf.write(f"Java Stack Trace:\n{stack_trace}\n")
-                elif logf: logf.write(f"Raw Java Exception (no stacktrace method): {e_j}\n")
-            except Exception as e_py:
-                zxing_error_msg = f"Python Error during JPype/ZXing attempt: {type(e_py).__name__} - {e_py}"
-                if logf: logf.write(f"[ERROR] {zxing_error_msg}\n")
-            
-            if zxing_error_msg:
-                decoded_data_list = []
-        else:
-            if logf: logf.write("[DEBUG] Skipping JPype/ZXing: JPype not started or core Java classes not available.\n")
-            zxing_error_msg = "JPype/ZXing not available or not initialized"
-
-        if not decoded_data_list:
-            if logf:
-                logf.write(f"[DEBUG] ZXing did not find codes (Reason: {zxing_error_msg if zxing_error_msg else 'skipped/not available'}).\n")
-            
-            should_try_pylibdmtx = True
-            if scan_types and ScanBarcodeFormatHint.DATAMATRIX not in scan_types:
-                should_try_pylibdmtx = False
-                if logf: logf.write(f"[DEBUG] Skipping pylibdmtx fallback as DATAMATRIX not in scan_types: {scan_types}.\n")
-            
-            if should_try_pylibdmtx:
-                if _check_pylibdmtx_available():
-                    if logf: logf.write(f"[DEBUG] Trying pylibdmtx...\n")
-                    try:
-                        pil_image = Image.open(temp_file_path)
-                        dmtx_results = dmtx_decode(pil_image.convert('L'), timeout=500, max_count=1)
-                        if dmtx_results:
-                            decoded_data_list = [res.data.decode("utf-8", errors="replace") for res in dmtx_results]
-                            decoder_used = DecoderType.PYLIBDMTX
-                            barcode_format_hint_from_decoder = "DATA_MATRIX"
-                            if logf:
-                                logf.write(f"[DEBUG] pylibdmtx found {len(decoded_data_list)} DataMatrix code(s).\n")
-                                for i, raw_data in enumerate(decoded_data_list):
-                                    logf.write(f"[DEBUG] pylibdmtx raw data {i} (repr): {repr(raw_data)}\n")
-                        else:
-                            if logf: logf.write("[DEBUG] pylibdmtx found no codes.\n")
-                    except Exception as e:
-                        if logf: logf.write(f"[ERROR] pylibdmtx error: {type(e).__name__} - {e}\n")
-                        decoded_data_list = []
-                elif logf:
-                    logf.write("[DEBUG] pylibdmtx not available for fallback.\n")
-
-        if logf:
-            logf.write(f"[DEBUG] Final decoder: {decoder_used.value if decoder_used else 'None'}\n")
-            logf.write(f"[DEBUG] Final decoded data count: {len(decoded_data_list)}\n")
-            
-        if not decoded_data_list:
-            detail_msg = "Aucun code-barres n'a pu être détecté ou décodé dans l'image."
-            if zxing_error_msg and decoder_used == DecoderType.NONE : 
-                 detail_msg += f" (Info décodeur principal: {zxing_error_msg})"
-            if logf: logf.write(f"[INFO] No barcodes decoded. Raising HTTPException: {detail_msg}\n")
-            raise HTTPException(status_code=422, detail=detail_msg)
-
-        barcodes_response_items = []
-        for raw_data_str in decoded_data_list:
+        if logf: logf.write(f"[INFO] Processed {len(barcodes_response_items)} barcodes.\n")
+        return _serialize_response(DecodeResponse(success=True, barcodes=barcodes_response_items), response.headers)
+
+    finally:
+        if logf and not logf.closed:
+            logf.write("--- End of Decode Request ---\n")
+            logf.close()
+
+
+@app.post(
+    "/decode/batch",
+    response_model=BatchDecodeResponse,
+    responses={413: {"model": ErrorResponse}},
+    summary="Décode un lot d'images en une seule requête",
+    description="Décode plusieurs images (champ `files` répété) en parallèle via le même pipeline que `/decode/`. Chaque image obtient sa liste de codes ou sa propre erreur : une image illisible ne fait pas échouer le lot."
+)
+async def decode_batch(
+    files: List[UploadFile] = File(...),
+    verbose: bool = Form(False),
+    scan_types: Optional[List[ScanBarcodeFormatHint]] = Form(None, alias="scan_types", description="Liste des types de codes-barres à rechercher (ex: DATAMATRIX, QR_CODE). Défaut: tous."),
+    multi: bool = Form(False, description="Retourne tous les codes de chaque image au lieu du premier trouvé."),
+    strategy: Optional[DecodeStrategy] = Form(None, description="`sequential` ou `race`. Défaut: configuration serveur."),
+    effort: Optional[DecodeEffort] = Form(None, description="`fast`, `balanced` ou `thorough`. Défaut: configuration serveur."),
+    deadline_ms: Optional[int] = Form(None, ge=0, description="Budget de temps (ms) de chaque image, décompté à partir du début de son décodage. 0 = illimité. Défaut: configuration serveur.")
+):
+    if len(files) > config.DECODE_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Trop d'images dans le lot ({len(files)}), maximum {config.DECODE_BATCH_MAX_FILES}."
+        )
+    budget_ms = config.DECODE_DEADLINE_MS if deadline_ms is None else deadline_ms
+    # Borne le nombre d'images du lot présentes à la fois dans le pool de décodage
+    semaphore = asyncio.Semaphore(config.DECODE_BATCH_CONCURRENCY)
+
+    async def decode_one(index: int, upload: UploadFile) -> BatchDecodeItem:
+        async with semaphore:
             try:
-                parsed_gs1_data = parse_gs1(raw_data_str, verbose=verbose)
-                
-                actual_decoder_name_str = "Unknown"
-                if decoder_used == DecoderType.ZXING:
-                    actual_decoder_name_str = "ZXing (JPype)"
-                elif decoder_used == DecoderType.PYLIBDMTX:
-                    actual_decoder_name_str = "pylibdmtx"
+                image_bytes, content_digest = await _read_upload(upload)
+            except HTTPException as e:
+                return BatchDecodeItem(index=index, filename=upload.filename, success=False,
+                                       status_code=e.status_code, error=str(e.detail))
+            finally:
+                await upload.close()
+            options = DecodeOptions(scan_types=scan_types, multi=multi, strategy=strategy, effort=effort,
+                                    deadline=deadline_from_ms(budget_ms))
+            return await _decode_item(index, upload.filename, image_bytes, content_digest, options, verbose, budget_ms)
+
+    items = await asyncio.gather(*(decode_one(i, upload) for i, upload in enumerate(files)))
+    decoded = sum(1 for item in items if item.success)
+    return _serialize_response(
+        BatchDecodeResponse(success=decoded > 0, total=len(items), decoded=decoded, failed=len(items) - decoded, items=items)
+    )
 
-                decoder_info_dict = get_decoder_info_adjusted(
-                    raw_data_str, 
-                    decoder_used,
-                    barcode_format_hint_from_decoder, 
-                    verbose=verbose
-                )
-                decoder_info_dict["decoder"] = actual_decoder_name_str 
 
-                decoder_info_model = DecoderInfo(**decoder_info_dict)
-                barcode_item = BarcodeItem(raw=raw_data_str, parsed=parsed_gs1_data, decoder_info=decoder_info_model)
-                barcodes_response_items.append(barcode_item)
-            except Exception as e_parse:
-                error_msg = f"Erreur parsing GS1/construction item pour '{repr(raw_data_str)}': {type(e_parse).__name__} - {e_parse}"
-                if logf: logf.write(f"[ERROR] {error_msg}\n")
+@app.post(
+    "/decode/archive",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}, 422: {"model": ErrorResponse}},
+    summary="Décode les images d'une archive ZIP ou TAR",
+    description="Parcourt les images d'une archive ZIP ou TAR (gzip/bz2/xz acceptés) sans rien extraire sur disque et les décode en parallèle (`GS1_DECODE_ARCHIVE_CONCURRENCY` à la fois). Les résultats sont renvoyés au fil de l'eau, une ligne JSON par image (nom du membre dans `filename`), puis une ligne `summary`."
+)
+async def decode_archive(
+    file: UploadFile = File(...),
+    verbose: bool = Form(False),
+    scan_types: Optional[List[ScanBarcodeFormatHint]] = Form(None, alias="scan_types", description="Liste des types de codes-barres à rechercher (ex: DATAMATRIX, QR_CODE). Défaut: tous."),
+    multi: bool = Form(False, description="Retourne tous les codes de chaque image au lieu du premier trouvé."),
+    strategy: Optional[DecodeStrategy] = Form(None, description="`sequential` ou `race`. Défaut: configuration serveur."),
+    effort: Optional[DecodeEffort] = Form(None, description="`fast`, `balanced` ou `thorough`. Défaut: configuration serveur."),
+    deadline_ms: Optional[int] = Form(None, ge=0, description="Budget de temps (ms) de chaque image, décompté à partir du début de son décodage. 0 = illimité. Défaut: configuration serveur.")
+):
+    try:
+        members = await asyncio.to_thread(open_archive, file.file, config.DECODE_ARCHIVE_MAX_MEMBER_BYTES)
+    except ArchiveFormatError as e:
+        await file.close()
+        raise HTTPException(status_code=422, detail=str(e))
+    budget_ms = config.DECODE_DEADLINE_MS if deadline_ms is None else deadline_ms
+
+    def make_options() -> DecodeOptions:
+        return DecodeOptions(scan_types=scan_types, multi=multi, strategy=strategy, effort=effort,
+                             deadline=deadline_from_ms(budget_ms))
 
-        if not barcodes_response_items:
-            msg = "Données décodées mais aucune n'a pu être parsée correctement."
-            if logf: logf.write(f"[ERROR] {msg}. Raising HTTPException.\n")
-            raise HTTPException(status_code=500, detail=msg)
+    return StreamingResponse(
+        _stream_archive_results(members, file, make_options, verbose, budget_ms),
+        media_type="application/x-ndjson"
+    )
 
-        if logf: logf.write(f"[INFO] Processed {len(barcodes_response_items)} barcodes.\n")
-        return DecodeResponse(success=True, barcodes=barcodes_response_items)
 
+async def _stream_archive_results(members, upload: UploadFile, make_options, verbose: bool, budget_ms: int):
+    """
+    Lit les membres de l'archive un par un (dans un thread) et les décode en
+    parallèle. Un membre n'est lu qu'une fois une place de décodage libre : au
+    plus GS1_DECODE_ARCHIVE_CONCURRENCY images sont en mémoire à la fois.
+    Chaque résultat est émis dès qu'il est prêt (ligne NDJSON).
+    """
+    semaphore = asyncio.Semaphore(config.DECODE_ARCHIVE_CONCURRENCY)
+    results: asyncio.Queue = asyncio.Queue()
+    archive_error: List[str] = []
+
+    async def decode_member(index: int, member: ArchiveMember):
+        try:
+            if member.error:
+                item = BatchDecodeItem(index=index, filename=member.name, success=False, status_code=422, error=member.error)
+            else:
+                hasher = new_content_hasher()
+                hasher.update(member.data)
+                item = await _decode_item(index, member.name, member.data, hasher.hexdigest(), make_options(), verbose, budget_ms)
+            await results.put(item)
+        finally:
+            semaphore.release()
+
+    async def produce():
+        tasks = []
+        try:
+            try:
+                while True:
+                    await semaphore.acquire()
+                    member = await asyncio.to_thread(next, members, None)
+                    if member is None:
+                        semaphore.release()
+                        break
+                    tasks.append(asyncio.create_task(decode_member(len(tasks), member)))
+            except Exception as e:
+                # Archive corrompue en cours de lecture : les images déjà lues restent décodées
+                archive_error.append(f"{type(e).__name__}: {e}")
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            results.put_nowait(None)
+
+    producer = asyncio.create_task(produce())
+    total = decoded = 0
+    try:
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            total += 1
+            decoded += item.success
+            yield json.dumps(jsonable_encoder(item), ensure_ascii=False) + "\n"
+        summary = {"total": total, "decoded": decoded, "failed": total - decoded}
+        if archive_error:
+            summary["archive_error"] = archive_error[0]
+        yield json.dumps({"summary": summary}, ensure_ascii=False) + "\n"
     finally:
-        if os.path.exists(temp_file_path):
+        # Client déconnecté ou fin normale : plus rien à lire dans l'archive
+        producer.cancel()
+        await upload.close()
+
+
+async def _decode_item(index: int, filename: Optional[str], image_bytes: bytes, content_digest: str,
+                       options: DecodeOptions, verbose: bool, budget_ms: int) -> BatchDecodeItem:
+    """Décode une image d'un lot ou d'une archive ; ses erreurs restent locales à l'élément."""
+    try:
+        barcodes = await _decode_upload(image_bytes, content_digest, options, verbose, budget_ms)
+        return BatchDecodeItem(index=index, filename=filename, success=True, barcodes=barcodes)
+    except HTTPException as e:
+        return BatchDecodeItem(index=index, filename=filename, success=False,
+                               status_code=e.status_code, error=str(e.detail))
+    except Exception as e:
+        print(f"Erreur interne lors du décodage de l'élément {index} ({filename}): {e}")
+        return BatchDecodeItem(index=index, filename=filename, success=False,
+                               status_code=500, error=f"{type(e).__name__}: {e}")
+
+
+@app.post(
+    "/images",
+    response_model=ImageHandleResponse,
+    status_code=201,
+    responses={413: {"model": ErrorResponse}, 422: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+    summary="Dépose une image pour des décodages répétés",
+    description="Décode l'image une fois en niveaux de gris et la conserve en mémoire (durée de vie `GS1_IMAGE_STORE_TTL` depuis la dernière utilisation). L'identifiant retourné s'utilise avec `/decode/{image_id}`."
+)
+async def upload_image(response: Response, file: UploadFile = File(...)):
+    image_bytes, _ = await _read_upload(file)
+    gray_image = await _run_decode_task(response.headers, None, load_image_bytes, image_bytes)
+    del image_bytes
+    try:
+        image_id = image_store.put(gray_image)
+    except ImageStoreCapacityError as e:
+        raise HTTPException(status_code=413, detail=f"Image trop grande pour être conservée: {e}")
+    # Taille d'origine : les zones et positions de /decode/{image_id} restent dans ce repère
+    width, height = original_size(gray_image)
+    return ImageHandleResponse(success=True, image_id=image_id, width=width, height=height,
+                               expires_in_s=config.IMAGE_STORE_TTL_S)
+
+
+@app.delete("/images/{image_id}", status_code=204, responses={404: {"model": ErrorResponse}})
+async def delete_image(image_id: str):
+    if not image_store.delete(image_id):
+        raise HTTPException(status_code=404, detail="Image inconnue ou expirée.")
+    return Response(status_code=204)
+
+
+@app.post(
+    "/decode/{image_id}",
+    response_model=DecodeResponse,
+    responses={404: {"model": ErrorResponse}, 422: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
+    summary="Décode une image déposée via /images",
+    description="Réutilise les pixels déjà décodés d'une image déposée : peut être appelé plusieurs fois avec d'autres `scan_types`, `effort` ou une zone (`roi`) sans retransférer l'image."
+)
+async def decode_stored_image(
+    response: Response,
+    image_id: str,
+    verbose: bool = Form(False),
+    scan_types: Optional[List[ScanBarcodeFormatHint]] = Form(None, alias="scan_types", description="Liste des types de codes-barres à rechercher (ex: DATAMATRIX, QR_CODE). Défaut: tous."),
+    multi: bool = Form(False, description="Retourne tous les codes présents dans l'image au lieu du premier trouvé."),
+    strategy: Optional[DecodeStrategy] = Form(None, description="`sequential` ou `race`. Défaut: configuration serveur."),
+    effort: Optional[DecodeEffort] = Form(None, description="`fast`, `balanced` ou `thorough`. Défaut: configuration serveur."),
+    deadline_ms: Optional[int] = Form(None, ge=0, description="Budget de temps (ms) du décodage. 0 = illimité. Défaut: configuration serveur."),
+    roi: Optional[str] = Form(None, description="Zone à décoder `left,top,right,bottom` en pixels de l'image. Défaut: image entière.")
+):
+    gray_image = image_store.get(image_id)
+    if gray_image is None:
+        raise HTTPException(status_code=404, detail="Image inconnue ou expirée.")
+    budget_ms = config.DECODE_DEADLINE_MS if deadline_ms is None else deadline_ms
+    options = DecodeOptions(scan_types=scan_types, multi=multi, strategy=strategy, effort=effort,
+                            roi=_parse_roi(roi, original_size(gray_image)), deadline=deadline_from_ms(budget_ms))
+    decode_fn = decode_farm.decode_image if decode_farm else run_decode
+    outcome = await _run_decode_task(response.headers, None, decode_original_scale, gray_image, options, decode_fn)
+    return _serialize_response(DecodeResponse(success=True, barcodes=_outcome_to_items(outcome, verbose, budget_ms)),
+                               response.headers)
+
+
+def _parse_roi(roi: Optional[str], image_size) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Lit une zone `left,top,right,bottom`, bornée aux dimensions de l'image.
+
+    Raises:
+        HTTPException: 422 si la zone est mal formée ou vide
+    """
+    if not roi:
+        return None
+    try:
+        left, top, right, bottom = (int(v) for v in roi.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"ROI invalide '{roi}': attendu 'left,top,right,bottom' (entiers).")
+    width, height = image_size
+    left, right = max(0, left), min(width, right)
+    top, bottom = max(0, top), min(height, bottom)
+    if right <= left or bottom <= top:
+        raise HTTPException(status_code=422, detail=f"ROI vide ou hors de l'image ({width}x{height}): '{roi}'.")
+    return left, top, right, bottom
+
+
+@app.websocket("/ws/scan")
+async def scan_websocket(
+    websocket: WebSocket,
+    verbose: bool = Query(False),
+    scan_types: Optional[List[ScanBarcodeFormatHint]] = Query(None),
+    multi: bool = Query(False),
+    effort: Optional[DecodeEffort] = Query(None),
+    deadline_ms: Optional[int] = Query(None, ge=0)
+):
+    """
+    Scan continu : le client envoie ses frames en messages binaires (JPEG, PNG).
+    Dès que le décodeur est libre, seule la frame la plus récente est décodée ;
+    les frames arrivées entre-temps sont abandonnées. Un message JSON
+    `{"frame", "frames_dropped", "barcodes"}` est renvoyé pour chaque frame où
+    un code non lu dans la fenêtre de déduplication a été trouvé, et
+    `{"frame", "error"}` pour une frame illisible.
+    """
+    await websocket.accept()
+    budget_ms = config.SCAN_DEADLINE_MS if deadline_ms is None else deadline_ms
+    slot = LatestFrameSlot()
+    reads = ReadDeduplicator(config.SCAN_DEDUP_WINDOW_S)
+    decode_fn = decode_farm.decode_image_bytes if decode_farm else decode_image_bytes
+    saturated = 0
+    live_scan_stats.sessions += 1
+    live_scan_stats.active_sessions += 1
+    receiver = asyncio.create_task(_receive_scan_frames(websocket, slot))
+    try:
+        while True:
+            frame = await slot.get()
+            if frame is None:
+                break
+            frame_number, image_bytes = frame
+            options = DecodeOptions(scan_types=scan_types, multi=multi, effort=effort,
+                                    deadline=deadline_from_ms(budget_ms))
             try:
-                os.remove(temp_file_path)
-                if logf and not logf.closed : logf.write(f"[DEBUG] Temp file {temp_file_path} removed.\n")
-            except OSError as e_remove:
-                if logf and not logf.closed: logf.write(f"[WARN] Could not remove temp file {temp_file_path}: {e_remove}\n")
-        
-        if logf and not logf.closed:
-            logf.write("--- End of Decode Request ---\n")
-            logf.close()
+                outcome = await _run_decode_task({}, None, decode_fn, image_bytes, options, None, near_duplicate_cache)
+            except HTTPException as e:
+                if e.status_code == 503:
+                    # Pool saturé par d'autres requêtes : la frame est abandonnée comme une frame périmée
+                    saturated += 1
+                    continue
+                if slot.closed:
+                    break
+                await websocket.send_json({"frame": frame_number, "error": e.detail})
+                continue
+            live_scan_stats.frames_decoded += 1
+            new_symbols = [symbol for symbol in outcome.symbols if reads.is_new(symbol.raw)]
+            live_scan_stats.reads_suppressed += len(outcome.symbols) - len(new_symbols)
+            if not new_symbols or slot.closed:
+                continue
+            items = _build_barcode_items(new_symbols, verbose, None, outcome.details)
+            await websocket.send_json({
+                "frame": frame_number,
+                "frames_dropped": slot.dropped + saturated,
+                "barcodes": jsonable_encoder(items),
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        live_scan_stats.active_sessions -= 1
+        live_scan_stats.frames_received += slot.received
+        live_scan_stats.frames_dropped += slot.dropped + saturated
+
+
+async def _receive_scan_frames(websocket: WebSocket, slot: LatestFrameSlot):
+    """Reçoit les frames du client en continu et ne garde que la dernière dans `slot`."""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None:
+                continue  # Les messages texte sont ignorés
+            if len(data) > config.SCAN_MAX_FRAME_BYTES:
+                await websocket.close(code=1009, reason=f"Frame trop volumineuse (> {config.SCAN_MAX_FRAME_BYTES} octets)")
+                break
+            slot.put(data)
+    finally:
+        slot.close()
+
+
+async def _decode_upload(image_bytes: bytes, content_digest: str, options: DecodeOptions, verbose: bool,
+                         budget_ms: int, logf=None, headers=None) -> List[BarcodeItem]:
+    """
+    Décode une image uploadée (cache, pool de décodage, parsing GS1) et construit
+    les éléments de réponse. Partagé par /decode/ et /decode/batch ; les en-têtes
+    de diagnostic (cache, attente en file) sont écrits dans `headers` si fourni.
+
+    Raises:
+        HTTPException: 422 (image illisible, aucun code), 500 (worker, parsing), 503 (file pleine)
+    """
+    if headers is None:
+        headers = {}
+    key = cache_key(content_digest, options)
+    outcome = decode_cache.get(key)
+    if outcome is not None:
+        # Même contenu déjà décodé : pas de JVM, seul le parsing GS1 est refait
+        outcome.details["cache"] = "hit"
+        headers["X-Decode-Cache"] = "hit"
+        if logf: logf.write(f"[DEBUG] Decode cache hit ({len(outcome.symbols)} code(s)); skipping decoders.\n")
+    if outcome is None:
+        decode_fn = decode_farm.decode_image_bytes if decode_farm else decode_image_bytes
+        outcome = await _run_decode_task(headers, logf, decode_fn, image_bytes, options, logf, near_duplicate_cache)
+        if "near_duplicate" in outcome.details:
+            headers["X-Decode-Cache"] = "near-duplicate"
+        else:
+            decode_cache.put(key, outcome)
+            headers["X-Decode-Cache"] = "miss"
+    if "frame" in outcome.details:
+        headers["X-Decode-Frame"] = str(outcome.details["frame"])
+    return _outcome_to_items(outcome, verbose, budget_ms, logf)
+
+
+async def _run_decode_task(headers, logf, fn, *args):
+    """
+    Exécute une tâche de décodage dans le pool et traduit ses erreurs en
+    réponses HTTP. Le temps d'attente en file est écrit dans `headers`.
+
+    Raises:
+        HTTPException: 503 (file pleine, aucun worker libre à temps), 413 (image trop grande), 422 (image illisible), 500 (worker)
+    """
+    try:
+        outcome, queue_wait_s = await decode_executor.run(fn, *args)
+        headers["X-Decode-Queue-Wait-Ms"] = f"{queue_wait_s * 1000:.1f}"
+        if logf: logf.write(f"[DEBUG] Waited {queue_wait_s * 1000:.1f} ms in decode queue.\n")
+        metrics.observe_stage("queue_wait", queue_wait_s)
+        if isinstance(outcome, DecodeOutcome):
+            _record_decode_metrics(outcome)
+        return outcome
+    except DecodeQueueFullError as e:
+        if logf: logf.write(f"[WARN] {e}. Rejecting request with 503.\n")
+        metrics.count_failure("queue_full")
+        raise HTTPException(
+            status_code=503,
+            detail="Le service de décodage est saturé, veuillez réessayer.",
+            headers={"Retry-After": str(config.DECODE_RETRY_AFTER_S)}
+        )
+    except ImageTooLargeError as e:
+        metrics.count_failure("image_too_large")
+        raise HTTPException(status_code=413, detail=f"Image trop grande: {e}")
+    except ImageLoadError as e:
+        metrics.count_failure("image_unreadable")
+        raise HTTPException(status_code=422, detail=f"Image illisible ou format non supporté: {e}")
+    except DecodeWorkerBusyError as e:
+        if logf: logf.write(f"[WARN] {e}. Rejecting request with 503.\n")
+        metrics.count_failure("queue_full")
+        raise HTTPException(
+            status_code=503,
+            detail="Aucun worker de décodage disponible à temps (démarrage ou saturation), veuillez réessayer.",
+            headers={"Retry-After": str(config.DECODE_RETRY_AFTER_S)}
+        )
+    except DecodeWorkerError as e:
+        if logf: logf.write(f"[ERROR] {e}\n")
+        metrics.count_failure("worker_error")
+        raise HTTPException(status_code=500, detail=f"Le worker de décodage a échoué: {e}")
+
+
+def _record_decode_metrics(outcome: DecodeOutcome):
+    """Durées des étapes du pipeline et décodeurs gagnants (un quasi-doublon servi par le cache n'est pas un succès de décodeur)."""
+    metrics.observe_timings(outcome.timings)
+    if "near_duplicate" not in outcome.details:
+        for symbol in outcome.symbols:
+            metrics.count_decoder_hit(symbol.decoder.value)
+
+
+def _serialize_response(model, headers=None) -> JSONResponse:
+    """Sérialise la réponse JSON (mesurée comme étape "serialization") en conservant les en-têtes de diagnostic."""
+    with metrics.stage_timer("serialization"):
+        return JSONResponse(content=jsonable_encoder(model), headers=dict(headers) if headers else None)
+
+
+def _outcome_to_items(outcome: DecodeOutcome, verbose: bool, budget_ms: int, logf=None) -> List[BarcodeItem]:
+    """
+    Construit les éléments de réponse d'un décodage (parsing GS1 inclus).
+
+    Raises:
+        HTTPException: 422 (aucun code, budget épuisé), 500 (aucun code parsable)
+    """
+    decoded_symbols = outcome.symbols
+
+    if logf:
+        final_decoder = decoded_symbols[0].decoder if decoded_symbols else DecoderType.NONE
+        logf.write(f"[DEBUG] Final decoder: {final_decoder.value}\n")
+        logf.write(f"[DEBUG] Final decoded data count: {len(decoded_symbols)}\n")
+
+    if not decoded_symbols and outcome.timed_out:
+        metrics.count_failure("deadline")
+        detail_msg = f"Aucun code-barres trouvé dans le budget de {budget_ms} ms."
+        if logf: logf.write(f"[INFO] Decode budget exhausted. Raising HTTPException: {detail_msg}\n")
+        raise HTTPException(status_code=422, detail=detail_msg)
+
+    if not decoded_symbols:
+        metrics.count_failure("no_code")
+        detail_msg = "Aucun code-barres n'a pu être détecté ou décodé dans l'image."
+        if outcome.zxing_error:
+             detail_msg += f" (Info décodeur principal: {outcome.zxing_error})"
+        if logf: logf.write(f"[INFO] No barcodes decoded. Raising HTTPException: {detail_msg}\n")
+        raise HTTPException(status_code=422, detail=detail_msg)
+
+    barcodes_response_items = _build_barcode_items(decoded_symbols, verbose, logf, outcome.details)
+
+    if not barcodes_response_items:
+        metrics.count_failure("unparsable")
+        msg = "Données décodées mais aucune n'a pu être parsée correctement."
+        if logf: logf.write(f"[ERROR] {msg}. Raising HTTPException.\n")
+        raise HTTPException(status_code=500, detail=msg)
+    return barcodes_response_items
+
+
+async def _read_upload(file: UploadFile) -> Tuple[bytes, str]:
+    """
+    Lit l'upload par blocs et calcule son empreinte SHA-256 pendant cette
+    lecture : un seul passage sur les octets, une fois le corps multipart reçu
+    et analysé par Starlette (le hachage ne se fait pas pendant le transfert
+    réseau).
+
+    Raises:
+        HTTPException: 413 dès que l'upload dépasse GS1_UPLOAD_MAX_BYTES
+    """
+    started_at = time.perf_counter()
+    hasher = new_content_hasher()
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if config.UPLOAD_MAX_BYTES and size > config.UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Image trop volumineuse (> {config.UPLOAD_MAX_BYTES} octets).")
+        hasher.update(chunk)
+        chunks.append(chunk)
+    # Lecture du fichier déjà reçu et analysé par le parseur multipart, pas le transfert réseau
+    metrics.observe_stage("upload_read", time.perf_counter() - started_at)
+    return b"".join(chunks), hasher.hexdigest()
+
+
+def _build_barcode_items(decoded_symbols: List[DecodedSymbol], verbose: bool, logf=None, decode_details: Optional[Dict[str, Any]] = None) -> List[BarcodeItem]:
+    """
+    Parse les données GS1 de chaque code décodé et construit les éléments de réponse.
+    En mode verbose, les détails du pipeline (niveau de pyramide, etc.) sont joints.
+    """
+    barcodes_response_items = []
+    for symbol in decoded_symbols:
+        raw_data_str = symbol.raw
+        try:
+            with metrics.stage_timer("parse_gs1"):
+                parsed_gs1_data = parse_gs1(raw_data_str, verbose=verbose)
+
+            actual_decoder_name_str = "Unknown"
+            if symbol.decoder == DecoderType.ZXING:
+                actual_decoder_name_str = "ZXing (JPype)"
+            elif symbol.decoder in (DecoderType.PYLIBDMTX, DecoderType.ZXING_CPP, DecoderType.PYZBAR):
+                actual_decoder_name_str = symbol.decoder.value
+
+            with metrics.stage_timer("classification"):
+                decoder_info_dict = get_decoder_info_adjusted(
+                    raw_data_str,
+                    symbol.decoder,
+                    symbol.format_hint,
+                    verbose=verbose
+                )
+            metrics.count_symbol(decoder_info_dict["format"])
+            decoder_info_dict["decoder"] = actual_decoder_name_str
+            if verbose and (decode_details or symbol.position):
+                decoder_info_dict["decode_details"] = dict(decode_details or {})
+                if symbol.position:
+                    decoder_info_dict["decode_details"]["position"] = list(symbol.position)
+
+            decoder_info_model = DecoderInfo(**decoder_info_dict)
+            barcode_item = BarcodeItem(raw=raw_data_str, parsed=parsed_gs1_data, decoder_info=decoder_info_model)
+            barcodes_response_items.append(barcode_item)
+        except Exception as e_parse:
+            error_msg = f"Erreur parsing GS1/construction item pour '{repr(raw_data_str)}': {type(e_parse).__name__} - {e_parse}"
+            if logf: logf.write(f"[ERROR] {error_msg}\n")
+    return barcodes_response_items
 
 
 @app.post("/generate/", 
@@ -491,14 +949,6 @@ async def generate_barcode_image(request: GenerateRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail="Erreur interne du serveur lors de la génération du code-barres.")
 
-def _check_pylibdmtx_available():
-    try:
-        return True
-    except ImportError:
-        return False
-    except Exception:
-        return False
-
 from app.barcode_detector import is_gs1_data, detect_generic_format, calculate_confidence, get_barcode_characteristics
 
 def get_decoder_info_adjusted(raw_data: str, decoder_used_enum: DecoderType, format_hint_str: Optional[str] = None, verbose: bool = False) -> dict:
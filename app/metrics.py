@@ -0,0 +1,223 @@
+# --- START OF FILE metrics.py ---
+
+"""
+Métriques de l'API au format texte Prometheus (`GET /metrics`).
+
+Histogrammes de durée par étape (réception de l'upload, chargement de
+l'image, chaque étape ZXing, chaque moteur natif, parsing GS1,
+classification, sérialisation de la réponse) et compteurs des décodeurs
+gagnants, des symbologies lues et des échecs par cause.
+
+Les durées des étapes de décodage voyagent dans `DecodeOutcome.timings` :
+elles sont donc aussi mesurées en mode "process" et "server", où le
+décodage a lieu dans un autre processus. Chaque worker uvicorn expose ses
+propres compteurs (Prometheus les agrège par instance).
+"""
+
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app import config
+
+# Bornes (secondes) des histogrammes de durée : de 0,5 ms à 10 s.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class _Metric:
+    """Base commune : nom, aide, noms d'étiquettes et verrou."""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels {sorted(labels)} != {sorted(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Compteur croissant, une série par combinaison d'étiquettes."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self._header()
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Histogramme cumulatif (bornes `le`, somme et nombre d'observations)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Par série : [nombre par intervalle (+Inf inclus), somme]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = self._header()
+        for key, (counts, total) in series:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exportées, rendues dans l'ordre d'enregistrement."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# --- Métriques de l'API ---
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "gs1_stage_duration_seconds",
+    "Durée des étapes du traitement d'une image (upload_read, queue_wait, image_load, zxing_<étape>, "
+    "moteurs natifs, parse_gs1, classification, serialization).",
+    ["stage"],
+))
+DECODER_HITS = REGISTRY.register(Counter(
+    "gs1_decoder_hits_total", "Codes trouvés par un décodeur (hors cache).", ["decoder"],
+))
+SYMBOLS = REGISTRY.register(Counter(
+    "gs1_symbols_total", "Codes renvoyés dans les réponses, par symbologie.", ["symbology"],
+))
+DECODE_FAILURES = REGISTRY.register(Counter(
+    "gs1_decode_failures_total",
+    "Décodages en échec par cause (no_code, deadline, unparsable, queue_full, image_too_large, "
+    "image_unreadable, worker_error).",
+    ["reason"],
+))
+
+
+def observe_stage(stage: str, duration_s: float):
+    """Enregistre la durée d'une étape (ignorée si GS1_METRICS=false)."""
+    if config.METRICS_ENABLED:
+        STAGE_DURATION.observe(duration_s, stage=stage)
+
+
+def observe_timings(timings: Optional[List[Tuple[str, float]]]):
+    """Enregistre les durées d'étapes rapportées par le pipeline (`DecodeOutcome.timings`)."""
+    for stage, duration_s in timings or ():
+        observe_stage(stage, duration_s)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Mesure la durée du bloc `with` comme étape `stage`."""
+    started_at = perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, perf_counter() - started_at)
+
+
+def count_decoder_hit(decoder: str):
+    if config.METRICS_ENABLED:
+        DECODER_HITS.inc(decoder=decoder)
+
+
+def count_symbol(symbology: str):
+    if config.METRICS_ENABLED:
+        SYMBOLS.inc(symbology=symbology)
+
+
+def count_failure(reason: str):
+    if config.METRICS_ENABLED:
+        DECODE_FAILURES.inc(reason=reason)
+
+
+def render() -> str:
+    """Toutes les métriques au format texte Prometheus."""
+    return REGISTRY.render()
+
+# --- END OF FILE metrics.py ---
@@ -4,6 +4,23 @@ from pydantic import BaseModel, Field
 from typing import List, Union, Dict, Any, Optional
 from enum import Enum
 
+class ScanBarcodeFormatHint(str, Enum):
+    """Types de codes-barres pouvant être demandés au décodage (paramètre `scan_types`)."""
+    DATAMATRIX = "DATAMATRIX"
+    QR_CODE = "QR_CODE"
+    CODE_128 = "CODE_128"
+
+class DecodeStrategy(str, Enum):
+    """Stratégie d'enchaînement des moteurs de décodage."""
+    SEQUENTIAL = "sequential"
+    RACE = "race"
+
+class DecodeEffort(str, Enum):
+    """Niveau d'effort : longueur de la cascade d'étapes de décodage."""
+    FAST = "fast"
+    BALANCED = "balanced"
+    THOROUGH = "thorough"
+
 class DecoderInfo(BaseModel):
     """Informations sur le décodeur utilisé et le format détecté."""
     decoder: str
@@ -11,6 +28,7 @@ class DecoderInfo(BaseModel):
     is_gs1: Optional[bool] = None
     confidence: Optional[float] = None
     characteristics: Optional[Dict[str, Any]] = None
+    decode_details: Optional[Dict[str, Any]] = None
 
 class ParsedVerboseItem(BaseModel):
     """Structure d'un élément AI parsé en mode verbose."""
@@ -30,6 +48,31 @@ class DecodeResponse(BaseModel):
     success: bool
     barcodes: List[BarcodeItem]
 
+class BatchDecodeItem(BaseModel):
+    """Résultat d'une image d'un lot : ses codes-barres, ou l'erreur qui lui est propre."""
+    index: int
+    filename: Optional[str] = None
+    success: bool
+    barcodes: List[BarcodeItem] = []
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchDecodeResponse(BaseModel):
+    """Réponse de l'API pour l'endpoint de décodage par lot."""
+    success: bool
+    total: int
+    decoded: int
+    failed: int
+    items: List[BatchDecodeItem]
+
+class ImageHandleResponse(BaseModel):
+    """Réponse de POST /images : identifiant de l'image conservée en mémoire."""
+    success: bool
+    image_id: str
+    width: int
+    height: int
+    expires_in_s: float
+
 class ErrorResponse(BaseModel):
     """Réponse en cas d'erreur."""
     success: bool = False
@@ -44,6 +87,14 @@ class HealthResponse(BaseModel):
     """Réponse de l'API pour l'endpoint de santé."""
     status: str
     capabilities: Dict[str, Any]
+    metrics: Optional[Dict[str, Any]] = None
+
+class ReadinessResponse(BaseModel):
+    """Réponse de l'endpoint /ready : disponibilité par fonctionnalité et durées du démarrage."""
+    ready: bool
+    capabilities: Dict[str, Any]
+    startup: Dict[str, float]
+    warmup: Optional[Dict[str, Any]] = None
 
 # --- Modèles pour la génération de codes-barres ---
 
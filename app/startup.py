@@ -0,0 +1,81 @@
+# --- START OF FILE startup.py ---
+
+"""
+Suivi du démarrage de l'API : durée de chaque étape (imports, pool de
+décodage, JVM ou ferme de processus démarrées en arrière-plan, préchauffage) et
+disponibilité de chaque fonctionnalité. `/parse/` et `/generate` sont servis
+immédiatement ; `/decode` attend la JVM. Le rapport est exposé par `/ready`
+et dans `/health` pour suivre les régressions du temps de démarrage.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+class StartupReport:
+    """
+    Étapes du démarrage et disponibilité par fonctionnalité.
+
+    Args:
+        started_at (float): Origine des temps (time.perf_counter()), au plus tôt
+            dans le démarrage du processus
+    """
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self._steps: Dict[str, float] = {}
+        self._capabilities: Dict[str, Dict[str, Any]] = {}
+        self._details: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def record(self, step: str, seconds: float):
+        with self._lock:
+            self._steps[step] = round(seconds, 3)
+
+    @contextmanager
+    def step(self, name: str):
+        """Mesure la durée d'une étape du démarrage."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started_at)
+
+    def add_detail(self, name: str, value: Any):
+        """Joint au rapport le détail d'une étape (ex. statistiques du préchauffage)."""
+        with self._lock:
+            self._details[name] = value
+
+    def expect(self, capability: str):
+        """Déclare une fonctionnalité pas encore prête."""
+        with self._lock:
+            self._capabilities[capability] = {"ready": False, "ready_after_s": None}
+
+    def set_ready(self, capability: str, detail: Optional[str] = None):
+        """Marque une fonctionnalité prête ; `detail` signale un fonctionnement dégradé."""
+        with self._lock:
+            self._capabilities[capability] = {
+                "ready": True,
+                "ready_after_s": round(time.perf_counter() - self.started_at, 3),
+            }
+            if detail:
+                self._capabilities[capability]["detail"] = detail
+
+    def is_ready(self, capability: Optional[str] = None) -> bool:
+        """Disponibilité d'une fonctionnalité, ou de toutes si `capability` est None."""
+        with self._lock:
+            if capability is not None:
+                return self._capabilities.get(capability, {}).get("ready", False)
+            return all(c["ready"] for c in self._capabilities.values())
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "steps_s": dict(self._steps),
+                "capabilities": {name: dict(c) for name, c in self._capabilities.items()},
+                **self._details,
+            }
+
+# --- END OF FILE startup.py ---
@@ -0,0 +1,86 @@
+# --- START OF FILE warmup.py ---
+
+"""
+Préchauffage du JIT HotSpot au démarrage.
+Les premiers décodages après un déploiement sont lents tant que la JVM n'a
+pas compilé le binariseur et les détecteurs de ZXing. Des images DataMatrix,
+QR et Code 128 synthétisées par barcode_generator passent GS1_WARMUP_ITERATIONS
+fois par le chemin de décodage de production avant que /decode soit déclaré
+prêt. En mode "process", chaque worker se préchauffe (une JVM par processus).
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app import zxing_bridge
+from app.barcode_generator import BarcodeFormat, ImageFormat, generate_barcode
+from app.decode_pipeline import DecodeOutcome, decode_image_bytes
+
+# Contenu GS1 des images synthétiques : GTIN, date de péremption, lot.
+WARMUP_DATA = "01034531200000111725010110WARMUP"
+
+# Format généré -> dimensions de l'image (largeur, hauteur).
+WARMUP_IMAGES = {
+    BarcodeFormat.DATAMATRIX: (300, 300),
+    BarcodeFormat.QRCODE: (300, 300),
+    BarcodeFormat.CODE128: (600, 200),
+}
+
+
+def build_warmup_images() -> Dict[str, bytes]:
+    """Génère les images PNG du préchauffage ; un format que le générateur ne sait pas produire est ignoré."""
+    images = {}
+    for barcode_format, (width, height) in WARMUP_IMAGES.items():
+        try:
+            images[barcode_format.value] = generate_barcode(
+                WARMUP_DATA, barcode_format, ImageFormat.PNG, width=width, height=height
+            )
+        except Exception as e:
+            print(f"Warning: warm-up image {barcode_format.value} not generated: {type(e).__name__} - {e}")
+    return images
+
+
+def run_warmup(iterations: int, decode: Optional[Callable[[bytes], DecodeOutcome]] = None) -> Dict[str, Any]:
+    """
+    Décode `iterations` fois chaque image synthétique avec `decode` (par défaut
+    decode_pipeline.decode_image_bytes, le chemin des requêtes). Sans ZXing
+    disponible, il n'y a pas de JIT à chauffer : le préchauffage est sauté.
+
+    Returns:
+        dict: Durée totale, latences (ms) de la première et de la dernière
+        passe par format, et formats effectivement décodés
+    """
+    if iterations <= 0:
+        return {"skipped": "GS1_WARMUP_ITERATIONS=0"}
+    if not zxing_bridge.is_available():
+        return {"skipped": "ZXing (JPype) indisponible"}
+    decode = decode or decode_image_bytes
+
+    started_at = time.perf_counter()
+    images = build_warmup_images()
+    first_ms: Dict[str, float] = {}
+    last_ms: Dict[str, float] = {}
+    decoded: Dict[str, bool] = {}
+    for iteration in range(iterations):
+        for name, image_bytes in images.items():
+            decode_started_at = time.perf_counter()
+            try:
+                outcome = decode(image_bytes)
+                decoded[name] = bool(outcome.symbols)
+            except Exception as e:
+                print(f"Warning: warm-up decode of {name} failed: {type(e).__name__} - {e}")
+                decoded[name] = False
+            elapsed_ms = round((time.perf_counter() - decode_started_at) * 1000, 2)
+            if iteration == 0:
+                first_ms[name] = elapsed_ms
+            last_ms[name] = elapsed_ms
+
+    return {
+        "iterations": iterations,
+        "duration_s": round(time.perf_counter() - started_at, 3),
+        "first_ms": first_ms,
+        "last_ms": last_ms,
+        "decoded": decoded,
+    }
+
+# --- END OF FILE warmup.py ---
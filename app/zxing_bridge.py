@@ -0,0 +1,415 @@
+# --- START OF FILE zxing_bridge.py ---
+
+"""
+Pont JPype vers ZXing (Java).
+Centralise le démarrage de la JVM, les classes Java importées et le décodage
+ZXing à partir d'un buffer de pixels en niveaux de gris déjà en mémoire
+(aucun passage par le système de fichiers ni par ImageIO). Les hints et les
+lecteurs ZXing sont réutilisés d'une requête à l'autre.
+"""
+
+import os
+import shlex
+import threading
+import time
+
+import jpype
+import jpype.imports
+from typing import Any, Dict, List, Optional, Tuple
+
+from app import config
+from app.models import ScanBarcodeFormatHint
+
+ZXING_CLASSPATH = "/zxing/core.jar:/zxing/javase.jar"
+
+# Option JVM de chaque ramasse-miettes configurable (GS1_JVM_GC).
+JVM_GC_OPTIONS = {
+    "serial": "-XX:+UseSerialGC",
+    "parallel": "-XX:+UseParallelGC",
+    "g1": "-XX:+UseG1GC",
+    "z": "-XX:+UseZGC",
+    "shenandoah": "-XX:+UseShenandoahGC",
+}
+
+# --- JPype Global Variables ---
+jpype_started = False
+NotFoundException_Java = None
+IOException_Java = None
+PlanarYUVLuminanceSource_Java = None
+HybridBinarizer_Java = None
+GlobalHistogramBinarizer_Java = None
+BinaryBitmap_Java = None
+MultiFormatReader_Java = None
+DecodeHintType_Java = None
+Hints_Java = None
+BarcodeFormat_Java = None
+GenericMultipleBarcodeReader_Java = None
+QRCodeMultiReader_Java = None
+DataMatrixReader_Java = None
+QRCodeReader_Java = None
+Code128Reader_Java = None
+
+
+# Options effectivement passées à la JVM (exposées dans le rapport de démarrage).
+jvm_options_used: List[str] = []
+
+
+def build_jvm_options(use_cds: bool = True) -> List[str]:
+    """
+    Options de démarrage de la JVM : classpath ZXing, tas, pile, ramasse-miettes,
+    options libres (GS1_JVM_*) et archive AppCDS si elle existe.
+    """
+    options = ["-ea", f"-Djava.class.path={ZXING_CLASSPATH}"]
+    if config.JVM_HEAP_MIN:
+        options.append(f"-Xms{config.JVM_HEAP_MIN}")
+    if config.JVM_HEAP_MAX:
+        options.append(f"-Xmx{config.JVM_HEAP_MAX}")
+    if config.JVM_THREAD_STACK:
+        options.append(f"-Xss{config.JVM_THREAD_STACK}")
+    if config.JVM_GC:
+        if config.JVM_GC in JVM_GC_OPTIONS:
+            options.append(JVM_GC_OPTIONS[config.JVM_GC])
+        else:
+            print(f"Warning: GS1_JVM_GC={config.JVM_GC!r} inconnu, ignoré. Connus: {', '.join(JVM_GC_OPTIONS)}")
+    options.extend(shlex.split(config.JVM_OPTIONS))
+    if use_cds and config.JVM_CDS_ARCHIVE:
+        if os.path.isfile(config.JVM_CDS_ARCHIVE):
+            # -Xshare:auto (défaut) : une archive incompatible est ignorée par la JVM, sans erreur
+            options.append(f"-XX:SharedArchiveFile={config.JVM_CDS_ARCHIVE}")
+        else:
+            print(f"AppCDS archive {config.JVM_CDS_ARCHIVE} not found; starting without it.")
+    return options
+
+
+def start_jvm(extra_options: Optional[List[str]] = None, use_cds: bool = True):
+    """
+    Démarre la JVM et importe les classes ZXing utilisées par le décodage.
+    Sans effet si la JVM est déjà démarrée. Les erreurs sont affichées et
+    laissent `jpype_started` à False.
+
+    Args:
+        extra_options: Options JVM ajoutées à celles de la configuration
+        use_cds: Utiliser l'archive AppCDS configurée (False pendant sa génération)
+    """
+    global jpype_started, NotFoundException_Java, IOException_Java, PlanarYUVLuminanceSource_Java
+    global GlobalHistogramBinarizer_Java, HybridBinarizer_Java, BinaryBitmap_Java, MultiFormatReader_Java
+    global DecodeHintType_Java, Hints_Java, BarcodeFormat_Java
+    global GenericMultipleBarcodeReader_Java, QRCodeMultiReader_Java
+    global DataMatrixReader_Java, QRCodeReader_Java, Code128Reader_Java, jvm_options_used
+
+    print("Starting JPype JVM...")
+    try:
+        if not jpype.isJVMStarted():
+            options = build_jvm_options(use_cds) + list(extra_options or [])
+            print(f"JVM options: {' '.join(options)}")
+            jpype.startJVM(jpype.getDefaultJVMPath(), *options, convertStrings=False)
+            jvm_options_used = options
+            jpype_started = True
+            print("JPype JVM Started Successfully.")
+
+            print("Importing Java classes...")
+            NotFoundException_Java = jpype.JClass("com.google.zxing.NotFoundException")
+            IOException_Java = jpype.JClass("java.io.IOException")
+            PlanarYUVLuminanceSource_Java = jpype.JClass("com.google.zxing.PlanarYUVLuminanceSource")
+            HybridBinarizer_Java = jpype.JClass("com.google.zxing.common.HybridBinarizer")
+            GlobalHistogramBinarizer_Java = jpype.JClass("com.google.zxing.common.GlobalHistogramBinarizer")
+            BinaryBitmap_Java = jpype.JClass("com.google.zxing.BinaryBitmap")
+            MultiFormatReader_Java = jpype.JClass("com.google.zxing.MultiFormatReader")
+            DecodeHintType_Java = jpype.JClass("com.google.zxing.DecodeHintType")
+            Hints_Java = jpype.JClass("java.util.Hashtable")
+            BarcodeFormat_Java = jpype.JClass("com.google.zxing.BarcodeFormat")
+            GenericMultipleBarcodeReader_Java = jpype.JClass("com.google.zxing.multi.GenericMultipleBarcodeReader")
+            QRCodeMultiReader_Java = jpype.JClass("com.google.zxing.multi.qrcode.QRCodeMultiReader")
+            DataMatrixReader_Java = jpype.JClass("com.google.zxing.datamatrix.DataMatrixReader")
+            QRCodeReader_Java = jpype.JClass("com.google.zxing.qrcode.QRCodeReader")
+            Code128Reader_Java = jpype.JClass("com.google.zxing.oned.Code128Reader")
+            print("Java classes imported.")
+
+    except Exception as e:
+        print(f"FATAL: Failed to start JPype JVM or import classes: {e}")
+        if isinstance(e, jpype.JException) and hasattr(e, 'stacktrace'):
+            print(f"Java Stack Trace during startup:\n{e.stacktrace()}")
+        jpype_started = False
+
+
+# Positionné tant qu'aucun démarrage en arrière-plan n'est en cours.
+_jvm_startup_done = threading.Event()
+_jvm_startup_done.set()
+jvm_start_s: Optional[float] = None
+
+
+def _start_jvm_and_signal(on_done):
+    global jvm_start_s
+    started_at = time.perf_counter()
+    try:
+        start_jvm()
+    finally:
+        jvm_start_s = time.perf_counter() - started_at
+        _jvm_startup_done.set()
+        if on_done is not None:
+            on_done(is_available())
+
+
+def start_jvm_in_background(on_done=None) -> threading.Thread:
+    """
+    Démarre la JVM dans un thread dédié pour ne pas retarder le démarrage de
+    l'API. `on_done(disponible)` est appelé à la fin du démarrage ; les
+    décodages arrivés entre-temps attendent via `wait_for_jvm`.
+    """
+    _jvm_startup_done.clear()
+    thread = threading.Thread(target=_start_jvm_and_signal, args=(on_done,), name="gs1-jvm-start", daemon=True)
+    thread.start()
+    return thread
+
+
+def jvm_starting() -> bool:
+    return not _jvm_startup_done.is_set()
+
+
+def wait_for_jvm(timeout_s: Optional[float] = None) -> bool:
+    """Attend la fin d'un démarrage en arrière-plan (au plus `timeout_s` secondes) ; retourne is_available()."""
+    _jvm_startup_done.wait(timeout_s)
+    return is_available()
+
+
+def is_available() -> bool:
+    """Indique si la JVM est démarrée et les classes ZXing importées."""
+    return jpype_started and MultiFormatReader_Java is not None and BarcodeFormat_Java is not None
+
+
+def attach_current_thread():
+    """
+    Attache le thread courant à la JVM (en daemon, pour ne pas bloquer l'arrêt).
+    À appeler depuis les threads de décodage avant tout appel Java.
+    """
+    if jpype.isJVMStarted() and not jpype.java.lang.Thread.isAttached():
+        jpype.java.lang.Thread.attachAsDaemon()
+
+
+def to_java_pixels(gray_image):
+    """Copie les octets d'une image PIL en mode 'L' dans un byte[] Java (lecture seule ensuite)."""
+    return jpype.JArray(jpype.JByte)(gray_image.tobytes())
+
+
+def build_luminance_source(gray_image, java_pixels=None):
+    """
+    Construit une source de luminance ZXing directement depuis les octets
+    d'une image PIL en mode 'L' (le plan Y d'un PlanarYUVLuminanceSource
+    est exactement un buffer 8 bits de niveaux de gris). Un byte[] déjà
+    construit peut être partagé entre plusieurs sources (stratégie "race").
+    """
+    width, height = gray_image.size
+    if java_pixels is None:
+        java_pixels = to_java_pixels(gray_image)
+    return PlanarYUVLuminanceSource_Java(java_pixels, width, height, 0, 0, width, height, False)
+
+
+def _single_reader(reader: str):
+    if reader == "datamatrix":
+        return DataMatrixReader_Java()
+    if reader == "qrcode":
+        return QRCodeReader_Java()
+    if reader == "code128":
+        return Code128Reader_Java()
+    return MultiFormatReader_Java()
+
+
+def supports_also_inverted() -> bool:
+    """Le hint ALSO_INVERTED n'existe qu'à partir de ZXing 3.4."""
+    return DecodeHintType_Java is not None and hasattr(DecodeHintType_Java, "ALSO_INVERTED")
+
+
+# --- Hints et lecteurs réutilisés ---
+# Les hints sont construits une seule fois par combinaison (formats, try_harder,
+# also_inverted) puis partagés en lecture seule par tous les threads ; chaque
+# thread garde ses propres lecteurs, configurés une fois avec setHints.
+
+# Constante BarcodeFormat ZXing de chaque type demandable.
+_ZXING_FORMATS = {
+    ScanBarcodeFormatHint.DATAMATRIX: "DATA_MATRIX",
+    ScanBarcodeFormatHint.QR_CODE: "QR_CODE",
+    ScanBarcodeFormatHint.CODE_128: "CODE_128",
+}
+_DEFAULT_FORMATS = ("CODE_128", "DATA_MATRIX", "QR_CODE")
+# Lecteur dédié appelé directement quand un seul format est recherché.
+_DEDICATED_READERS = {"DATA_MATRIX": "datamatrix", "QR_CODE": "qrcode", "CODE_128": "code128"}
+
+HintsKey = Tuple[Tuple[str, ...], bool, bool]
+_hints_cache: Dict[HintsKey, Any] = {}
+_hints_lock = threading.Lock()
+_thread_state = threading.local()
+
+
+def resolve_formats(scan_types: Optional[List[ScanBarcodeFormatHint]], logf=None) -> Tuple[str, ...]:
+    """Formats ZXing (triés) d'une liste de types demandés ; tous les formats si aucun n'est reconnu."""
+    if scan_types:
+        formats = tuple(sorted({_ZXING_FORMATS[t] for t in scan_types if t in _ZXING_FORMATS}))
+        if formats:
+            return formats
+        if logf: logf.write(f"[WARN] User specified scan_types {scan_types} but none mapped. Applying default ZXing formats.\n")
+    return _DEFAULT_FORMATS
+
+
+def _build_hints(formats: Tuple[str, ...], try_harder: bool, also_inverted: bool):
+    hints = Hints_Java()
+    possible_formats_vector = jpype.java.util.Vector()
+    for name in formats:
+        possible_formats_vector.add(getattr(BarcodeFormat_Java, name))
+    hints.put(DecodeHintType_Java.POSSIBLE_FORMATS, possible_formats_vector)
+    if try_harder:
+        hints.put(DecodeHintType_Java.TRY_HARDER, jpype.java.lang.Boolean.TRUE)
+    if also_inverted:
+        hints.put(DecodeHintType_Java.ALSO_INVERTED, jpype.java.lang.Boolean.TRUE)
+    return jpype.java.util.Collections.unmodifiableMap(hints)
+
+
+def get_hints(scan_types: Optional[List[ScanBarcodeFormatHint]], logf=None, try_harder: bool = True,
+              also_inverted: bool = False) -> Tuple[HintsKey, Any]:
+    """
+    Hints ZXing (Map Java non modifiable) d'une combinaison de types et
+    d'options, construits au premier usage puis réutilisés.
+
+    Returns:
+        tuple: (clé de la combinaison, hints)
+    """
+    key = (resolve_formats(scan_types, logf), try_harder, also_inverted and supports_also_inverted())
+    hints = _hints_cache.get(key)
+    if hints is None:
+        with _hints_lock:
+            hints = _hints_cache.get(key)
+            if hints is None:
+                hints = _hints_cache[key] = _build_hints(*key)
+    if logf: logf.write(f"[DEBUG] ZXing hints: formats {', '.join(key[0])}, try_harder={key[1]}, also_inverted={key[2]}.\n")
+    return key, hints
+
+
+def _thread_reader(reader: str, hints_key: Optional[HintsKey] = None, hints=None):
+    """
+    Lecteur ZXing propre au thread courant. Un MultiFormatReader est créé par
+    combinaison de hints et configuré une seule fois (setHints) ; les lecteurs
+    dédiés reçoivent les hints à chaque appel.
+    """
+    readers = getattr(_thread_state, "readers", None)
+    if readers is None:
+        readers = _thread_state.readers = {}
+    cache_key = (reader, hints_key if reader == "multi" else None)
+    instance = readers.get(cache_key)
+    if instance is None:
+        instance = _single_reader(reader)
+        if reader == "multi":
+            instance.setHints(hints)
+        readers[cache_key] = instance
+    return instance
+
+
+def _result_bbox(java_result) -> Optional[Tuple[int, int, int, int]]:
+    """Boîte englobante (left, top, right, bottom) des points de repère d'un résultat ZXing."""
+    points = java_result.getResultPoints()
+    if points is None or len(points) == 0:
+        return None
+    xs = [float(p.getX()) for p in points if p is not None]
+    ys = [float(p.getY()) for p in points if p is not None]
+    if not xs:
+        return None
+    return (int(min(xs)), int(min(ys)), int(max(xs)) + 1, int(max(ys)) + 1)
+
+
+def _decode_multiple(binary_bitmap, hints_key: HintsKey, hints):
+    """
+    Tous les codes de l'image : lecteur générique multiple, plus QRCodeMultiReader
+    si QR demandé. Chaque lecteur est essayé même si l'autre ne trouve rien ;
+    NotFoundException n'est levée que si aucun ne trouve de code.
+    """
+    readers = [GenericMultipleBarcodeReader_Java(_thread_reader("multi", hints_key, hints))]
+    if "QR_CODE" in hints_key[0]:
+        readers.append(QRCodeMultiReader_Java())
+    results = []
+    for reader in readers:
+        try:
+            results.extend(reader.decodeMultiple(binary_bitmap, hints))
+        except NotFoundException_Java:
+            pass
+    if not results:
+        raise NotFoundException_Java.getNotFoundInstance()
+    return results
+
+
+def decode_zxing(gray_image, scan_types: Optional[List[ScanBarcodeFormatHint]] = None, logf=None,
+                 multi: bool = False, reader: str = "multi", java_pixels=None,
+                 try_harder: bool = True, binarizer: str = "hybrid",
+                 also_inverted: bool = False) -> Tuple[List[Tuple[str, str, Optional[Tuple[int, int, int, int]]]], Optional[str]]:
+    """
+    Décode une image PIL en niveaux de gris avec ZXing.
+    En mode `multi`, tous les codes présents sont retournés (lecteurs multiples).
+    `reader` choisit un lecteur dédié ("datamatrix", "qrcode", "code128") à la
+    place du MultiFormatReader, choisi aussi d'office quand un seul format est
+    recherché ; `java_pixels` réutilise un byte[] déjà construit.
+    `try_harder`, `binarizer` ("hybrid" ou "global") et `also_inverted`
+    correspondent aux étapes de la cascade d'effort.
+
+    Returns:
+        tuple: (liste de triplets (texte brut, format ZXing, boîte englobante), message d'erreur ou None)
+    """
+    if not is_available():
+        if logf: logf.write("[DEBUG] Skipping JPype/ZXing: JPype not started or core Java classes not available.\n")
+        return [], "JPype/ZXing not available or not initialized"
+
+    zxing_error_msg = None
+    try:
+        if logf: logf.write(f"[DEBUG] Attempting decode with JPype/ZXing...\n")
+
+        luminance_source = build_luminance_source(gray_image, java_pixels)
+        if binarizer == "global":
+            binary_bitmap = BinaryBitmap_Java(GlobalHistogramBinarizer_Java(luminance_source))
+        else:
+            binary_bitmap = BinaryBitmap_Java(HybridBinarizer_Java(luminance_source))
+
+        hints_key, hints = get_hints(scan_types, logf, try_harder=try_harder, also_inverted=also_inverted)
+        formats, _, inverted = hints_key
+        if reader == "multi" and len(formats) == 1 and not inverted and not multi:
+            # Un seul format : lecteur dédié (ALSO_INVERTED n'est géré que par MultiFormatReader)
+            reader = _DEDICATED_READERS[formats[0]]
+            if logf: logf.write(f"[DEBUG] Single format requested: using dedicated {reader} reader.\n")
+        if multi and reader == "multi":
+            java_results = _decode_multiple(binary_bitmap, hints_key, hints)
+        elif multi:
+            java_results = list(GenericMultipleBarcodeReader_Java(_thread_reader(reader)).decodeMultiple(binary_bitmap, hints))
+        elif reader == "multi":
+            java_results = [_thread_reader("multi", hints_key, hints).decodeWithState(binary_bitmap)]
+        else:
+            java_results = [_thread_reader(reader).decode(binary_bitmap, hints)]
+        java_results = [r for r in java_results if r is not None]
+
+        if java_results:
+            results = []
+            for java_result in java_results:
+                raw_python_string = str(java_result.getText())
+                barcode_format_hint = str(java_result.getBarcodeFormat())
+                if logf:
+                    logf.write(f"[DEBUG] JPype/ZXing success. Format hint: {barcode_format_hint}\n")
+                    logf.write(f"[DEBUG] Raw data (repr): {repr(raw_python_string)}\n")
+                results.append((raw_python_string, barcode_format_hint, _result_bbox(java_result)))
+            return results, None
+
+        zxing_error_msg = "ZXing reader.decode() returned null (no barcode found, no exception)"
+        if logf: logf.write(f"[WARN] JPype/ZXing: {zxing_error_msg}\n")
+
+    except NotFoundException_Java as e_nf:
+        zxing_error_msg = "NotFoundException (no code found by ZXing)"
+        if logf: logf.write(f"[DEBUG] JPype/ZXing: {zxing_error_msg}. Java Detail: {e_nf.getMessage() if hasattr(e_nf, 'getMessage') else e_nf}\n")
+    except IOException_Java as e_io:
+        zxing_error_msg = f"IOException during ZXing processing"
+        if logf: logf.write(f"[ERROR] JPype/ZXing: {zxing_error_msg}. Java Detail: {e_io.getMessage() if hasattr(e_io, 'getMessage') else e_io}\n")
+    except jpype.JException as e_j:
+        zxing_error_msg = f"Generic JPype/ZXing Java Error: {e_j.getClass().getName()}"
+        if logf: logf.write(f"[ERROR] {zxing_error_msg}\n")
+        if hasattr(e_j, 'stacktrace'):
+            if logf: logf.write(f"Java Stack Trace:\n{e_j.stacktrace()}\n")
+        elif logf: logf.write(f"Raw Java Exception (no stacktrace method): {e_j}\n")
+    except Exception as e_py:
+        zxing_error_msg = f"Python Error during JPype/ZXing attempt: {type(e_py).__name__} - {e_py}"
+        if logf: logf.write(f"[ERROR] {zxing_error_msg}\n")
+
+    return [], zxing_error_msg
+
+# --- END OF FILE zxing_bridge.py ---
@@ -0,0 +1,386 @@
+# --- START OF FILE zxing_server.py ---
+
+"""
+Serveur de décodage ZXing local, partagé par tous les workers uvicorn
+(mode optionnel `GS1_DECODE_MODE=server`).
+
+    python -m app.zxing_server [--socket $XDG_RUNTIME_DIR/gs1-decoder/zxing.sock] [--threads N]
+
+Un seul processus possède la JVM, ses classes ZXing et son JIT préchauffé ;
+plusieurs threads y décodent en parallèle. Les workers de l'API lui envoient
+les pixels en niveaux de gris sur un socket Unix (une connexion par décodage
+en cours, réutilisée ensuite) et reçoivent le DecodeOutcome. Si le serveur
+plante, seules les requêtes en cours échouent (DecodeWorkerError) : l'API
+reste en vie et le client relance le serveur (GS1_ZXING_SERVER_SPAWN).
+
+Les messages reçus sont désérialisés (pickle) : le socket, son verrou et la
+clé partagée sont créés dans un répertoire privé (0700) et chaque connexion
+s'authentifie avec la clé (GS1_ZXING_SERVER_AUTHKEY ou `<socket>.key`).
+"""
+
+import argparse
+import fcntl
+import io
+import os
+import queue
+import secrets
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+from app import config
+from app.decode_farm import DecodeWorkerError, RemoteDecoder
+from app.decode_pipeline import DecodeOptions, DecodeOutcome
+
+# Délai de réponse d'un ping (le serveur ne répond qu'une fois la JVM prête et préchauffée).
+_PING_TIMEOUT_S = 5.0
+
+
+# --- Socket et clé partagée ---
+
+def prepare_socket_dir(socket_path: str):
+    """
+    Crée le répertoire du socket (0700) au besoin et vérifie qu'il est sûr :
+    un vrai répertoire, appartenant à l'utilisateur courant, non modifiable
+    par les autres (le socket, le verrou et la clé y sont créés).
+
+    Raises:
+        PermissionError: Si le répertoire n'est pas sûr
+    """
+    directory = os.path.dirname(os.path.abspath(socket_path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o022:
+        raise PermissionError(f"Unsafe ZXing server socket directory {directory} "
+                              "(must be a directory owned by this user, not writable by others)")
+
+
+def load_authkey(socket_path: str) -> bytes:
+    """
+    Clé d'authentification partagée par le serveur et les workers de l'API :
+    GS1_ZXING_SERVER_AUTHKEY, sinon `<socket>.key`, générée au premier appel.
+
+    Raises:
+        PermissionError: Si le fichier de clé est vide
+    """
+    if config.ZXING_SERVER_AUTHKEY:
+        return config.ZXING_SERVER_AUTHKEY.encode("utf-8")
+    key_path = f"{socket_path}.key"
+    if not os.path.exists(key_path):
+        # Écrite dans un fichier temporaire (0600) puis liée : aucun processus ne lit une clé partielle
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(key_path)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(secrets.token_bytes(32))
+            try:
+                os.link(tmp_path, key_path)
+            except FileExistsError:
+                pass  # Générée entre-temps par un autre processus
+        finally:
+            os.unlink(tmp_path)
+    with open(key_path, "rb") as f:
+        key = f.read()
+    if not key:
+        raise PermissionError(f"Empty ZXing server key file {key_path}")
+    return key
+
+
+# --- Serveur ---
+
+def _handle_connection(conn: Connection, decode_slots: threading.Semaphore, info: Dict[str, Any]):
+    """Sert les requêtes d'une connexion cliente jusqu'à sa fermeture."""
+    from app import zxing_bridge
+    from app.decode_pipeline import run_decode
+
+    zxing_bridge.attach_current_thread()
+    with conn:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            if message == "ping":
+                conn.send(("ok", info, None))
+                continue
+
+            width, height, options, want_log = message
+            logf = io.StringIO() if want_log else None
+            try:
+                gray_image = Image.frombytes("L", (width, height), conn.recv_bytes())
+                with decode_slots:
+                    outcome = run_decode(gray_image, options, logf)
+                conn.send(("ok", outcome, logf.getvalue() if logf else None))
+            except (EOFError, OSError):
+                return
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}", logf.getvalue() if logf else None))
+
+
+def serve(socket_path: str, threads: int) -> int:
+    """Démarre la JVM, préchauffe le JIT puis accepte les connexions sur `socket_path`."""
+    from app import zxing_bridge
+    from app.warmup import run_warmup
+
+    prepare_socket_dir(socket_path)
+    authkey = load_authkey(socket_path)
+    if _ping(socket_path, authkey) is not None:
+        print(f"ZXing server already running on {socket_path}.")
+        return 0
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # Socket d'un serveur arrêté
+
+    started_at = time.perf_counter()
+    zxing_bridge.start_jvm()
+    warmup = run_warmup(config.WARMUP_ITERATIONS)
+    info = {
+        "pid": os.getpid(),
+        "jvm": zxing_bridge.is_available(),
+        "threads": threads,
+        "startup_s": round(time.perf_counter() - started_at, 3),
+        "warmup": warmup,
+    }
+    decode_slots = threading.Semaphore(threads)
+
+    # Socket créé directement en 0600 : pas de fenêtre entre bind() et chmod()
+    old_umask = os.umask(0o177)
+    try:
+        listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(old_umask)
+    print(f"ZXing server ready on {socket_path}: {threads} threads, JVM {'available' if info['jvm'] else 'NOT available'}, started in {info['startup_s']}s.")
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                print(f"Warning: ZXing server rejected a connection: {type(e).__name__}: {e}")
+                continue
+            threading.Thread(target=_handle_connection, args=(conn, decode_slots, info), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+    return 0
+
+
+# --- Client (workers de l'API) ---
+
+def _ping(socket_path: str, authkey: bytes) -> Optional[Dict[str, Any]]:
+    """Informations du serveur, ou None s'il ne répond pas (ou refuse la clé)."""
+    try:
+        with Client(socket_path, family="AF_UNIX", authkey=authkey) as conn:
+            conn.send("ping")
+            if not conn.poll(_PING_TIMEOUT_S):
+                return None
+            _, info, _ = conn.recv()
+            return info
+    except (OSError, EOFError, AuthenticationError):
+        return None
+
+
+class ZXingServerClient(RemoteDecoder):
+    """
+    Client du serveur ZXing partagé. Les connexions libres sont réutilisées
+    d'une requête à l'autre ; une connexion rompue est abandonnée.
+
+    Args:
+        socket_path (str): Socket Unix du serveur
+        task_timeout_s (float): Délai de réponse d'un décodage
+        spawn (bool): Lancer (ou relancer) le serveur s'il ne répond pas
+        startup_timeout_s (float): Délai d'attente du démarrage du serveur
+    """
+
+    def __init__(self, socket_path: str, task_timeout_s: float, spawn: bool = True, startup_timeout_s: float = 120.0):
+        self.socket_path = socket_path
+        self.task_timeout_s = task_timeout_s
+        self.spawn = spawn
+        self.startup_timeout_s = startup_timeout_s
+        self._idle: "queue.LifoQueue[Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._info: Optional[Dict[str, Any]] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._connected = False
+        self._tasks = 0
+        self._failures = 0
+        self._spawns = 0
+        self._authkey: Optional[bytes] = None
+
+    def start(self):
+        """Attend que le serveur réponde, en le lançant au besoin."""
+        started_at = time.perf_counter()
+        if self._ensure_server():
+            print(f"ZXing server reachable on {self.socket_path} after {time.perf_counter() - started_at:.2f}s.")
+        else:
+            print(f"Warning: ZXing server not reachable on {self.socket_path}.")
+
+    def _ensure_server(self) -> bool:
+        """
+        Vérifie que le serveur répond ; sinon, s'il faut le lancer, un seul
+        processus de l'API le fait (verrou de fichier), les autres attendent.
+        """
+        try:
+            prepare_socket_dir(self.socket_path)
+            if self._authkey is None:
+                self._authkey = load_authkey(self.socket_path)
+        except PermissionError as e:
+            print(f"Error: {e}")
+            return False
+        info = _ping(self.socket_path, self._authkey)
+        if info is None and self.spawn:
+            with open(f"{self.socket_path}.lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                info = _ping(self.socket_path, self._authkey)
+                if info is None:
+                    info = self._spawn_and_wait()
+        with self._lock:
+            self._info = info
+            self._connected = info is not None
+        return info is not None
+
+    def _spawn_and_wait(self) -> Optional[Dict[str, Any]]:
+        print(f"Starting ZXing server on {self.socket_path}...")
+        if self._process is not None:
+            self._process.poll()  # Récupère le code de sortie d'un serveur précédent (pas de zombie)
+        # Nouvelle session : le serveur survit au worker qui l'a lancé et sert tous les autres
+        process = subprocess.Popen(
+            [sys.executable, "-m", "app.zxing_server", "--socket", self.socket_path,
+             "--threads", str(config.ZXING_SERVER_THREADS)],
+            start_new_session=True,
+        )
+        with self._lock:
+            self._process = process
+            self._spawns += 1
+        deadline = time.monotonic() + self.startup_timeout_s
+        while time.monotonic() < deadline:
+            info = _ping(self.socket_path, self._authkey)
+            if info is not None:
+                return info
+            if process.poll() is not None and not os.path.exists(self.socket_path):
+                print(f"Warning: ZXing server exited with code {process.returncode}.")
+                return None
+            time.sleep(0.2)
+        return None
+
+    def _checkout(self) -> Tuple[Connection, bool]:
+        """Une connexion libre (réutilisée : True) ou nouvelle (False)."""
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            pass
+        if self._authkey is None and not self._ensure_server():
+            raise DecodeWorkerError(f"ZXing server not reachable on {self.socket_path}")
+        try:
+            return Client(self.socket_path, family="AF_UNIX", authkey=self._authkey), False
+        except (OSError, EOFError, AuthenticationError):
+            # Serveur arrêté ou planté : relancé une fois, dans la limite du délai de démarrage
+            if not self._ensure_server():
+                raise DecodeWorkerError(f"ZXing server not reachable on {self.socket_path}")
+            try:
+                return Client(self.socket_path, family="AF_UNIX", authkey=self._authkey), False
+            except (OSError, EOFError, AuthenticationError) as e:
+                raise DecodeWorkerError(f"ZXing server not reachable on {self.socket_path}") from e
+
+    def _close_idle(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def decode(self, gray_image: Image.Image, options: Optional[DecodeOptions] = None, want_log: bool = False) -> Tuple[DecodeOutcome, Optional[str]]:
+        """
+        Décode une image en niveaux de gris dans le serveur partagé. Si une
+        connexion réutilisée s'avère rompue (serveur relancé depuis), le
+        décodage est renvoyé une fois sur une nouvelle connexion.
+
+        Returns:
+            tuple: (DecodeOutcome, journal de debug du serveur ou None)
+
+        Raises:
+            DecodeWorkerError: Si le serveur est injoignable, plante ou dépasse le délai
+        """
+        width, height = gray_image.size
+        pixels = gray_image.tobytes()
+        with self._lock:
+            self._tasks += 1
+        while True:
+            conn, reused = self._checkout()
+            try:
+                conn.send((width, height, options, want_log))
+                conn.send_bytes(pixels)
+                if not conn.poll(self.task_timeout_s):
+                    raise DecodeWorkerError(f"ZXing server timed out after {self.task_timeout_s}s")
+                status, payload, log_text = conn.recv()
+                break
+            except (EOFError, OSError) as e:
+                conn.close()
+                if reused:
+                    # Les autres connexions libres datent du même serveur : abandonnées aussi
+                    self._close_idle()
+                    continue
+                with self._lock:
+                    self._failures += 1
+                    self._connected = False
+                raise DecodeWorkerError("ZXing server connection lost during decoding") from e
+            except DecodeWorkerError:
+                # La réponse en retard arriverait sur cette connexion : elle n'est pas réutilisée
+                conn.close()
+                with self._lock:
+                    self._failures += 1
+                raise
+        self._idle.put(conn)
+        with self._lock:
+            self._connected = True
+        if status != "ok":
+            with self._lock:
+                self._failures += 1
+            raise DecodeWorkerError(f"ZXing server error: {payload}")
+        return payload, log_text
+
+    def is_available(self) -> bool:
+        """Vrai si le serveur répondait au dernier échange et a démarré sa JVM."""
+        with self._lock:
+            return self._connected and bool(self._info and self._info.get("jvm"))
+
+    def warmup_report(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._info.get("warmup") if self._info else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            server = {k: v for k, v in (self._info or {}).items() if k != "warmup"}
+            return {
+                "socket": self.socket_path,
+                "connected": self._connected,
+                "idle_connections": self._idle.qsize(),
+                "tasks": self._tasks,
+                "failures": self._failures,
+                "spawns": self._spawns,
+                "server": server,
+            }
+
+    def shutdown(self):
+        """Ferme les connexions ; le serveur, partagé avec les autres workers, reste actif."""
+        self._close_idle()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serveur de décodage ZXing partagé (socket Unix).")
+    parser.add_argument("--socket", default=config.ZXING_SERVER_SOCKET, help="Chemin du socket Unix")
+    parser.add_argument("--threads", type=int, default=config.ZXING_SERVER_THREADS, help="Décodages simultanés")
+    args = parser.parse_args(argv)
+    return serve(args.socket, max(1, args.threads))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# --- END OF FILE zxing_server.py ---
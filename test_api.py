@@ -66,6 +66,32 @@ def test_decode(image_path, verbose=False):
         print(f"❌ Erreur: {response.status_code}")
         print(response.text)
 
+def test_decode_batch(image_paths):
+    """Teste l'endpoint /decode/batch avec plusieurs images, dont une invalide"""
+    print(f"\n=== Test de /decode/batch avec {len(image_paths)} images + 1 fichier invalide ===")
+
+    files = []
+    for image_path in image_paths:
+        if os.path.exists(image_path):
+            with open(image_path, "rb") as image_file:
+                files.append(("files", (os.path.basename(image_path), image_file.read(), "image/jpeg")))
+    # Une image illisible ne doit pas faire échouer le lot
+    files.append(("files", ("invalide.jpg", b"pas une image", "image/jpeg")))
+
+    response = requests.post(f"{API_URL}/decode/batch", files=files)
+
+    if response.status_code == 200:
+        result = response.json()
+        print(f"✅ Lot traité: {result['decoded']} décodée(s), {result['failed']} en échec sur {result['total']}")
+        for item in result['items']:
+            if item['success']:
+                print(f"{item['filename']}: {[barcode['raw'] for barcode in item['barcodes']]}")
+            else:
+                print(f"{item['filename']}: erreur {item['status_code']} - {item['error']}")
+    else:
+        print(f"❌ Erreur: {response.status_code}")
+        print(response.text)
+
 if __name__ == "__main__":
     # Test de l'endpoint /health
     test_health()
@@ -79,5 +105,8 @@ if __name__ == "__main__":
     for image_path in test_images:
         test_decode(image_path, verbose=False)
         test_decode(image_path, verbose=True)
+
+    # Test de l'endpoint /decode/batch
+    test_decode_batch(test_images)
     
     print("\n=== Tests terminés ===")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Script de test pour la lecture en flux des archives ZIP/TAR (app/archive_reader.py).
+"""
+
+import io
+import tarfile
+import zipfile
+
+from app.archive_reader import ArchiveFormatError, open_archive
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def _tar(members, mode="w:gz"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+def test_zip_members():
+    """Teste que seules les images d'une archive ZIP sont retournées"""
+    print("\n=== Test d'une archive ZIP ===")
+
+    archive = _zip({"a/etiquette.JPG": b"jpeg", "notes.txt": b"texte", "b.png": b"png"})
+    members = list(open_archive(archive, max_member_bytes=1000))
+    print(f"Membres: {[(m.name, m.data, m.error) for m in members]}")
+    assert [(m.name, m.data) for m in members] == [("a/etiquette.JPG", b"jpeg"), ("b.png", b"png")]
+
+
+def test_tar_members_and_size_limit():
+    """Teste une archive TAR compressée et le refus des membres trop volumineux"""
+    print("\n=== Test d'une archive TAR ===")
+
+    archive = _tar({"petite.jpg": b"x" * 10, "grande.jpg": b"x" * 100})
+    members = list(open_archive(archive, max_member_bytes=50))
+    print(f"Membres: {[(m.name, m.error) for m in members]}")
+    assert members[0].data == b"x" * 10
+    assert members[1].data is None and "volumineux" in members[1].error
+
+
+def test_unknown_format():
+    """Teste le rejet d'un fichier qui n'est pas une archive"""
+    print("\n=== Test d'un format inconnu ===")
+
+    try:
+        open_archive(io.BytesIO(b"pas une archive" * 100), max_member_bytes=1000)
+        assert False, "ArchiveFormatError attendue"
+    except ArchiveFormatError as e:
+        print(f"Refus attendu: {e}")
+
+
+if __name__ == "__main__":
+    test_zip_members()
+    test_tar_members_and_size_limit()
+    test_unknown_format()
+    print("\n=== Tests terminés ===")
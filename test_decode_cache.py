@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le cache de résultats de décodage (app/decode_cache.py).
+"""
+
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app import config
+from app.barcode_detector import DecoderType
+from app.decode_cache import DecodeResultCache, NearDuplicateCache, cache_key, new_content_hasher
+from app.image_hash import PERCEPTUAL_HASHES, average_hash, difference_hash, hamming_distance
+from app.decode_pipeline import DecodeOptions, DecodeOutcome, DecodedSymbol
+from app.models import ScanBarcodeFormatHint, DecodeEffort, DecodeStrategy
+
+
+def _outcome(raw):
+    return DecodeOutcome(symbols=[DecodedSymbol(raw, DecoderType.ZXING, "DATA_MATRIX", (0, 0, 10, 10))])
+
+
+def test_cache_key():
+    """Teste que la clé dépend du contenu et des options qui changent le résultat"""
+    print("\n=== Test de cache_key ===")
+
+    digest = new_content_hasher()
+    digest.update(b"image")
+    digest = digest.hexdigest()
+    base = cache_key(digest, DecodeOptions())
+    print(f"Clé: {base}")
+    assert base == cache_key(digest, DecodeOptions(deadline=time.monotonic() + 5))
+    assert base != cache_key(digest, DecodeOptions(multi=True))
+    assert base != cache_key(digest, DecodeOptions(effort=DecodeEffort.THOROUGH))
+    other_strategy = DecodeStrategy.RACE if config.DECODE_STRATEGY == "sequential" else DecodeStrategy.SEQUENTIAL
+    assert base != cache_key(digest, DecodeOptions(strategy=other_strategy))
+    assert base == cache_key(digest, DecodeOptions(strategy=DecodeStrategy(config.DECODE_STRATEGY)))
+    assert base != cache_key(digest, DecodeOptions(skip_similar_frames=not config.DECODE_SKIP_SIMILAR_FRAMES))
+    # L'ordre des types demandés n'a pas d'importance
+    assert cache_key(digest, DecodeOptions(scan_types=[ScanBarcodeFormatHint.QR_CODE, ScanBarcodeFormatHint.DATAMATRIX])) == \
+        cache_key(digest, DecodeOptions(scan_types=[ScanBarcodeFormatHint.DATAMATRIX, ScanBarcodeFormatHint.QR_CODE]))
+
+
+def test_cache_hit_and_miss():
+    """Teste les hits, les misses et l'isolation des copies retournées"""
+    print("\n=== Test des hits/misses ===")
+
+    cache = DecodeResultCache(max_bytes=10_000, ttl_s=60)
+    assert cache.get("a") is None
+    cache.put("a", _outcome("0103760423190005"))
+    hit = cache.get("a")
+    assert hit.symbols[0].raw == "0103760423190005"
+    hit.details["cache"] = "hit"
+    assert "cache" not in cache.get("a").details
+
+    stats = cache.stats()
+    print(f"Stats: {stats}")
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+
+    # Un décodage interrompu par le budget n'est pas mis en cache
+    timed_out = _outcome("x")
+    timed_out.timed_out = True
+    cache.put("b", timed_out)
+    assert cache.get("b") is None
+
+
+def test_cache_eviction_and_ttl():
+    """Teste l'éviction LRU bornée en octets et l'expiration"""
+    print("\n=== Test de l'éviction et du TTL ===")
+
+    cache = DecodeResultCache(max_bytes=2100, ttl_s=60)
+    for key in ("a", "b", "c"):
+        cache.put(key, _outcome("0103760423190005"))
+    cache.get("a")  # "a" devient le plus récemment utilisé
+    cache.put("d", _outcome("0103760423190005"))
+    print(f"Stats: {cache.stats()}")
+    assert cache.stats()["bytes"] <= 2100
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+
+    cache = DecodeResultCache(max_bytes=10_000, ttl_s=0.01)
+    cache.put("a", _outcome("0103760423190005"))
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def _label(shift=0, noise=0):
+    """Étiquette synthétique (blocs sombres) avec bruit de capteur optionnel."""
+    image = Image.new("L", (320, 240), 230)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((60 + shift, 50, 180 + shift, 170), fill=20)
+    draw.rectangle((200, 60, 280, 100), fill=60)
+    if noise:
+        pixels = np.asarray(image, dtype=np.int16) + np.random.default_rng(42).integers(-noise, noise + 1, (240, 320))
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    return image
+
+
+def test_perceptual_hashes():
+    """Teste que le bruit de capteur ne change presque pas les empreintes"""
+    print("\n=== Test des empreintes perceptuelles ===")
+
+    for name, fn in (("aHash", average_hash), ("dHash", difference_hash)):
+        near = hamming_distance(fn(_label()), fn(_label(noise=12)))
+        far = hamming_distance(fn(_label()), fn(_label(shift=120)))
+        print(f"{name}: bruit -> {near}, autre image -> {far}")
+        assert near <= 4
+        assert far > near
+
+
+def test_near_duplicate_cache():
+    """Teste qu'un quasi-doublon récent est servi sans décodage"""
+    print("\n=== Test du cache de quasi-doublons ===")
+
+    calls = []
+
+    def decode(image):
+        calls.append(image)
+        # Position du code : le grand bloc sombre de l'étiquette
+        return DecodeOutcome(symbols=[DecodedSymbol("0103760423190005", DecoderType.ZXING, "DATA_MATRIX", (60, 50, 181, 171))])
+
+    cache = NearDuplicateCache(max_entries=8, ttl_s=60, max_distance=6)
+    first = cache.decode_through(_label(), DecodeOptions(), decode)
+    second = cache.decode_through(_label(noise=12), DecodeOptions(), decode)
+    print(f"Détails du second passage: {second.details}")
+    assert len(calls) == 1
+    assert "near_duplicate" not in first.details
+    assert second.details["near_duplicate"]["distance"] <= 6
+    assert second.symbols[0].raw == "0103760423190005"
+
+    # Options différentes, autre taille ou image différente : décodage normal
+    cache.decode_through(_label(noise=12), DecodeOptions(multi=True), decode)
+    cache.decode_through(_label(noise=12), DecodeOptions(strategy=DecodeStrategy.RACE), decode)
+    cache.decode_through(_label(noise=12).resize((330, 248)), DecodeOptions(), decode)
+    cache.decode_through(_label(shift=120), DecodeOptions(), decode)
+    assert len(calls) == 5
+    assert cache.stats()["hits"] == 1
+
+
+def test_near_duplicate_region_check():
+    """Teste qu'une empreinte proche ne suffit pas quand la zone du code a changé"""
+    print("\n=== Test de la vérification des zones des codes ===")
+
+    calls = []
+
+    def decode(image):
+        calls.append(image)
+        return DecodeOutcome(symbols=[DecodedSymbol(f"code {len(calls)}", DecoderType.ZXING, "DATA_MATRIX", (60, 50, 181, 171))])
+
+    # Autre code au même endroit : damier clair dans le bloc sombre
+    other = _label()
+    draw = ImageDraw.Draw(other)
+    for x in range(70, 170, 20):
+        for y in range(60, 160, 20):
+            if (x // 20 + y // 20) % 2:
+                draw.rectangle((x, y, x + 9, y + 9), fill=230)
+
+    for algorithm in ("dhash", "ahash"):
+        calls.clear()
+        cache = NearDuplicateCache(max_entries=8, ttl_s=60, max_distance=6, algorithm=algorithm)
+        cache.decode_through(_label(), DecodeOptions(), decode)
+        distance = hamming_distance(PERCEPTUAL_HASHES[algorithm](_label()), PERCEPTUAL_HASHES[algorithm](other))
+        outcome = cache.decode_through(other, DecodeOptions(), decode)
+        print(f"{algorithm}: distance {distance}, résultat {outcome.symbols[0].raw}, stats {cache.stats()}")
+        assert distance <= 6, "les empreintes seules confondraient les deux images"
+        assert outcome.symbols[0].raw == "code 2" and "near_duplicate" not in outcome.details
+        assert cache.stats()["rejected"] == 1
+
+    # Position inconnue : l'image entière est comparée
+    cache = NearDuplicateCache(max_entries=8, ttl_s=60, max_distance=6, max_region_diff=2.0)
+    cache.decode_through(_label(), DecodeOptions(), lambda image: _outcome_without_position("a"))
+    assert cache.decode_through(_label(noise=12), DecodeOptions(), decode).symbols[0].raw == "a"
+    assert cache.decode_through(other, DecodeOptions(), lambda image: _outcome_without_position("b")).symbols[0].raw == "b"
+
+
+def _outcome_without_position(raw):
+    return DecodeOutcome(symbols=[DecodedSymbol(raw, DecoderType.PYLIBDMTX, "DATA_MATRIX", None)])
+
+
+if __name__ == "__main__":
+    test_cache_key()
+    test_cache_hit_and_miss()
+    test_cache_eviction_and_ttl()
+    test_perceptual_hashes()
+    test_near_duplicate_cache()
+    test_near_duplicate_region_check()
+    print("\n=== Tests terminés ===")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Script de test pour la ferme de décodage multi-processus (app/decode_farm.py) :
+transmission des pixels par mémoire partagée, plantage d'un worker et
+remplacement en arrière-plan, attente bornée par l'instant limite.
+Lance de vrais processus workers (sans préchauffage).
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+from PIL import Image
+
+from app import config, decode_pipeline
+from app.decode_farm import DecodeFarm, DecodeWorkerBusyError, DecodeWorkerError, _worker_main
+from app.decode_pipeline import DecodeOptions, DecodeOutcome
+
+
+def _noise(size):
+    return Image.frombytes("L", size, os.urandom(size[0] * size[1]))
+
+
+def _wait_for(predicate, timeout_s=60.0):
+    give_up_at = time.monotonic() + timeout_s
+    while not predicate():
+        assert time.monotonic() < give_up_at, "délai dépassé"
+        time.sleep(0.05)
+
+
+def test_shared_memory_round_trip():
+    """Teste que le worker relit exactement les pixels écrits dans le segment partagé, y compris après agrandissement"""
+    print("\n=== Test de l'aller-retour par mémoire partagée ===")
+
+    def run_decode(gray_image, options, logf=None):
+        return DecodeOutcome(details={"size": list(gray_image.size),
+                                      "sha256": hashlib.sha256(gray_image.tobytes()).hexdigest()})
+
+    saved = (decode_pipeline.run_decode, config.DECODERS, config.WARMUP_ITERATIONS)
+    decode_pipeline.run_decode = run_decode
+    config.DECODERS = ["pylibdmtx"]
+    config.WARMUP_ITERATIONS = 0
+    conn, child_conn = multiprocessing.Pipe()
+    thread = threading.Thread(target=_worker_main, args=(child_conn,), daemon=True)
+    segments = []
+    try:
+        thread.start()
+        assert conn.recv()[0] == "ready"
+        for size in ((64, 48), (640, 480)):
+            image = _noise(size)
+            shm = shared_memory.SharedMemory(create=True, size=size[0] * size[1])
+            segments.append(shm)
+            shm.buf[:len(image.tobytes())] = image.tobytes()
+            conn.send((shm.name, size[0], size[1], DecodeOptions(), False))
+            status, outcome, _ = conn.recv()
+            print(f"{size}: {status} {outcome.details}")
+            assert status == "ok"
+            assert outcome.details == {"size": list(size), "sha256": hashlib.sha256(image.tobytes()).hexdigest()}
+        conn.send(None)
+        thread.join(5)
+        assert not thread.is_alive()
+    finally:
+        decode_pipeline.run_decode, config.DECODERS, config.WARMUP_ITERATIONS = saved
+        conn.close()
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+def test_worker_crash_and_respawn():
+    """Teste qu'un plantage échoue vite, que le worker est remplacé en arrière-plan et que l'attente suit l'instant limite"""
+    print("\n=== Test du plantage et du remplacement d'un worker ===")
+
+    os.environ["GS1_WARMUP_ITERATIONS"] = "0"
+    farm = DecodeFarm(1, task_timeout_s=30, startup_timeout_s=60)
+    farm.start()
+    try:
+        image = Image.new("L", (320, 240), 255)
+        outcome = farm.decode_image(image)
+        assert outcome.details["image_size"] == [320, 240]
+
+        # Plantage pendant le décodage : erreur immédiate, sans attendre la nouvelle JVM
+        worker = farm._workers[0]
+        first_pid = worker.process.pid
+        send = worker.conn.send
+
+        def crash_then_send(message):
+            worker.process.kill()
+            worker.process.join(5)
+            send(message)
+
+        worker.conn.send = crash_then_send
+        started_at = time.monotonic()
+        try:
+            farm.decode_image(image)
+            assert False, "DecodeWorkerError attendue"
+        except DecodeWorkerError as e:
+            print(f"Erreur attendue: {e} ({time.monotonic() - started_at:.2f}s)")
+            assert not isinstance(e, DecodeWorkerBusyError)
+        assert time.monotonic() - started_at < 5
+
+        # Tant que le remplaçant démarre, aucun worker libre : 503 à l'instant limite
+        if farm.stats()["idle"] == 0:
+            started_at = time.monotonic()
+            try:
+                farm.decode_image(image, DecodeOptions(deadline=time.monotonic() + 0.05))
+                assert False, "DecodeWorkerBusyError attendue"
+            except DecodeWorkerBusyError as e:
+                print(f"Erreur attendue: {e}")
+            assert time.monotonic() - started_at < 1
+
+        # Le remplaçant rejoint les workers libres et décode normalement
+        outcome = farm.decode_image(image, DecodeOptions(deadline=time.monotonic() + 60))
+        stats = farm.stats()
+        print(f"Stats: {stats}")
+        assert outcome.details["image_size"] == [320, 240]
+        assert farm._workers[0].process.pid != first_pid
+        assert stats["restarts"] == 1 and stats["failures"] == 1 and stats["alive"] == 1
+
+        # Worker mort pendant qu'il était libre : remplacé, puis attendu
+        farm._workers[0].process.kill()
+        farm._workers[0].process.join(5)
+        outcome = farm.decode_image(image, DecodeOptions(deadline=time.monotonic() + 60))
+        assert outcome.details["image_size"] == [320, 240]
+        _wait_for(lambda: farm.stats()["restarts"] == 2)
+    finally:
+        farm.shutdown()
+
+
+def test_busy_farm_deadline():
+    """Teste qu'une requête sans worker libre échoue à son instant limite au lieu d'attendre indéfiniment"""
+    print("\n=== Test de l'attente bornée d'un worker libre ===")
+
+    farm = DecodeFarm(1, task_timeout_s=0.3)
+    # Aucun worker démarré : la ferme se comporte comme si tous étaient occupés
+    started_at = time.monotonic()
+    try:
+        farm.decode(Image.new("L", (8, 8)), DecodeOptions(deadline=time.monotonic() + 0.2))
+        assert False, "DecodeWorkerBusyError attendue"
+    except DecodeWorkerBusyError as e:
+        print(f"Erreur attendue: {e}")
+    elapsed = time.monotonic() - started_at
+    assert 0.15 < elapsed < 1, elapsed
+
+    # Sans instant limite, l'attente est bornée par le délai des tâches
+    started_at = time.monotonic()
+    try:
+        farm.decode(Image.new("L", (8, 8)))
+        assert False, "DecodeWorkerBusyError attendue"
+    except DecodeWorkerBusyError:
+        pass
+    assert time.monotonic() - started_at < 1
+
+
+def test_decode_during_startup():
+    """Teste qu'un décodage reçu pendant le démarrage de la ferme échoue à son instant limite, puis réussit une fois un worker prêt"""
+    print("\n=== Test d'un décodage pendant le démarrage de la ferme ===")
+
+    os.environ["GS1_WARMUP_ITERATIONS"] = "0"
+    farm = DecodeFarm(1, task_timeout_s=30, startup_timeout_s=60)
+    starter = threading.Thread(target=farm.start, daemon=True)
+    starter.start()
+    try:
+        image = Image.new("L", (32, 32), 255)
+        started_at = time.monotonic()
+        try:
+            farm.decode_image(image, DecodeOptions(deadline=time.monotonic() + 0.01))
+            assert False, "DecodeWorkerBusyError attendue"
+        except DecodeWorkerBusyError as e:
+            print(f"Erreur attendue: {e}")
+            assert "starting" in str(e)
+        assert time.monotonic() - started_at < 1
+        assert farm.stats()["starting"]
+
+        outcome = farm.decode_image(image, DecodeOptions(deadline=time.monotonic() + 60))
+        assert outcome.details["image_size"] == [32, 32]
+        starter.join(60)
+        assert not farm.stats()["starting"]
+    finally:
+        starter.join(60)
+        farm.shutdown()
+
+
+if __name__ == "__main__":
+    test_shared_memory_round_trip()
+    test_worker_crash_and_respawn()
+    test_busy_farm_deadline()
+    test_decode_during_startup()
+    print("\n=== Tests terminés ===")
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le module decode_pipeline
+(chargement en mémoire et pyramide de résolutions, sans JVM).
+"""
+
+import io
+import time
+
+from PIL import Image
+
+from app.barcode_detector import DecoderType
+from app.decode_pipeline import (
+    load_grayscale_image, build_pyramid_levels, downscale, deduplicate_symbols, DecodedSymbol,
+    map_rotated_positions, run_decode, decode_image_bytes, deadline_from_ms, DecodeOptions,
+    DecodeOutcome, open_frames, decode_frames, load_jpeg_draft, decode_upload_bytes, ImageTooLargeError
+)
+from app import config, decode_pipeline
+
+
+def _encode(image, fmt="PNG"):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_load_grayscale_image():
+    """Teste le décodage en mémoire vers une image en niveaux de gris"""
+    print("\n=== Test de load_grayscale_image ===")
+
+    rgb = Image.new("RGB", (40, 20), (0, 0, 0))
+    gray = load_grayscale_image(_encode(rgb, "JPEG"))
+    print(f"Mode: {gray.mode}, taille: {gray.size}")
+    assert gray.mode == "L"
+    assert gray.size == (40, 20)
+
+    # La transparence doit être aplatie sur fond blanc
+    transparent = Image.new("RGBA", (10, 10), (0, 0, 0, 0))
+    gray = load_grayscale_image(_encode(transparent))
+    print(f"Pixel transparent -> {gray.getpixel((0, 0))}")
+    assert gray.getpixel((0, 0)) == 255
+
+
+def test_build_pyramid_levels():
+    """Teste le choix des niveaux de la pyramide"""
+    print("\n=== Test de build_pyramid_levels ===")
+
+    test_cases = [
+        # Taille de l'image, niveaux configurés, résultat attendu
+        ((4000, 3000), [1024, 2048], [1024, 2048, None]),
+        ((1500, 1000), [1024, 2048], [1024, None]),
+        ((800, 600), [1024, 2048], [None]),
+        ((4000, 3000), [], [None]),
+    ]
+
+    for size, levels, expected in test_cases:
+        result = build_pyramid_levels(size, levels)
+        print(f"Input: {size} {levels} -> {result}")
+        assert result == expected
+
+
+def test_downscale():
+    """Teste la réduction au côté long demandé"""
+    print("\n=== Test de downscale ===")
+
+    image = Image.new("L", (4000, 3000), 128)
+    assert downscale(image, 1024).size == (1024, 768)
+    assert downscale(image, None) is image
+
+
+def test_deduplicate_symbols():
+    """Teste le dédoublonnage par contenu et position (mode multi)"""
+    print("\n=== Test de deduplicate_symbols ===")
+
+    symbols = [
+        DecodedSymbol("010376042319000517250423", DecoderType.ZXING, "DATA_MATRIX", (100, 100, 200, 200)),
+        # Même code lu par libdmtx au même endroit : doublon
+        DecodedSymbol("010376042319000517250423", DecoderType.PYLIBDMTX, "DATA_MATRIX", (105, 98, 198, 203)),
+        # Même contenu sur une autre étiquette : conservé
+        DecodedSymbol("010376042319000517250423", DecoderType.ZXING, "DATA_MATRIX", (900, 100, 1000, 200)),
+        DecodedSymbol("00376042310000000019", DecoderType.ZXING, "CODE_128", (100, 400, 600, 460)),
+    ]
+    unique = deduplicate_symbols(symbols)
+    print(f"{len(symbols)} symboles -> {len(unique)} uniques")
+    assert [s.position for s in unique] == [(100, 100, 200, 200), (900, 100, 1000, 200), (100, 400, 600, 460)]
+
+
+def test_map_rotated_positions():
+    """Teste le retour au repère d'origine d'une position lue sur l'image tournée de 90°"""
+    print("\n=== Test de map_rotated_positions ===")
+
+    # Image d'origine 400x100 ; la zone (300, 20)-(380, 60) se retrouve en (20, 20)-(60, 100) une fois tournée
+    image = Image.new("L", (400, 100), 255)
+    image.paste(0, (300, 20, 380, 60))
+    rotated = image.transpose(Image.ROTATE_90)
+    assert rotated.point(lambda v: 255 - v).getbbox() == (20, 20, 60, 100)
+
+    symbols = [DecodedSymbol("00376042310000000019", DecoderType.ZXING, "CODE_128", (20, 20, 60, 100))]
+    map_rotated_positions(symbols, image.size)
+    print(f"Position ramenée: {symbols[0].position}")
+    assert symbols[0].position == (300, 20, 380, 60)
+
+
+def test_decode_deadline():
+    """Teste l'arrêt propre quand le budget de temps est épuisé"""
+    print("\n=== Test du budget de décodage ===")
+
+    assert deadline_from_ms(0) is None
+    assert deadline_from_ms(1000) > time.monotonic()
+
+    expired = DecodeOptions(deadline=time.monotonic() - 1)
+    outcome = run_decode(Image.new("L", (300, 200), 255), expired)
+    print(f"run_decode: timed_out={outcome.timed_out}, details={outcome.details}")
+    assert outcome.timed_out and not outcome.symbols
+    assert outcome.details["deadline_exceeded"] is True
+
+    outcome = decode_image_bytes(_encode(Image.new("L", (30, 20), 255)), expired)
+    assert outcome.timed_out and not outcome.symbols
+
+
+def test_decode_roi():
+    """Teste que seule la zone demandée est analysée"""
+    print("\n=== Test du décodage limité à une zone (ROI) ===")
+
+    outcome = run_decode(Image.new("L", (400, 300), 255), DecodeOptions(roi=(50, 40, 250, 140)))
+    print(f"Détails: {outcome.details}")
+    assert outcome.details["roi"] == [50, 40, 250, 140]
+    assert outcome.details["image_size"] == [400, 300]
+
+
+def _frames(fmt):
+    frames = [Image.new("L", (40, 30), value) for value in (0, 128, 255)]
+    for x, frame in enumerate(frames):
+        frame.paste(255 - frame.getpixel((0, 0)), (x * 10, 0, x * 10 + 10, 30))
+    if fmt == "MJPEG":
+        return b"".join(_encode(frame, "JPEG") for frame in frames)
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format=fmt, save_all=True, append_images=frames[1:])
+    return buffer.getvalue()
+
+
+def test_open_frames():
+    """Teste l'itération frame par frame des GIF, TIFF et flux MJPEG"""
+    print("\n=== Test de open_frames ===")
+
+    for fmt in ("GIF", "TIFF", "MJPEG"):
+        multi_frame, frames = open_frames(_frames(fmt))
+        frames = list(frames)
+        print(f"{fmt}: multi={multi_frame}, frames={[index for index, _ in frames]}")
+        assert multi_frame
+        assert [index for index, _ in frames] == [0, 1, 2]
+        assert all(gray.mode == "L" and gray.size == (40, 30) for _, gray in frames)
+
+    multi_frame, frames = open_frames(_encode(Image.new("L", (30, 20), 255), "JPEG"))
+    assert not multi_frame and len(list(frames)) == 1
+
+
+def _with_app_segment(jpeg: bytes, payload: bytes) -> bytes:
+    """Insère un segment APP15 (ignoré par les décodeurs) juste après le SOI."""
+    return jpeg[:2] + b"\xff\xef" + (len(payload) + 2).to_bytes(2, "big") + payload + jpeg[2:]
+
+
+def test_mjpeg_detection():
+    """Teste que seul un second SOI après l'EOI du premier JPEG fait un flux MJPEG"""
+    print("\n=== Test de la détection MJPEG ===")
+
+    # Miniature embarquée dans un segment : les octets FFD9 FFD8 n'y sont pas une frontière de frame
+    thumbnails = _encode(Image.new("L", (8, 8), 0), "JPEG") + _encode(Image.new("L", (8, 8), 255), "JPEG")
+    assert b"\xff\xd9\xff\xd8" in thumbnails
+    photo = _with_app_segment(_encode(Image.new("L", (60, 40), 200), "JPEG"), thumbnails)
+    multi_frame, frames = open_frames(photo)
+    frames = list(frames)
+    print(f"JPEG avec miniatures: multi={multi_frame}, frames={len(frames)}")
+    assert not multi_frame and len(frames) == 1 and frames[0][1].size == (60, 40)
+
+    # Flux MJPEG dont la première frame porte ces miniatures : deux frames exactement
+    stream = photo + _encode(Image.new("L", (60, 40), 50), "JPEG")
+    frames = list(open_frames(stream)[1])
+    assert [gray.size for _, gray in frames] == [(60, 40), (60, 40)]
+    assert [gray.getpixel((0, 0)) // 10 for _, gray in frames] == [20, 5]
+
+    # Octets parasites après le dernier EOI : ignorés
+    frames = list(open_frames(_frames("MJPEG") + b"\x00garbage")[1])
+    assert len(frames) == 3
+
+    # Le chargement réduit (draft) reste possible pour le JPEG seul, pas pour le flux
+    saved = config.DECODE_JPEG_DRAFT_SIDE
+    config.DECODE_JPEG_DRAFT_SIDE = 500
+    try:
+        big = _with_app_segment(_encode(Image.new("L", (2400, 1600), 200), "JPEG"), thumbnails)
+        assert load_jpeg_draft(big) is not None
+        assert load_jpeg_draft(big + _encode(Image.new("L", (2400, 1600), 50), "JPEG")) is None
+    finally:
+        config.DECODE_JPEG_DRAFT_SIDE = saved
+
+
+def test_decode_frames():
+    """Teste l'arrêt à la première frame GS1 et le saut des frames quasi identiques"""
+    print("\n=== Test de decode_frames ===")
+
+    payloads = {0: "HELLO", 1: "0103453120000011", 2: "0103453120000028"}
+    seen = []
+
+    def decode(gray, options):
+        index = [0, 128, 255].index(gray.getpixel((39, 29)))
+        seen.append(index)
+        return DecodeOutcome(symbols=[DecodedSymbol(payloads[index], DecoderType.ZXING)])
+
+    outcome = decode_frames(*open_frames(_frames("GIF")), DecodeOptions(), decode)
+    print(f"Frames décodées: {seen}, détails: {outcome.details}")
+    assert seen == [0, 1]
+    assert outcome.symbols[0].raw == payloads[1]
+    assert outcome.details["frame"] == 1
+
+    # Trois frames identiques : seule la première est décodée
+    still = _encode(Image.new("L", (40, 30), 0), "JPEG") * 3
+    calls = []
+    outcome = decode_frames(*open_frames(still), DecodeOptions(skip_similar_frames=True),
+                            lambda gray, options: calls.append(gray) or DecodeOutcome())
+    print(f"Frames identiques: {len(calls)} décodée(s), détails: {outcome.details}")
+    assert len(calls) == 1
+    assert outcome.details["frames_skipped"] == 2 and "frame" not in outcome.details
+
+    calls.clear()
+    decode_frames(*open_frames(still), DecodeOptions(skip_similar_frames=False),
+                  lambda gray, options: calls.append(gray) or DecodeOutcome())
+    assert len(calls) == 3
+
+
+def test_jpeg_draft():
+    """Teste le chargement réduit des grands JPEG et le repli en pleine résolution"""
+    print("\n=== Test du chargement réduit des JPEG ===")
+
+    big_jpeg = _encode(Image.new("RGB", (4 * config.DECODE_JPEG_DRAFT_SIDE, 2 * config.DECODE_JPEG_DRAFT_SIDE), (200, 10, 10)), "JPEG")
+    reduced, original_size = load_jpeg_draft(big_jpeg)
+    print(f"Draft: {reduced.size} au lieu de {original_size}")
+    assert reduced.mode == "L"
+    assert original_size == (4 * config.DECODE_JPEG_DRAFT_SIDE, 2 * config.DECODE_JPEG_DRAFT_SIDE)
+    assert config.DECODE_JPEG_DRAFT_SIDE <= max(reduced.size) < max(original_size)
+    # Trop petit pour être réduit, ou pas un JPEG
+    assert load_jpeg_draft(_encode(Image.new("RGB", (300, 200)), "JPEG")) is None
+    assert load_jpeg_draft(_encode(Image.new("L", (4000, 2000)))) is None
+
+    # Trouvé sur l'image réduite : positions ramenées dans le repère d'origine
+    sizes = []
+
+    def found(gray, options):
+        sizes.append(gray.size)
+        return DecodeOutcome(symbols=[DecodedSymbol("X", DecoderType.ZXING, position=(10, 10, 20, 20))])
+
+    outcome = decode_upload_bytes(big_jpeg, DecodeOptions(), found)
+    scale = original_size[0] / reduced.size[0]
+    print(f"Tailles décodées: {sizes}, position: {outcome.symbols[0].position}")
+    assert sizes == [reduced.size]
+    assert outcome.symbols[0].position == (int(10 * scale), int(10 * scale), int(20 * scale), int(20 * scale))
+    assert outcome.details["jpeg_draft"] == list(reduced.size)
+
+    # Rien sur l'image réduite : la pleine résolution est chargée, sans les petits niveaux
+    calls = []
+    decode_upload_bytes(big_jpeg, DecodeOptions(pyramid_levels=[500, 3000], localize=True),
+                        lambda gray, options: calls.append(
+                            (gray.size, options.pyramid_levels, options.full_resolution, options.localize)
+                        ) or DecodeOutcome())
+    print(f"Essais: {calls}")
+    # Pas de moteur lent sur l'image réduite, pas de nouvelle localisation en pleine résolution
+    assert calls == [(reduced.size, [500], False, True), (original_size, [3000], True, False)]
+
+    # Budget épuisé pendant le passage réduit : la pleine résolution n'est pas chargée
+    calls.clear()
+
+    def slow_miss(gray, options):
+        calls.append(gray.size)
+        time.sleep(0.05)
+        return DecodeOutcome()
+
+    def no_full_load(image_bytes, logf=None):
+        raise AssertionError("pleine résolution chargée après épuisement du budget")
+
+    saved_open_frames = decode_pipeline.open_frames
+    decode_pipeline.open_frames = no_full_load
+    try:
+        outcome = decode_upload_bytes(big_jpeg, DecodeOptions(deadline=time.monotonic() + 0.02), slow_miss)
+        assert calls == [reduced.size]
+        assert outcome.timed_out and outcome.details["image_size"] == list(original_size)
+
+        # Budget déjà épuisé à l'arrivée (attente en file) : aucune image chargée
+        calls.clear()
+        outcome = decode_upload_bytes(_encode(Image.new("L", (300, 200))), DecodeOptions(deadline=time.monotonic() - 1),
+                                      slow_miss)
+        assert calls == [] and outcome.timed_out
+    finally:
+        decode_pipeline.open_frames = saved_open_frames
+
+
+def test_image_pixel_limits():
+    """Teste la réduction ou le refus des images trop grandes, dès l'en-tête"""
+    print("\n=== Test des limites de pixels ===")
+
+    saved = (config.IMAGE_MAX_PIXELS, config.IMAGE_MAX_DECODE_PIXELS, config.IMAGE_OVERSIZE)
+    config.IMAGE_MAX_PIXELS, config.IMAGE_MAX_DECODE_PIXELS = 1_000_000, 2_000_000
+    try:
+        jpeg = _encode(Image.new("RGB", (3000, 2000), (255, 255, 255)), "JPEG")
+        png = _encode(Image.new("L", (3000, 2000), 255))
+
+        # "downscale" : le JPEG est réduit pendant la décompression puis ajusté
+        config.IMAGE_OVERSIZE = "downscale"
+        gray = load_grayscale_image(jpeg)
+        print(f"JPEG réduit: {gray.size}")
+        assert gray.size[0] * gray.size[1] <= 1_000_000
+        assert gray.info["original_size"] == (3000, 2000)
+        # Un PNG doit être entièrement décompressé : au-delà de la limite de décompression, refus
+        try:
+            load_grayscale_image(png)
+            assert False, "ImageTooLargeError attendue"
+        except ImageTooLargeError as e:
+            print(f"PNG refusé: {e}")
+
+        # Les positions trouvées sur l'image réduite sont ramenées dans le repère d'origine
+        outcome = decode_frames(*open_frames(jpeg), DecodeOptions(), lambda g, o: DecodeOutcome(
+            symbols=[DecodedSymbol("X", DecoderType.ZXING, position=(0, 0, g.size[0], g.size[1]))]))
+        print(f"Position: {outcome.symbols[0].position}, détails: {outcome.details}")
+        assert outcome.details["image_size"] == [3000, 2000]
+        assert abs(outcome.symbols[0].position[2] - 3000) <= 5
+
+        config.IMAGE_OVERSIZE = "reject"
+        try:
+            decode_upload_bytes(jpeg, DecodeOptions(), lambda g, o: DecodeOutcome())
+            assert False, "ImageTooLargeError attendue"
+        except ImageTooLargeError as e:
+            print(f"JPEG refusé: {e}")
+    finally:
+        config.IMAGE_MAX_PIXELS, config.IMAGE_MAX_DECODE_PIXELS, config.IMAGE_OVERSIZE = saved
+
+
+if __name__ == "__main__":
+    test_load_grayscale_image()
+    test_build_pyramid_levels()
+    test_downscale()
+    test_deduplicate_symbols()
+    test_map_rotated_positions()
+    test_decode_deadline()
+    test_decode_roi()
+    test_open_frames()
+    test_mjpeg_detection()
+    test_decode_frames()
+    test_jpeg_draft()
+    test_image_pixel_limits()
+    print("\n=== Tests terminés ===")
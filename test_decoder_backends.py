@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le registre des moteurs de décodage (app/decoder_backends.py).
+"""
+
+import io
+import threading
+import time
+
+from PIL import Image, ImageDraw
+
+from app import config, decode_pipeline
+from app.barcode_detector import DecoderType
+from app.decode_pipeline import DecodeOptions, DecodeOutcome, _race_level, run_decode
+from app.decoder_backends import (
+    ALL_EFFORTS, ALL_FORMATS, _BACKENDS, DecoderBackend, decoder_chain, get_backend, jvm_required,
+    register_backend, registered_backends,
+)
+from app.models import DecodeEffort, DecodeStrategy, ScanBarcodeFormatHint
+
+
+def _names(chain):
+    return [backend.name for backend in chain]
+
+
+def test_decoder_chain_order_and_effort():
+    """Teste l'ordre configuré et le filtrage par niveau d'effort"""
+    print("\n=== Test de decoder_chain ===")
+
+    saved = config.DECODERS
+    try:
+        config.DECODERS = ["zxing_cpp", "zxing_jpype", "pylibdmtx", "inconnu"]
+        chain = _names(decoder_chain(None, DecodeEffort.BALANCED))
+        print(f"Chaîne balanced: {chain}")
+        assert chain == ["zxing_cpp", "zxing_jpype", "pylibdmtx"]
+
+        # pylibdmtx n'intervient pas en effort "fast"
+        assert _names(decoder_chain(None, DecodeEffort.FAST)) == ["zxing_cpp", "zxing_jpype"]
+
+        # Seuls les moteurs qui lisent un des types demandés sont retenus
+        chain = _names(decoder_chain([ScanBarcodeFormatHint.QR_CODE, ScanBarcodeFormatHint.CODE_128], DecodeEffort.THOROUGH))
+        assert chain == ["zxing_cpp", "zxing_jpype"]
+    finally:
+        config.DECODERS = saved
+
+
+def test_decoder_chain_per_format():
+    """Teste l'ordre propre à une symbologie (GS1_DECODERS_<TYPE>)"""
+    print("\n=== Test de l'ordre par symbologie ===")
+
+    saved = (config.DECODERS, dict(config.DECODERS_BY_FORMAT))
+    try:
+        config.DECODERS = ["pylibdmtx"]
+        config.DECODERS_BY_FORMAT["CODE_128"] = ["pyzbar", "zxing_jpype"]
+        chain = _names(decoder_chain([ScanBarcodeFormatHint.CODE_128], DecodeEffort.FAST))
+        print(f"Chaîne CODE_128: {chain}")
+        assert chain == ["pyzbar", "zxing_jpype"]
+        assert jvm_required()
+
+        # Sans liste propre, GS1_DECODERS s'applique
+        assert _names(decoder_chain([ScanBarcodeFormatHint.DATAMATRIX], DecodeEffort.BALANCED)) == ["pylibdmtx"]
+
+        config.DECODERS_BY_FORMAT["CODE_128"] = []
+        assert not jvm_required()
+    finally:
+        config.DECODERS, config.DECODERS_BY_FORMAT = saved[0], saved[1]
+
+
+def test_capabilities():
+    """Teste les capacités déclarées exposées dans /health"""
+    print("\n=== Test des capacités ===")
+
+    names = [backend.name for backend in registered_backends()]
+    print(f"Moteurs enregistrés: {names}")
+    assert {"zxing_jpype", "pylibdmtx", "zxing_cpp", "pyzbar"} <= set(names)
+
+    capabilities = get_backend("pyzbar").capabilities()
+    assert capabilities["formats"] == ["CODE_128"]
+    assert capabilities["efforts"] == ["balanced", "fast", "thorough"]
+    assert isinstance(capabilities["available"], bool)
+    assert get_backend("pylibdmtx").capabilities()["efforts"] == ["balanced", "thorough"]
+    assert get_backend("pylibdmtx").capabilities()["full_resolution_only"] is True
+    assert get_backend("zxing_jpype").capabilities()["full_resolution_only"] is False
+
+
+def test_full_resolution_only_backend():
+    """Teste qu'un moteur lent n'est lancé qu'une fois, en pleine résolution, et la passe rapide des régions candidates"""
+    print("\n=== Test des moteurs réservés à la pleine résolution ===")
+
+    calls = {"fast": [], "slow": []}
+
+    def make_backend(name, full_resolution_only):
+        def decode(gray_image, formats, multi, timeout_ms, logf=None):
+            calls[name].append(gray_image.size)
+            return []
+        return DecoderBackend(name=name, decoder_type=DecoderType.PYLIBDMTX, formats=ALL_FORMATS, efforts=ALL_EFFORTS,
+                              multi=True, is_available=lambda: True, decode=decode,
+                              full_resolution_only=full_resolution_only)
+
+    saved = config.DECODERS
+    try:
+        register_backend(make_backend("fast", False))
+        register_backend(make_backend("slow", True))
+        config.DECODERS = ["fast", "slow"]
+
+        # Région candidate : une passe rapide à la taille du recadrage, puis la pyramide de l'image entière
+        image = Image.new("L", (3000, 1500), 255)
+        draw = ImageDraw.Draw(image)
+        for x in range(0, 300, 20):
+            for y in range(0, 300, 20):
+                if (x // 20 + y // 20) % 2:
+                    draw.rectangle([1000 + x, 500 + y, 1019 + x, 519 + y], fill=0)
+        outcome = run_decode(image, DecodeOptions(pyramid_levels=[750, 1500], localize=True))
+        print(f"Avec localisation: {calls}, détails: {outcome.details}")
+        assert outcome.details["candidate_regions"] >= 1
+        crops = calls["fast"][:-3]
+        assert len(crops) == outcome.details["candidate_regions"]
+        assert all(max(size) < 1500 for size in crops)
+        assert calls["fast"][-3:] == [(750, 375), (1500, 750), (3000, 1500)]
+        assert calls["slow"] == [(3000, 1500)]
+
+        # Budget des régions épuisé : elles sont sautées, l'image entière est décodée
+        calls["fast"].clear()
+        calls["slow"].clear()
+        saved_budget = config.DECODE_LOCALIZE_BUDGET_MS
+        config.DECODE_LOCALIZE_BUDGET_MS = 0
+        try:
+            run_decode(image, DecodeOptions(pyramid_levels=[750, 1500], localize=True,
+                                            deadline=time.monotonic() + 30))
+        finally:
+            config.DECODE_LOCALIZE_BUDGET_MS = saved_budget
+        assert calls["fast"] == [(750, 375), (1500, 750), (3000, 1500)]
+
+        for strategy in (DecodeStrategy.SEQUENTIAL, DecodeStrategy.RACE):
+            calls["fast"].clear()
+            calls["slow"].clear()
+            run_decode(Image.new("L", (3000, 1500), 255),
+                       DecodeOptions(pyramid_levels=[750, 1500], localize=False, strategy=strategy))
+            print(f"{strategy.value}: {calls}")
+            assert calls["fast"] == [(750, 375), (1500, 750), (3000, 1500)]
+            assert calls["slow"] == [(3000, 1500)]
+    finally:
+        config.DECODERS = saved
+        _BACKENDS.pop("fast", None)
+        _BACKENDS.pop("slow", None)
+
+
+def test_zxing_stages_per_level():
+    """Teste que les niveaux réduits n'essaient que l'étape ZXing "plain" et que la pleine résolution garde la cascade"""
+    print("\n=== Test des étapes ZXing par niveau de la pyramide ===")
+
+    lock = threading.Lock()
+    calls = []
+
+    def zxing_stage(stage, gray_image, options, logf=None, reader="multi", java_pixels=None):
+        with lock:
+            calls.append((gray_image.size, reader, stage))
+        return [], None
+
+    saved = (decode_pipeline._zxing_stage, config.DECODERS)
+    decode_pipeline._zxing_stage = zxing_stage
+    config.DECODERS = ["zxing_jpype"]
+    try:
+        for strategy in (DecodeStrategy.SEQUENTIAL, DecodeStrategy.RACE):
+            calls.clear()
+            run_decode(Image.new("L", (3000, 1500), 255),
+                       DecodeOptions(pyramid_levels=[750, 1500], localize=False, strategy=strategy,
+                                     effort=DecodeEffort.THOROUGH, scan_types=[ScanBarcodeFormatHint.DATAMATRIX]))
+            print(f"{strategy.value}: {sorted(set(calls))}")
+            for size in ((750, 375), (1500, 750)):
+                assert {stage for level, _, stage in calls if level == size} == {"plain"}
+            full = [stage for level, reader, stage in calls if level == (3000, 1500) and reader == "multi"]
+            assert full == ["plain", "try_harder", "global_histogram", "inverted_rotated"]
+    finally:
+        decode_pipeline._zxing_stage, config.DECODERS = saved
+
+
+def test_race_losers():
+    """Teste la limite de moteurs simultanés d'une course et l'arrêt silencieux des perdants"""
+    print("\n=== Test des perdants de la stratégie race ===")
+
+    lock = threading.Lock()
+    state = {"running": 0, "max_running": 0, "started": []}
+
+    def make_backend(name, delay_s, found):
+        def decode(gray_image, formats, multi, timeout_ms, logf=None):
+            with lock:
+                state["running"] += 1
+                state["max_running"] = max(state["max_running"], state["running"])
+                state["started"].append(name)
+            try:
+                time.sleep(delay_s)
+                if logf: logf.write(f"[DEBUG] {name} finished.\n")
+                return [("X", "DATA_MATRIX", None)] if found else []
+            finally:
+                with lock:
+                    state["running"] -= 1
+        return DecoderBackend(name=name, decoder_type=DecoderType.PYLIBDMTX, formats=ALL_FORMATS,
+                              efforts=ALL_EFFORTS, multi=True, is_available=lambda: True, decode=decode)
+
+    names = ["race_a", "race_b", "race_c", "race_d", "race_win"]
+    saved = (config.DECODERS, config.DECODE_RACE_MAX_ENGINES)
+    try:
+        for name in names:
+            register_backend(make_backend(name, 0.05 if name != "race_win" else 0, name == "race_win"))
+        config.DECODE_RACE_MAX_ENGINES = 2
+
+        # Sans gagnant : tous les moteurs passent, au plus deux à la fois
+        options = DecodeOptions(effort=DecodeEffort.BALANCED)
+        config.DECODERS = ["race_a", "race_b", "race_c", "race_d"]
+        assert _race_level(Image.new("L", (40, 40), 255), options, DecodeOutcome()) == []
+        print(f"Démarrés: {state['started']}, simultanés: {state['max_running']}")
+        assert sorted(state["started"]) == ["race_a", "race_b", "race_c", "race_d"]
+        assert state["max_running"] == 2
+
+        # Les moteurs qui attendent encore leur tour quand un moteur gagne ne partent jamais
+        state["started"].clear()
+        config.DECODERS = ["race_win", "race_a", "race_b", "race_c"]
+        outcome = DecodeOutcome()
+        symbols = _race_level(Image.new("L", (40, 40), 255), options, outcome)
+        assert [s.raw for s in symbols] == ["X"] and outcome.details["winner"] == "race_win"
+        assert set(state["started"]) <= {"race_win", "race_a"}
+
+        # Un perdant qui termine après la décision n'écrit plus dans le journal
+        state["started"].clear()
+        config.DECODERS = ["race_win", "race_a"]
+        logf = io.StringIO()
+        _race_level(Image.new("L", (40, 40), 255), options, DecodeOutcome(), logf)
+        while state["running"]:
+            time.sleep(0.01)
+        log = logf.getvalue()
+        print(log)
+        assert "Race won by race_win" in log
+        assert "race_a finished" not in log
+        assert "race_a found" not in log
+    finally:
+        config.DECODERS, config.DECODE_RACE_MAX_ENGINES = saved
+        for name in names:
+            _BACKENDS.pop(name, None)
+
+
+if __name__ == "__main__":
+    test_decoder_chain_order_and_effort()
+    test_decoder_chain_per_format()
+    test_capabilities()
+    test_full_resolution_only_backend()
+    test_zxing_stages_per_level()
+    test_race_losers()
+    print("\n=== Tests terminés ===")
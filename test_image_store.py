@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le stockage des images déposées (app/image_store.py).
+"""
+
+import time
+
+from PIL import Image
+
+from app.image_store import ImageStore, ImageStoreCapacityError
+
+
+def test_put_get_delete():
+    """Teste le dépôt, la relecture et la suppression d'une image"""
+    print("\n=== Test de put/get/delete ===")
+
+    store = ImageStore(max_bytes=100_000, ttl_s=60)
+    image = Image.new("L", (100, 50), 128)
+    image_id = store.put(image)
+    print(f"Identifiant: {image_id}, stats: {store.stats()}")
+    assert store.get(image_id) is image
+    assert store.stats()["bytes"] == 5000
+    assert store.delete(image_id)
+    assert store.get(image_id) is None
+    assert not store.delete(image_id)
+
+
+def test_eviction_and_capacity():
+    """Teste l'éviction LRU bornée en octets et le refus des images trop grandes"""
+    print("\n=== Test de l'éviction ===")
+
+    store = ImageStore(max_bytes=25_000, ttl_s=60)
+    ids = [store.put(Image.new("L", (100, 100), 0)) for _ in range(2)]
+    store.get(ids[0])  # ids[0] devient le plus récemment utilisé
+    ids.append(store.put(Image.new("L", (100, 100), 0)))
+    print(f"Stats: {store.stats()}")
+    assert store.get(ids[0]) is not None
+    assert store.get(ids[1]) is None
+    assert store.stats()["evictions"] == 1
+
+    try:
+        store.put(Image.new("L", (200, 200), 0))
+        assert False, "ImageStoreCapacityError attendue"
+    except ImageStoreCapacityError as e:
+        print(f"Refus attendu: {e}")
+
+
+def test_ttl():
+    """Teste l'expiration d'une image inutilisée"""
+    print("\n=== Test du TTL ===")
+
+    store = ImageStore(max_bytes=100_000, ttl_s=0.01)
+    image_id = store.put(Image.new("L", (10, 10), 0))
+    time.sleep(0.02)
+    assert store.get(image_id) is None
+    assert store.stats()["images"] == 0
+
+
+if __name__ == "__main__":
+    test_put_get_delete()
+    test_eviction_and_capacity()
+    test_ttl()
+    print("\n=== Tests terminés ===")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script de test pour les briques du scan continu (app/live_scan.py).
+"""
+
+import asyncio
+import time
+
+from app.live_scan import LatestFrameSlot, ReadDeduplicator
+
+
+def test_latest_frame_slot():
+    """Teste que seule la frame la plus récente est conservée"""
+    print("\n=== Test de LatestFrameSlot ===")
+
+    async def scenario():
+        slot = LatestFrameSlot()
+        for data in (b"a", b"b", b"c"):
+            slot.put(data)
+        frame = await slot.get()
+        print(f"Frame obtenue: {frame}, abandonnées: {slot.dropped}")
+        assert frame == (3, b"c")
+        assert slot.received == 3 and slot.dropped == 2
+
+        # Le consommateur en attente est réveillé par la frame suivante puis par la fermeture
+        waiter = asyncio.ensure_future(slot.get())
+        await asyncio.sleep(0)
+        slot.put(b"d")
+        assert await waiter == (4, b"d")
+        slot.close()
+        assert await slot.get() is None
+
+    asyncio.run(scenario())
+
+
+def test_read_deduplicator():
+    """Teste la déduplication des lectures dans la fenêtre glissante"""
+    print("\n=== Test de ReadDeduplicator ===")
+
+    reads = ReadDeduplicator(0.05)
+    assert reads.is_new("0103453120000011")
+    assert not reads.is_new("0103453120000011")
+    assert reads.is_new("0103453120000028")
+    time.sleep(0.08)
+    print("Fenêtre expirée: le code est de nouveau renvoyé")
+    assert reads.is_new("0103453120000011")
+
+    # Sans fenêtre, chaque lecture est renvoyée
+    reads = ReadDeduplicator(0)
+    time.sleep(0.001)
+    assert reads.is_new("X")
+    time.sleep(0.001)
+    assert reads.is_new("X")
+
+
+if __name__ == "__main__":
+    test_latest_frame_slot()
+    test_read_deduplicator()
+    print("\n=== Tests terminés ===")
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Script de test de l'application FastAPI (app/main.py) dans le processus,
+via TestClient : aucun serveur à lancer, pas de JVM nécessaire.
+"""
+
+import io
+import os
+import tempfile
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import config
+from app.barcode_detector import DecoderType
+from app.decoder_backends import ALL_EFFORTS, ALL_FORMATS, DecoderBackend, _BACKENDS, register_backend
+from app import main
+from app.decode_executor import DecodeExecutor
+from app.decode_farm import DecodeFarm
+from app.main import app
+
+
+def _png(size=(64, 48), color=255):
+    buffer = io.BytesIO()
+    Image.new("L", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _gtin_backend(delay_s=0.0):
+    """Moteur factice : lit un GTIN dans toute image noire, rien dans une image blanche."""
+    def decode(gray_image, formats, multi, timeout_ms, logf=None):
+        time.sleep(delay_s)
+        return [("0109506000134352", "DATA_MATRIX", None)] if gray_image.getpixel((0, 0)) == 0 else []
+    return DecoderBackend(name="gtin", decoder_type=DecoderType.PYLIBDMTX, formats=ALL_FORMATS,
+                          efforts=ALL_EFFORTS, multi=True, is_available=lambda: True, decode=decode)
+
+
+def test_request_size_limit():
+    """Teste le refus (413) d'un corps trop gros, déclaré ou non par Content-Length"""
+    print("\n=== Test de la limite de taille des requêtes ===")
+
+    saved = config.REQUEST_MAX_BYTES
+    config.REQUEST_MAX_BYTES = 4096
+    try:
+        with TestClient(app) as client:
+            body = b"x" * 10000
+            response = client.post("/decode/", files={"file": ("a.png", body, "image/png")})
+            print(f"Content-Length: {response.status_code} {response.json()}")
+            assert response.status_code == 413
+
+            # Corps chunked, sans Content-Length : refusé au fil de la réception
+            def chunks():
+                for _ in range(10):
+                    yield b"y" * 1000
+
+            response = client.post("/decode/", content=chunks(),
+                                   headers={"Content-Type": "multipart/form-data; boundary=abc"})
+            print(f"Chunked: {response.status_code} {response.json()}")
+            assert response.status_code == 413
+
+            # Sous la limite : la requête est traitée normalement
+            response = client.post("/decode/", files={"file": ("a.png", _png(), "image/png")})
+            assert response.status_code != 413
+    finally:
+        config.REQUEST_MAX_BYTES = saved
+
+
+def test_upload_decoded_in_memory():
+    """Teste qu'une photo de quelques Mo reste en mémoire et arrive en niveaux de gris aux moteurs"""
+    print("\n=== Test du chargement en mémoire d'un upload ===")
+
+    image = Image.frombytes("RGBA", (1000, 800), os.urandom(1000 * 800 * 4))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=0)
+    body = buffer.getvalue()
+    assert len(body) > 3 * 1024 * 1024
+
+    seen = []
+
+    def decode(gray_image, formats, multi, timeout_ms, logf=None):
+        seen.append((gray_image.mode, gray_image.size))
+        return []
+
+    rollovers = []
+    original_rollover = tempfile.SpooledTemporaryFile.rollover
+
+    def rollover(self):
+        rollovers.append(self)
+        return original_rollover(self)
+
+    saved = config.DECODERS
+    register_backend(DecoderBackend(name="capture", decoder_type=DecoderType.PYLIBDMTX, formats=ALL_FORMATS,
+                                    efforts=ALL_EFFORTS, multi=True, is_available=lambda: True, decode=decode))
+    tempfile.SpooledTemporaryFile.rollover = rollover
+    try:
+        config.DECODERS = ["capture"]
+        with TestClient(app) as client:
+            response = client.post("/decode/", files={"file": ("photo.png", body, "image/png")})
+        print(f"{len(body)} octets: {response.status_code}, moteur: {seen[-1:]}, fichiers temporaires: {len(rollovers)}")
+        assert rollovers == [], "l'upload a été déversé sur disque"
+        assert ("L", (1000, 800)) in seen
+        assert all(mode == "L" for mode, _ in seen)
+    finally:
+        tempfile.SpooledTemporaryFile.rollover = original_rollover
+        config.DECODERS = saved
+        _BACKENDS.pop("capture", None)
+
+
+def test_stored_image_original_scale():
+    """Teste qu'une image déposée puis réduite par les limites de pixels garde le repère d'origine (taille, ROI, positions)"""
+    print("\n=== Test du repère d'origine d'une image déposée réduite ===")
+
+    seen = []
+
+    def decode(gray_image, formats, multi, timeout_ms, logf=None):
+        seen.append(gray_image.size)
+        return [("0109506000134352", "DATA_MATRIX", (0, 0) + gray_image.size)]
+
+    saved = (config.DECODERS, config.IMAGE_MAX_PIXELS)
+    register_backend(DecoderBackend(name="box", decoder_type=DecoderType.PYLIBDMTX, formats=ALL_FORMATS,
+                                    efforts=ALL_EFFORTS, multi=True, is_available=lambda: True, decode=decode))
+    try:
+        config.DECODERS = ["box"]
+        config.IMAGE_MAX_PIXELS = 20000
+        with TestClient(app) as client:
+            handle = client.post("/images", files={"file": ("big.png", _png((400, 200)), "image/png")})
+            print(f"/images: {handle.status_code} {handle.json()}")
+            assert handle.status_code == 201
+            assert (handle.json()["width"], handle.json()["height"]) == (400, 200)
+
+            response = client.post(f"/decode/{handle.json()['image_id']}",
+                                   data={"roi": "200,100,400,200", "verbose": "true"})
+        body = response.json()
+        details = body["barcodes"][0]["decoder_info"]["decode_details"]
+        print(f"Moteur: {seen}, détails: {details}")
+        assert response.status_code == 200
+        assert seen == [(100, 50)]
+        assert details["position"] == [200, 100, 400, 200] and details["roi"] == [200, 100, 400, 200]
+    finally:
+        config.DECODERS, config.IMAGE_MAX_PIXELS = saved
+        _BACKENDS.pop("box", None)
+
+
+def test_decode_while_workers_start():
+    """Teste le 503 avec Retry-After d'un décodage qui n'obtient pas de worker prêt avant son budget"""
+    print("\n=== Test d'un décodage pendant le démarrage des workers ===")
+
+    with TestClient(app) as client:
+        saved = main.decode_farm
+        # Ferme pas encore démarrée : aucun worker n'a fini de lancer sa JVM
+        main.decode_farm = DecodeFarm(1, task_timeout_s=30)
+        try:
+            # Image propre à ce test : un résultat en cache serait servi sans worker
+            response = client.post("/decode/", files={"file": ("a.png", _png((71, 53)), "image/png")},
+                                   data={"deadline_ms": "100"})
+        finally:
+            main.decode_farm = saved
+    print(f"{response.status_code} {response.json()} Retry-After={response.headers.get('retry-after')}")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(config.DECODE_RETRY_AFTER_S)
+
+
+def test_decode_batch_items():
+    """Teste /decode/batch : erreurs 413 et 422 propres à chaque image, ordre des résultats conservé"""
+    print("\n=== Test des erreurs par image de /decode/batch ===")
+
+    saved = (config.DECODERS, config.UPLOAD_MAX_BYTES)
+    register_backend(_gtin_backend())
+    try:
+        config.DECODERS = ["gtin"]
+        with TestClient(app) as client:
+            config.UPLOAD_MAX_BYTES = 20000
+            big = _png((600, 400))
+            big = big + b"\0" * (config.UPLOAD_MAX_BYTES + 1 - len(big))
+            files = [
+                ("files", ("noir.png", _png((41, 31), color=0), "image/png")),
+                ("files", ("trop_gros.png", big, "image/png")),
+                ("files", ("illisible.png", b"pas une image", "image/png")),
+                ("files", ("blanc.png", _png((43, 33)), "image/png")),
+                ("files", ("noir_2.png", _png((47, 37), color=0), "image/png")),
+            ]
+            response = client.post("/decode/batch", files=files)
+        body = response.json()
+        print(f"{response.status_code}: {[(i['filename'], i['success'], i['status_code']) for i in body['items']]}")
+        assert response.status_code == 200
+        assert [item["index"] for item in body["items"]] == [0, 1, 2, 3, 4]
+        assert [item["filename"] for item in body["items"]] == [name for _, (name, _, _) in files]
+        assert [item["status_code"] for item in body["items"]] == [None, 413, 422, 422, None]
+        assert body["items"][0]["barcodes"][0]["parsed"] == {"GTIN": "09506000134352"}
+        assert (body["total"], body["decoded"], body["failed"]) == (5, 2, 3)
+    finally:
+        config.DECODERS, config.UPLOAD_MAX_BYTES = saved
+        _BACKENDS.pop("gtin", None)
+
+
+def test_decode_batch_larger_than_queue():
+    """Teste qu'un lot plus grand que la file du pool est décodé entièrement, sans 503"""
+    print("\n=== Test d'un lot plus grand que la file de décodage ===")
+
+    saved = (config.DECODERS, config.DECODE_BATCH_CONCURRENCY)
+    register_backend(_gtin_backend(delay_s=0.02))
+    try:
+        config.DECODERS = ["gtin"]
+        with TestClient(app) as client:
+            saved_executor = main.decode_executor
+            # 2 threads et 1 place en file : les 12 images dépassent largement la capacité du pool
+            main.decode_executor = DecodeExecutor(2, 1)
+            config.DECODE_BATCH_CONCURRENCY = 3
+            try:
+                files = [("files", (f"{i}.png", _png((50 + i, 40), color=0), "image/png")) for i in range(12)]
+                response = client.post("/decode/batch", files=files)
+                stats = main.decode_executor.stats()
+            finally:
+                main.decode_executor.shutdown()
+                main.decode_executor = saved_executor
+        body = response.json()
+        print(f"{response.status_code}: décodées {body['decoded']}/{body['total']}, pool: {stats}")
+        assert response.status_code == 200
+        assert body["decoded"] == 12 and stats["rejected"] == 0
+        assert [item["filename"] for item in body["items"]] == [f"{i}.png" for i in range(12)]
+    finally:
+        config.DECODERS, config.DECODE_BATCH_CONCURRENCY = saved
+        _BACKENDS.pop("gtin", None)
+
+
+def test_decode_pool_saturated():
+    """Teste le 503 avec Retry-After quand le pool (1 thread, file de 0) est occupé par une tâche bloquée"""
+    print("\n=== Test de la saturation du pool de décodage ===")
+
+    release = threading.Event()
+    blocked = threading.Event()
+
+    def block(gray_image, formats, multi, timeout_ms, logf=None):
+        blocked.set()
+        release.wait(10)
+        return []
+
+    saved = config.DECODERS
+    register_backend(DecoderBackend(name="block", decoder_type=DecoderType.PYLIBDMTX, formats=ALL_FORMATS,
+                                    efforts=ALL_EFFORTS, multi=True, is_available=lambda: True, decode=block))
+    try:
+        config.DECODERS = ["block"]
+        with TestClient(app) as client:
+            saved_executor = main.decode_executor
+            main.decode_executor = DecodeExecutor(1, 0)
+            first = {}
+            try:
+                thread = threading.Thread(target=lambda: first.update(response=client.post(
+                    "/decode/", files={"file": ("a.png", _png((73, 59)), "image/png")}, data={"deadline_ms": "0"})))
+                thread.start()
+                assert blocked.wait(10), "la première requête doit occuper le thread de décodage"
+
+                response = client.post("/decode/", files={"file": ("b.png", _png((79, 61)), "image/png")})
+                print(f"{response.status_code} {response.json()} Retry-After={response.headers.get('retry-after')}")
+                assert response.status_code == 503
+                assert response.headers["retry-after"] == str(config.DECODE_RETRY_AFTER_S)
+                assert main.decode_executor.stats()["rejected"] == 1
+
+                release.set()
+                thread.join(10)
+                assert first["response"].status_code == 422
+            finally:
+                release.set()
+                main.decode_executor.shutdown()
+                main.decode_executor = saved_executor
+    finally:
+        config.DECODERS = saved
+        _BACKENDS.pop("block", None)
+
+
+def test_health_and_metrics():
+    """Teste que /health et /metrics répondent tous deux (statistiques des pools, texte Prometheus)"""
+    print("\n=== Test de /health et /metrics ===")
+
+    with TestClient(app) as client:
+        health = client.get("/health")
+        exported = client.get("/metrics")
+    print(f"/health: {health.status_code}, /metrics: {exported.status_code}")
+    assert health.status_code == 200
+    assert "decode_pool" in health.json()["metrics"]
+    assert exported.status_code == 200
+    assert "# TYPE gs1_stage_duration_seconds histogram" in exported.text
+
+
+if __name__ == "__main__":
+    test_request_size_limit()
+    test_upload_decoded_in_memory()
+    test_stored_image_original_scale()
+    test_decode_while_workers_start()
+    test_decode_batch_items()
+    test_decode_batch_larger_than_queue()
+    test_decode_pool_saturated()
+    test_health_and_metrics()
+    print("\n=== Tests terminés ===")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Script de test pour les métriques Prometheus (app/metrics.py) et les durées
+d'étapes rapportées par le pipeline de décodage.
+"""
+
+import io
+
+from PIL import Image
+
+from app.decode_cache import DecodeResultCache
+from app.decode_pipeline import DecodeOptions, DecodeOutcome, DecodedSymbol, decode_upload_bytes
+from app.barcode_detector import DecoderType
+from app.metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_render_prometheus_text():
+    """Teste le format texte des compteurs et histogrammes"""
+    print("\n=== Test du rendu Prometheus ===")
+
+    registry = MetricsRegistry()
+    hits = registry.register(Counter("test_hits_total", "Codes trouvés.", ["decoder"]))
+    durations = registry.register(Histogram("test_duration_seconds", "Durées.", ["stage"], buckets=[0.01, 0.1]))
+    hits.inc(decoder="zxing")
+    hits.inc(2, decoder="pylibdmtx")
+    durations.observe(0.005, stage="parse_gs1")
+    durations.observe(0.05, stage="parse_gs1")
+    durations.observe(3.0, stage="parse_gs1")
+
+    text = registry.render()
+    print(text)
+    lines = text.splitlines()
+    assert "# TYPE test_hits_total counter" in lines
+    assert 'test_hits_total{decoder="pylibdmtx"} 2' in lines
+    assert 'test_hits_total{decoder="zxing"} 1' in lines
+    assert "# TYPE test_duration_seconds histogram" in lines
+    assert 'test_duration_seconds_bucket{stage="parse_gs1",le="0.01"} 1' in lines
+    assert 'test_duration_seconds_bucket{stage="parse_gs1",le="0.1"} 2' in lines
+    assert 'test_duration_seconds_bucket{stage="parse_gs1",le="+Inf"} 3' in lines
+    assert 'test_duration_seconds_sum{stage="parse_gs1"} 3.055' in lines
+    assert 'test_duration_seconds_count{stage="parse_gs1"} 3' in lines
+    assert durations.count(stage="parse_gs1") == 3
+
+    try:
+        hits.inc(symbology="QR")
+        assert False, "ValueError attendue"
+    except ValueError as e:
+        print(f"Erreur attendue: {e}")
+
+
+def test_pipeline_timings():
+    """Teste les durées d'étapes rapportées par decode_upload_bytes et leur absence sur un résultat en cache"""
+    print("\n=== Test des durées d'étapes du pipeline ===")
+
+    buffer = io.BytesIO()
+    Image.new("L", (64, 48), 255).save(buffer, format="PNG")
+
+    def decode(gray_image, options):
+        return DecodeOutcome(symbols=[DecodedSymbol(raw="x", decoder=DecoderType.PYLIBDMTX)],
+                             timings=[("pylibdmtx", 0.002)])
+
+    outcome = decode_upload_bytes(buffer.getvalue(), DecodeOptions(), decode)
+    print(f"Durées: {outcome.timings}")
+    assert [stage for stage, _ in outcome.timings] == ["image_load", "pylibdmtx"]
+    assert all(duration >= 0 for _, duration in outcome.timings)
+
+    cache = DecodeResultCache(1024 * 1024, 60)
+    cache.put("key", outcome)
+    assert cache.get("key").timings == []
+    assert outcome.timings, "l'original n'est pas modifié"
+
+
+if __name__ == "__main__":
+    test_render_prometheus_text()
+    test_pipeline_timings()
+    print("\n=== Tests terminés ===")
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le rapport de démarrage (app/startup.py).
+"""
+
+import time
+
+from app.startup import StartupReport
+
+
+def test_startup_report():
+    """Teste les étapes mesurées et la disponibilité par fonctionnalité"""
+    print("\n=== Test de StartupReport ===")
+
+    report = StartupReport(time.perf_counter())
+    with report.step("imports"):
+        time.sleep(0.01)
+    report.set_ready("parse")
+    report.expect("decode")
+
+    assert report.is_ready("parse")
+    assert not report.is_ready("decode")
+    assert not report.is_ready()
+    assert not report.is_ready("inconnue")
+
+    report.set_ready("decode", detail="ZXing (JPype) indisponible")
+    details = report.report()
+    print(f"Rapport: {details}")
+    assert report.is_ready()
+    assert details["steps_s"]["imports"] >= 0.01
+    assert details["capabilities"]["decode"]["detail"] == "ZXing (JPype) indisponible"
+    assert details["capabilities"]["decode"]["ready_after_s"] >= details["capabilities"]["parse"]["ready_after_s"]
+
+
+if __name__ == "__main__":
+    test_startup_report()
+    print("\n=== Tests terminés ===")
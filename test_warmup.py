@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le préchauffage du JIT (app/warmup.py).
+"""
+
+from app import zxing_bridge
+from app.decode_pipeline import DecodedSymbol, DecodeOutcome
+from app.barcode_detector import DecoderType
+from app.warmup import build_warmup_images, run_warmup
+
+
+def test_build_warmup_images():
+    """Teste la génération des images synthétiques"""
+    print("\n=== Test de build_warmup_images ===")
+
+    images = build_warmup_images()
+    print(f"Images générées: {sorted(images)}")
+    # DataMatrix dépend de libdmtx : il peut manquer hors de l'image Docker
+    assert {"qrcode", "code128"} <= set(images)
+    assert all(data.startswith(b"\x89PNG") for data in images.values())
+
+
+def test_run_warmup():
+    """Teste les passes de préchauffage et les latences rapportées"""
+    print("\n=== Test de run_warmup ===")
+
+    assert run_warmup(0) == {"skipped": "GS1_WARMUP_ITERATIONS=0"}
+
+    calls = []
+
+    def decode(image_bytes):
+        calls.append(image_bytes)
+        return DecodeOutcome(symbols=[DecodedSymbol(raw="x", decoder=DecoderType.ZXING)])
+
+    saved = zxing_bridge.is_available
+    try:
+        zxing_bridge.is_available = lambda: False
+        assert "skipped" in run_warmup(3, decode)
+        assert not calls
+
+        zxing_bridge.is_available = lambda: True
+        stats = run_warmup(3, decode)
+    finally:
+        zxing_bridge.is_available = saved
+    print(f"Statistiques: {stats}")
+    assert len(calls) == 3 * len(stats["first_ms"])
+    assert stats["iterations"] == 3
+    assert set(stats["first_ms"]) == set(stats["last_ms"]) == set(stats["decoded"])
+    assert all(stats["decoded"].values())
+
+
+if __name__ == "__main__":
+    test_build_warmup_images()
+    test_run_warmup()
+    print("\n=== Tests terminés ===")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le pont JPype/ZXing (app/zxing_bridge.py) : options de
+démarrage de la JVM, source de luminance construite depuis les octets de
+l'image, cache des hints, lecteurs par thread et lecteurs dédiés. Les tests
+qui ont besoin de la JVM sont ignorés sans elle.
+"""
+
+import io
+import os
+import tempfile
+import threading
+
+import pytest
+from PIL import Image
+
+from app import config, zxing_bridge
+from app.models import ScanBarcodeFormatHint
+
+_JVM_SETTINGS = ("JVM_HEAP_MIN", "JVM_HEAP_MAX", "JVM_THREAD_STACK", "JVM_GC", "JVM_OPTIONS", "JVM_CDS_ARCHIVE")
+
+
+def test_build_jvm_options():
+    """Teste la traduction des paramètres GS1_JVM_* en options JVM"""
+    print("\n=== Test de build_jvm_options ===")
+
+    saved = {name: getattr(config, name) for name in _JVM_SETTINGS}
+    try:
+        for name in _JVM_SETTINGS:
+            setattr(config, name, "")
+        assert zxing_bridge.build_jvm_options() == ["-ea", f"-Djava.class.path={zxing_bridge.ZXING_CLASSPATH}"]
+
+        with tempfile.NamedTemporaryFile(suffix=".jsa") as archive:
+            config.JVM_HEAP_MIN = "64m"
+            config.JVM_HEAP_MAX = "256m"
+            config.JVM_THREAD_STACK = "512k"
+            config.JVM_GC = "serial"
+            config.JVM_OPTIONS = "-XX:TieredStopAtLevel=4 -Dfile.encoding=UTF-8"
+            config.JVM_CDS_ARCHIVE = archive.name
+            options = zxing_bridge.build_jvm_options()
+            print(f"Options: {options}")
+            assert options[2:] == [
+                "-Xms64m", "-Xmx256m", "-Xss512k", "-XX:+UseSerialGC",
+                "-XX:TieredStopAtLevel=4", "-Dfile.encoding=UTF-8", f"-XX:SharedArchiveFile={archive.name}",
+            ]
+            # Pendant la génération de l'archive, elle n'est pas utilisée
+            assert not any(o.startswith("-XX:SharedArchiveFile") for o in zxing_bridge.build_jvm_options(use_cds=False))
+
+        # Archive absente ou ramasse-miettes inconnu : ignorés
+        assert not os.path.exists(config.JVM_CDS_ARCHIVE)
+        config.JVM_GC = "inconnu"
+        options = zxing_bridge.build_jvm_options()
+        assert not any(o.startswith("-XX:SharedArchiveFile") or o.startswith("-XX:+Use") for o in options)
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
+def _require_jvm():
+    """Démarre la JVM si besoin ; ignore le test si elle ou les classes ZXing sont indisponibles."""
+    if not zxing_bridge.is_available():
+        zxing_bridge.start_jvm(use_cds=False)
+    if not zxing_bridge.is_available():
+        pytest.skip("JVM/ZXing indisponible")
+
+
+def test_luminance_source():
+    """Teste la source de luminance construite en mémoire depuis une image 'L'"""
+    print("\n=== Test de build_luminance_source ===")
+    _require_jvm()
+
+    gray_image = Image.new("L", (7, 3))
+    gray_image.putdata([(x * 37 + y * 11) % 256 for y in range(3) for x in range(7)])
+    source = zxing_bridge.build_luminance_source(gray_image)
+    assert (source.getWidth(), source.getHeight()) == (7, 3)
+    for y in range(3):
+        row = [b & 0xFF for b in source.getRow(y, None)]
+        assert row == list(gray_image.crop((0, y, 7, y + 1)).getdata()), f"ligne {y}"
+
+    # Un byte[] déjà construit est partagé tel quel
+    java_pixels = zxing_bridge.to_java_pixels(gray_image)
+    shared = zxing_bridge.build_luminance_source(gray_image, java_pixels)
+    assert [b & 0xFF for b in shared.getMatrix()] == list(gray_image.tobytes())
+
+
+def test_hints_cache():
+    """Teste que les mêmes types demandés réutilisent la même Map de hints, non modifiable"""
+    print("\n=== Test du cache des hints ZXing ===")
+    _require_jvm()
+
+    key, hints = zxing_bridge.get_hints([ScanBarcodeFormatHint.QR_CODE, ScanBarcodeFormatHint.DATAMATRIX])
+    same_key, same_hints = zxing_bridge.get_hints([ScanBarcodeFormatHint.DATAMATRIX, ScanBarcodeFormatHint.QR_CODE])
+    print(f"Clé: {key}")
+    assert key == same_key == (("DATA_MATRIX", "QR_CODE"), True, False)
+    assert same_hints is hints
+    assert zxing_bridge.get_hints(None)[1] is zxing_bridge.get_hints(None)[1]
+    assert zxing_bridge.get_hints(None, try_harder=False)[1] is not zxing_bridge.get_hints(None)[1]
+
+    try:
+        hints.put(zxing_bridge.DecodeHintType_Java.PURE_BARCODE, zxing_bridge.jpype.java.lang.Boolean.TRUE)
+        assert False, "UnsupportedOperationException attendue"
+    except zxing_bridge.jpype.JException as e:
+        print(f"Erreur attendue: {e.getClass().getName()}")
+        assert str(e.getClass().getName()) == "java.lang.UnsupportedOperationException"
+
+
+def test_thread_local_readers():
+    """Teste qu'un lecteur ZXing est réutilisé dans un thread et jamais partagé entre threads"""
+    print("\n=== Test des lecteurs ZXing par thread ===")
+    _require_jvm()
+
+    key, hints = zxing_bridge.get_hints(None)
+    reader = zxing_bridge._thread_reader("multi", key, hints)
+    assert zxing_bridge._thread_reader("multi", key, hints) is reader
+    other_key, other_hints = zxing_bridge.get_hints(None, try_harder=False)
+    assert zxing_bridge._thread_reader("multi", other_key, other_hints) is not reader
+
+    readers = []
+
+    def in_thread():
+        zxing_bridge.attach_current_thread()
+        readers.append(zxing_bridge._thread_reader("multi", key, hints))
+
+    thread = threading.Thread(target=in_thread)
+    thread.start()
+    thread.join()
+    assert readers and readers[0] is not None and readers[0] is not reader
+
+
+def test_single_format_dedicated_reader():
+    """Teste qu'une requête d'un seul format passe par le lecteur dédié, et le mode multi par le lecteur générique"""
+    print("\n=== Test du lecteur dédié à un seul format ===")
+    _require_jvm()
+
+    image = Image.new("L", (64, 64), 255)
+    for scan_type, reader in ((ScanBarcodeFormatHint.DATAMATRIX, "datamatrix"),
+                              (ScanBarcodeFormatHint.QR_CODE, "qrcode"),
+                              (ScanBarcodeFormatHint.CODE_128, "code128")):
+        logf = io.StringIO()
+        results, error = zxing_bridge.decode_zxing(image, [scan_type], logf)
+        print(f"{scan_type.value}: {error}")
+        assert results == []
+        assert f"using dedicated {reader} reader" in logf.getvalue()
+        assert (reader, None) in zxing_bridge._thread_state.readers
+
+    logf = io.StringIO()
+    zxing_bridge.decode_zxing(image, [ScanBarcodeFormatHint.DATAMATRIX], logf, multi=True)
+    assert "dedicated" not in logf.getvalue()
+    logf = io.StringIO()
+    zxing_bridge.decode_zxing(image, [ScanBarcodeFormatHint.DATAMATRIX, ScanBarcodeFormatHint.QR_CODE], logf)
+    assert "dedicated" not in logf.getvalue()
+
+
+def test_decode_multiple_readers():
+    """Teste que QRCodeMultiReader est essayé même quand le lecteur générique ne trouve rien (sans JVM, lecteurs simulés)"""
+    print("\n=== Test de _decode_multiple ===")
+
+    class NotFound(Exception):
+        @classmethod
+        def getNotFoundInstance(cls):
+            return cls()
+
+    class Reader:
+        def __init__(self, found):
+            self.found = found
+
+        def decodeMultiple(self, binary_bitmap, hints):
+            if not self.found:
+                raise NotFound()
+            return list(self.found)
+
+    names = ("GenericMultipleBarcodeReader_Java", "QRCodeMultiReader_Java", "NotFoundException_Java", "_thread_reader")
+    saved = {name: getattr(zxing_bridge, name) for name in names}
+    generic, qr = [], []
+    try:
+        zxing_bridge.GenericMultipleBarcodeReader_Java = lambda delegate: Reader(generic)
+        zxing_bridge.QRCodeMultiReader_Java = lambda: Reader(qr)
+        zxing_bridge.NotFoundException_Java = NotFound
+        zxing_bridge._thread_reader = lambda reader, hints_key=None, hints=None: None
+
+        qr_key = (("DATA_MATRIX", "QR_CODE"), True, False)
+        qr[:] = ["qr"]
+        assert zxing_bridge._decode_multiple(None, qr_key, None) == ["qr"]
+        generic[:] = ["dm"]
+        assert zxing_bridge._decode_multiple(None, qr_key, None) == ["dm", "qr"]
+        # Sans QR demandé, seul le lecteur générique est essayé
+        assert zxing_bridge._decode_multiple(None, (("DATA_MATRIX",), True, False), None) == ["dm"]
+
+        generic.clear()
+        qr.clear()
+        try:
+            zxing_bridge._decode_multiple(None, qr_key, None)
+            assert False, "NotFoundException attendue"
+        except NotFound:
+            print("Aucun code : NotFoundException levée")
+    finally:
+        for name, value in saved.items():
+            setattr(zxing_bridge, name, value)
+
+
+if __name__ == "__main__":
+    for test in (test_build_jvm_options, test_luminance_source, test_hints_cache, test_thread_local_readers,
+                 test_single_format_dedicated_reader, test_decode_multiple_readers):
+        try:
+            test()
+        except pytest.skip.Exception as e:
+            print(f"Ignoré: {e}")
+    print("\n=== Tests terminés ===")
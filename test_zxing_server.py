@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Script de test pour le serveur ZXing partagé (app/zxing_server.py).
+Lance un vrai serveur sur un socket temporaire (sans préchauffage).
+"""
+
+import io
+import os
+import pickle
+import signal
+import stat
+import tempfile
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+from PIL import Image
+
+from app.decode_farm import DecodeWorkerError
+from app.zxing_server import ZXingServerClient, prepare_socket_dir
+
+
+def test_zxing_server_round_trip_and_restart():
+    """Teste un décodage via le serveur puis sa relance après un plantage"""
+    print("\n=== Test du serveur ZXing partagé ===")
+
+    os.environ["GS1_WARMUP_ITERATIONS"] = "0"
+    socket_path = os.path.join(tempfile.mkdtemp(), "zxing.sock")
+    client = ZXingServerClient(socket_path, task_timeout_s=30, spawn=True, startup_timeout_s=60)
+    client.start()
+    first_pid = client.stats()["server"]["pid"]
+    try:
+        image = Image.new("L", (320, 240), 255)
+        logf = io.StringIO()
+        outcome = client.decode_image(image, logf=logf)
+        print(f"Résultat: {outcome.symbols}, détails: {outcome.details}")
+        assert outcome.symbols == []
+        assert outcome.details["image_size"] == [320, 240]
+        assert logf.getvalue(), "le journal du serveur doit être recopié"
+
+        # Plantage du serveur : l'appelant reste en vie, le serveur est relancé
+        os.kill(first_pid, signal.SIGKILL)
+        time.sleep(0.2)
+        outcome = client.decode_image(image)
+        stats = client.stats()
+        print(f"Statistiques après relance: {stats}")
+        assert stats["spawns"] == 2
+        assert stats["server"]["pid"] != first_pid
+        assert outcome.details["image_size"] == [320, 240]
+
+        # Sans relance automatique, un serveur absent donne une DecodeWorkerError
+        os.kill(stats["server"]["pid"], signal.SIGKILL)
+        time.sleep(0.2)
+        client.spawn = False
+        client.shutdown()
+        try:
+            client.decode_image(image)
+            assert False, "DecodeWorkerError attendue"
+        except DecodeWorkerError as e:
+            print(f"Erreur attendue: {e}")
+    finally:
+        server_pid = client.stats()["server"].get("pid")
+        for pid in {first_pid, server_pid}:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except (OSError, TypeError):
+                pass
+
+
+def test_zxing_server_access_control():
+    """Teste le répertoire privé, les droits du socket et le refus des clients sans la clé"""
+    print("\n=== Test du contrôle d'accès au serveur ZXing ===")
+
+    unsafe = tempfile.mkdtemp()
+    os.chmod(unsafe, 0o777)
+    try:
+        prepare_socket_dir(os.path.join(unsafe, "zxing.sock"))
+        assert False, "PermissionError attendue"
+    except PermissionError as e:
+        print(f"Erreur attendue: {e}")
+
+    os.environ["GS1_WARMUP_ITERATIONS"] = "0"
+    socket_path = os.path.join(tempfile.mkdtemp(), "private", "zxing.sock")
+    client = ZXingServerClient(socket_path, task_timeout_s=30, spawn=True, startup_timeout_s=60)
+    client.start()
+    server_pid = client.stats()["server"]["pid"]
+    try:
+        assert stat.S_IMODE(os.stat(os.path.dirname(socket_path)).st_mode) == 0o700
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(f"{socket_path}.key").st_mode) == 0o600
+
+        for authkey in (None, b"mauvaise cle"):
+            try:
+                with Client(socket_path, family="AF_UNIX", authkey=authkey) as conn:
+                    conn.send("ping")
+                    conn.recv()  # Sans clé : défi d'authentification reçu au lieu d'une réponse
+                assert False, "connexion non authentifiée acceptée"
+            except (AuthenticationError, EOFError, OSError, pickle.UnpicklingError) as e:
+                print(f"Client refusé (clé {authkey!r}): {type(e).__name__}")
+
+        # Le client légitime est toujours servi
+        outcome = client.decode_image(Image.new("L", (64, 48), 255))
+        assert outcome.details["image_size"] == [64, 48]
+    finally:
+        client.shutdown()
+        os.kill(server_pid, signal.SIGKILL)
+
+
+if __name__ == "__main__":
+    test_zxing_server_round_trip_and_restart()
+    test_zxing_server_access_control()
+    print("\n=== Tests terminés ===")